@@ -1,79 +1,258 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify, send_file
 from flask_cors import CORS
 import os
+import base64
+import functools
 import json
+import logging
+import re
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from openai import OpenAI
-try:
-    import fitz
-except ImportError:
-    # Fallback for different PyMuPDF versions
-    try:
-        import PyMuPDF as fitz
-    except ImportError:
-        print("Warning: PyMuPDF not available. PDF processing will not work.")
-        fitz = None
 
-# Load environment variables from .env file
+# Load environment variables from .env file before the modules below read their settings
 load_dotenv()
 
+import openai
+from response_cache import (
+    create_pdf_cache, create_response_cache, create_section_cache, create_text_cache, make_cache_key,
+)
+from job_queue import QueueFullError, create_job_queue
+from jd_dedup import create_jd_index
+from template_registry import create_template_registry
+from pdf_extraction import describe_timings, extract_upload_text, hash_upload, normalize_text
+import cv_renderer
+import cv_sections
+import cv_batch
+import batch_backend
+import pdf_export
+import cl_renderer
+import prompts
+import ats_scoring
+import ats_batch
+import metrics
+import model_router
+import openai_client
+import tracing
+import structured_logging
+from streaming import HTMLStreamCleaner, clean_html, iterate_in_context, sse_event, stream_completion_text
+
+structured_logging.configure_logging()
+logger = logging.getLogger(__name__)
+
 # Get API key from environment variable
 api_key = os.getenv('OPENAI_API_KEY')
 if not api_key:
     raise ValueError("OPENAI_API_KEY not found in environment variables")
 
-# Configure OpenAI client
-client = OpenAI(api_key=api_key)
+# Pooled OpenAI client; timeouts, retries and the circuit breaker are set in openai_client
+client = openai_client.create_client(api_key)
+
+# Cache of generated responses keyed by endpoint, template and request data
+response_cache = create_response_cache()
+
+# Extracted CV text keyed by the SHA-256 of the uploaded file
+text_cache = create_text_cache()
+
+# Bounded worker pool for generations submitted through /jobs
+job_queue = create_job_queue()
+
+# Job descriptions mapped to the first near-identical posting seen, so results are reused
+jd_index = create_jd_index()
+
+# Offline Batch API backend for bulk work, with its own client (and provider capacity)
+batch_api = batch_backend.create_batch_backend(api_key)
+
+# Exported PDFs keyed by the hash of their HTML and CSS
+pdf_cache = create_pdf_cache()
+
+# Generated CV prose per section (summary, each job, each project), keyed by the section's inputs
+section_cache = create_section_cache()
 
 def clean_html_response(html_content):
     """Clean HTML response from AI model to remove markdown formatting and quotes."""
-    html_content = html_content.strip()
-    
-    # Remove any markdown formatting if present - more robust approach
-    # Handle ```html at the beginning
-    if '```html' in html_content:
-        start_index = html_content.find('```html') + 7
-        end_index = html_content.rfind('```')
-        if end_index > start_index:
-            html_content = html_content[start_index:end_index].strip()
-    # Handle ``` at the beginning (without html)
-    elif html_content.startswith('```'):
-        start_index = html_content.find('```') + 3
-        end_index = html_content.rfind('```')
-        if end_index > start_index:
-            html_content = html_content[start_index:end_index].strip()
-    
-    # Remove surrounding quotes if they exist
-    if html_content.startswith('"') and html_content.endswith('"'):
-        html_content = html_content[1:-1]
-    elif html_content.startswith("'") and html_content.endswith("'"):
-        html_content = html_content[1:-1]
-    
-    return html_content
+    return clean_html(html_content)
+
+
+def chat_completion(messages, **kwargs):
+    """Run a chat completion on the routed model tier, recording its latency, token usage and cost."""
+    tier, model = model_router.router.select()
+    started = time.perf_counter()
+    with tracing.span("model_call", model=model, tier=tier) as span:
+        try:
+            response = openai_client.create_completion(client, model=model, messages=messages, **kwargs)
+        except Exception as e:
+            metrics.record_model_error(model, e)
+            raise
+        seconds = time.perf_counter() - started
+        metrics.record_completion(model, seconds, response.usage, tier=tier)
+        model_router.router.observe(tier, seconds)
+        if response.usage:
+            span.set(prompt_tokens=response.usage.prompt_tokens,
+                     completion_tokens=response.usage.completion_tokens)
+    return response
+
+
+def wants_stream(data=None):
+    """Return True if the caller opted in to a streamed (SSE) response."""
+    value = request.args.get("stream") or (data or {}).get("stream")
+    return str(value).lower() in ("1", "true", "yes")
+
+
+def sse_response(events):
+    """Wrap an event generator in a Server-Sent Events response."""
+    return Response(iterate_in_context(events), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+def stream_html(messages, on_complete=None, restorer=None):
+    """
+    Stream model output as SSE 'chunk' events, stripping code fences and
+    quotes on the fly. restorer (see token_budget.CompactTemplate) puts
+    stripped template CSS back; on_complete receives the full cleaned HTML.
+    """
+    def generate():
+        cleaner = HTMLStreamCleaner()
+        parts = []
+        usage = []
+        started = time.perf_counter()
+        first_token = None
+        tier, model = model_router.router.select()
+        try:
+            with tracing.span("model_call", model=model, tier=tier, stream=True) as span:
+                stream = openai_client.create_completion(
+                    client, model=model, messages=messages, stream=True,
+                    stream_options={"include_usage": True}
+                )
+                for content in stream_completion_text(stream, on_usage=usage.append):
+                    if first_token is None:
+                        first_token = time.perf_counter() - started
+                    text = cleaner.feed(content)
+                    if restorer:
+                        text = restorer.feed(text)
+                    if text:
+                        parts.append(text)
+                        yield sse_event("chunk", {"html": text})
+                text = cleaner.finish()
+                if restorer:
+                    text = restorer.feed(text) + restorer.finish()
+                if text:
+                    parts.append(text)
+                    yield sse_event("chunk", {"html": text})
+                metrics.record_completion(model, time.perf_counter() - started,
+                                          usage[0] if usage else None, first_token, tier=tier)
+                if first_token is not None:
+                    model_router.router.observe(tier, first_token)
+                if usage:
+                    span.set(prompt_tokens=usage[0].prompt_tokens, completion_tokens=usage[0].completion_tokens)
+            if on_complete:
+                on_complete("".join(parts))
+            yield sse_event("done", {})
+        except Exception as e:
+            metrics.record_model_error(model, e)
+            logger.error("Streaming error: %s", e)
+            yield sse_event("error", {"error": f"Failed to generate: {str(e)}"})
+
+    return sse_response(generate())
+
+
+def stream_result(build_html, cache_status="MISS"):
+    """
+    Stream a result that is assembled on the server: a comment is sent
+    immediately so the connection opens, then the HTML as a single chunk.
+    """
+    def generate():
+        yield ": generating\n\n"
+        try:
+            yield sse_event("chunk", {"html": build_html()})
+            yield sse_event("done", {"cache": cache_status})
+        except Exception as e:
+            logger.error("Streaming error: %s", e)
+            yield sse_event("error", {"error": f"Failed to generate: {str(e)}"})
+
+    return sse_response(generate())
 
 # Configuration from environment variables
 PORT = int(os.getenv('PORT', 5001))
 HOST = os.getenv('HOST', '0.0.0.0')  # Changed to 0.0.0.0 to allow external connections
 DEBUG = os.getenv('DEBUG', 'False').lower() == 'true'
+# 'local' renders CV structure on the server and asks the model for prose only;
+# 'llm' sends the whole template to the model
+CV_RENDER_MODE = os.getenv('CV_RENDER_MODE', 'local').lower()
+# Same switch for cover letters: 'local' fills placeholders on the server
+CL_RENDER_MODE = os.getenv('CL_RENDER_MODE', 'local').lower()
+# How local mode generates the CV prose: 'fanout' makes one concurrent call per
+# section (summary, each job, each project); 'single' asks for all of them in one call
+CV_SECTION_MODE = os.getenv('CV_SECTION_MODE', 'fanout').lower()
+CV_SECTION_CONCURRENCY = int(os.getenv('CV_SECTION_CONCURRENCY', 4))
+# 'local' scores CVs with ats_scoring and uses the model only for suggestions;
+# 'llm' asks the model for the whole ATS report
+ATS_SCORING_MODE = os.getenv('ATS_SCORING_MODE', 'local').lower()
+ATS_LLM_SUGGESTIONS = os.getenv('ATS_LLM_SUGGESTIONS', 'True').lower() == 'true'
+# Limits for /ats-batch
+ATS_BATCH_MAX_FILES = int(os.getenv('ATS_BATCH_MAX_FILES', 500))
+ATS_BATCH_MAX_JOBS = int(os.getenv('ATS_BATCH_MAX_JOBS', 50))
+ATS_BATCH_CONCURRENCY = int(os.getenv('ATS_BATCH_CONCURRENCY', 8))
+ATS_BATCH_LLM_CONCURRENCY = int(os.getenv('ATS_BATCH_LLM_CONCURRENCY', 4))
+# Bulk CV batches (uploaded input, checkpoint and outputs) are kept here, one directory per batch
+CV_BATCH_DIR = os.getenv('CV_BATCH_DIR', 'cv_batches')
+# Start the PDF export workers when the server starts instead of on the first export
+PDF_EXPORT_WARM = os.getenv('PDF_EXPORT_WARM', 'True').lower() == 'true'
 
 app = Flask(__name__, template_folder="templates")
 CORS(app)
 
 
-def load_template(template_name, folder="Templates"):
-    """Load HTML template from a given folder"""
-    if folder == "cv":
-        path = os.path.join("Templates", template_name)
-    elif folder == "cl":
-        path = os.path.join("Cover_Letter", template_name)
-    else:
-        raise ValueError("Invalid template folder")
+@app.before_request
+def start_request_metrics():
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    g.request_started = time.perf_counter()
+    g.request_id, g.trace = tracing.start_trace(
+        f"{request.method} {route}", request.headers.get(tracing.REQUEST_ID_HEADER), route=route
+    )
+    metrics.start_request(route)
+
+
+@app.after_request
+def finish_request_metrics(response):
+    response.headers[tracing.REQUEST_ID_HEADER] = g.request_id
+    # Streamed responses are timed until the last byte is sent
+    labels = metrics.current_labels()
+    started = g.request_started
+    trace = g.trace
+    trace.set(status=response.status_code, **labels)
+
+    def finish():
+        metrics.finish_request(labels, response.status_code, time.perf_counter() - started)
+        trace.end()
+
+    response.call_on_close(finish)
+    return response
+
+
+@app.errorhandler(openai.APIError)
+@app.errorhandler(openai_client.CircuitOpenError)
+@app.errorhandler(openai_client.ThrottledError)
+def model_unavailable(e):
+    """Model failures not handled by a route: 503 when the upstream is degraded."""
+    logger.error("Model call failed: %s", e)
+    status, headers = openai_client.error_status(e)
+    return jsonify({"error": f"Failed to generate: {str(e)}"}), status, headers
 
-    if not os.path.exists(path):
-        raise FileNotFoundError(f"Template {template_name} not found in {folder} folder")
 
-    with open(path, "r", encoding="utf-8") as f:
-        return f.read()
+# Templates are read once at startup and served from memory
+template_registry = create_template_registry(DEBUG)
+
+
+def get_template(template_name, folder="cv"):
+    """Return the registry entry (HTML, digest, compact variant) for a template file name."""
+    return template_registry.get(folder, os.path.splitext(template_name)[0])
+
+
+def load_template(template_name, folder="Templates"):
+    """Load HTML template from a given folder"""
+    return get_template(template_name, folder).html
 
 
 QUESTIONNAIRE = {
@@ -139,10 +318,27 @@ def health_check():
     return jsonify({
         "status": "healthy",
         "message": "Resume Builder API is running",
-        "templates": ["cv_1", "cv_2"],
+        "templates": template_registry.names("cv"),
+        "cover_letter_templates": template_registry.names("cl"),
+        "cache": response_cache.stats(),
+        "text_cache": text_cache.stats(),
+        "jobs": job_queue.stats(),
+        "job_descriptions": jd_index.stats(),
+        "pdf_cache": pdf_cache.stats(),
+        "section_cache": section_cache.stats(),
+        "in_flight": metrics.in_flight(),
+        "openai": openai_client.breaker.stats(),
+        "rate_limiter": openai_client.limiter.stats(),
+        "model_tiers": model_router.router.stats(),
         "timestamp": str(datetime.datetime.now())
     })
 
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus metrics for this process."""
+    body = metrics.render_prometheus({"response": response_cache, "text": text_cache, "pdf": pdf_cache, "cv_sections": section_cache})
+    return body, 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
 @app.route('/questionnaire', methods=['GET'])
 def get_questionnaire():
     """
@@ -150,19 +346,17 @@ def get_questionnaire():
     Example: /questionnaire?template=cv_2
     """
     try:
-        print("=== QUESTIONNAIRE REQUEST RECEIVED ===")
         template_choice = request.args.get("template", "cv_1")
-        print(f"Template requested: {template_choice}")
+        logger.debug("Questionnaire requested", extra={"template": template_choice})
         
         response_data = {
             "template": template_choice,
             "questionnaire": QUESTIONNAIRE
         }
         
-        print("✅ Returning questionnaire data")
         return jsonify(response_data)
     except Exception as e:
-        print(f"❌ Error in questionnaire endpoint: {str(e)}")
+        logger.exception("Error in questionnaire endpoint: %s", e)
         return jsonify({"error": f"Server error: {str(e)}"}), 500
 
 
@@ -175,37 +369,93 @@ def generate_cv():
     data = request.get_json()
     template_choice = data.get("template", "cv_1")
     answers = data.get("questionnaire", {})
+    stream = wants_stream(data)
 
     template_file = f"{template_choice}.html"
-    cv_template = load_template(template_file, folder="cv")
-
-    prompt = (
-        "Fill this HTML CV template with the given JSON user data. "
-        "If any section data is missing or empty, remove that section from the CV. "
-        "Add new sections if relevant data is present. "
-        "Summary should be ~100 words. If user doesn't add summary just write one using his skills and experiences. "
-        "There should be 5 bullets for every experience (generate if missing). "
-        "Enhance or elaborate descriptions where needed, but preserve structure and style. "
-        "Output only the final HTML.\n"
-        + cv_template + "\nUserData:\n" + json.dumps(answers)
-    )
-
-    
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[
-            {"role": "system", "content": "You are a helpful cv maker assistant."},
-            {
-                "role": "user",
-                "content": prompt
-            }
-        ]
-    )
+    with tracing.span("template_load", template=template_choice):
+        template = get_template(template_file, folder="cv")
+    cv_template = template.html
+
+    render_mode = data.get("render_mode", CV_RENDER_MODE)
+    if render_mode == "local" and not cv_renderer.supports_template(template_choice):
+        render_mode = "llm"
+
+    cache_key = make_cache_key("generate-cv", render_mode, template_choice, template.digest, answers, model_router.router.route_model())
+    with tracing.span("cache_lookup") as span:
+        cached_html = response_cache.get(cache_key)
+        span.set(hit=cached_html is not None)
+    metrics.record_cache_lookup("miss" if cached_html is None else "hit")
+    if cached_html is not None:
+        if stream:
+            return stream_result(lambda: cached_html, cache_status="HIT")
+        return cached_html, 200, {'Content-Type': 'text/html', 'X-Cache': 'HIT'}
+
+    if render_mode == "local":
+        def build_html():
+            html_content = generate_cv_local(template_choice, cv_template, answers,
+                                             data.get("section_mode", CV_SECTION_MODE))
+            response_cache.set(cache_key, html_content)
+            return html_content
+
+        if stream:
+            return stream_result(build_html)
+        return build_html(), 200, {'Content-Type': 'text/html', 'X-Cache': 'MISS'}
+
+    with tracing.span("prompt_build"):
+        compact = template.compact
+        messages = prompts.cv_messages(compact.html, answers)
+
+    if stream:
+        return stream_html(messages, on_complete=lambda html: response_cache.set(cache_key, html),
+                           restorer=compact.stream_restorer())
+
+    response = chat_completion(messages)
 
     # Clean the response content to ensure it's proper HTML
-    html_content = clean_html_response(response.choices[0].message.content)
+    with tracing.span("post_process"):
+        html_content = compact.restore(clean_html_response(response.choices[0].message.content))
+        response_cache.set(cache_key, html_content)
     
-    return html_content, 200, {'Content-Type': 'text/html'}
+    return html_content, 200, {'Content-Type': 'text/html', 'X-Cache': 'MISS'}
+
+
+def generate_cv_sections(sections):
+    """Generate the prose of the given sections in one JSON completion; returns {section id: output}."""
+    with tracing.span("prompt_build"):
+        messages = prompts.cv_section_messages(sections)
+    response = chat_completion(messages, response_format=prompts.JSON_RESPONSE_FORMAT)
+    generated = cv_sections.parse_sections(response.choices[0].message.content, sections)
+    model_router.router.record_quality(len(generated) == len(sections))
+    cv_sections.store_outputs(section_cache, sections, generated)
+    return generated
+
+
+def generate_cv_local(template_choice, cv_template, answers, section_mode=CV_SECTION_MODE):
+    """
+    Render the CV structure locally and only ask the model for the prose
+    (summary and bullet points) as compact JSON. Sections whose inputs are
+    unchanged since an earlier request are reused from the section cache.
+    In 'fanout' mode the missing sections are generated by concurrent calls,
+    so the wait is that of the longest section rather than of all of them.
+    """
+    with tracing.span("section_cache") as span:
+        sections = cv_sections.plan_sections(answers, model_router.router.route_model())
+        outputs, missing = cv_sections.cached_outputs(section_cache, sections)
+        span.set(reused=len(outputs), generate=len(missing))
+    if section_mode == "fanout" and len(missing) > 1:
+        def run_section(section):
+            with tracing.span("section", section=section.id):
+                return generate_cv_sections([section])
+
+        with ThreadPoolExecutor(max_workers=min(CV_SECTION_CONCURRENCY, len(missing))) as pool:
+            for generated in pool.map(metrics.with_labels(run_section), missing):
+                outputs.update(generated)
+    elif missing:
+        outputs.update(generate_cv_sections(missing))
+    narrative = cv_sections.to_narrative(sections, outputs)
+
+    with tracing.span("render", template=template_choice):
+        return cv_renderer.render_cv(template_choice, cv_template, answers, narrative)
 
 
 QUESTIONNAIRE_CL = {
@@ -247,87 +497,121 @@ def generate_cover_letter():
     Use Gemini to merge info into the Cover Letter template.
     """
     data = request.get_json()
-    
-    print("=== COVER LETTER GENERATION REQUEST ===")
-    print("Received data:", json.dumps(data, indent=2))
 
     template_choice = data.get("template", "cl")  # default template cl.html
     job_data = data.get("job", {})
     applicant_data = data.get("applicant", {})
-    
-    print("Job data:", json.dumps(job_data, indent=2))
-    print("Applicant data:", json.dumps(applicant_data, indent=2))
+    stream = wants_stream(data)
+
+    # PII fields are redacted by the log formatter
+    logger.debug("Cover letter request", extra={"template": template_choice, "job": job_data, "applicant": applicant_data})
 
     template_file = f"{template_choice}.html"
-    cl_template = load_template(template_file, folder="cl")
-
-    prompt = f"""You are given an HTML Cover Letter template with placeholders and JSON user data. 
-Your task is to generate the FINAL cover letter HTML by REPLACING ALL PLACEHOLDERS with the user's data.
-
-CRITICAL REQUIREMENTS (follow exactly):
-- Keep the original CSS styles and layout structure from the template.
-- REPLACE ALL PLACEHOLDERS with actual user data:
-  * [APPLICANT_NAME] → applicant.name
-  * [APPLICANT_DESIGNATION] → applicant.designation  
-  * [APPLICANT_ADDRESS] → applicant.address
-  * [APPLICANT_PHONE] → applicant.phone
-  * [APPLICANT_EMAIL] → applicant.email
-  * [APPLICATION_DATE] → job.date
-  * [HR_NAME] → job.hr_name (or "HR Manager" if empty)
-  * [COMPANY_NAME] → job.company
-  * [COVER_LETTER_CONTENT_PARAGRAPH_1] through [COVER_LETTER_CONTENT_PARAGRAPH_5] → Generate professional paragraphs based on job description, company, experience, and skills
-- Generate 5 professional paragraphs for the cover letter content using the provided data
-- Do NOT include any placeholder text or bracketed prompts
-- Do NOT generate any text with square brackets
-- Use the actual company name, job description, skills, and experience from the user data
-- If job_found data is provided, incorporate it naturally into the content
-- Output ONLY the final HTML with all placeholders replaced (no explanations, comments, or code fences)
-
-Template:
-{cl_template}
-
-UserData (use only this data):
-{json.dumps({"job": job_data, "applicant": applicant_data})}
-"""
+    with tracing.span("template_load", template=template_choice):
+        template = get_template(template_file, folder="cl")
+    cl_template = template.html
 
-    
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[
-            {"role": "system", "content": "You are a helpful cv maker assistant."},
-            {
-                "role": "user",
-                "content": prompt
-            }
-        ]
+    render_mode = data.get("render_mode", CL_RENDER_MODE)
+    if render_mode == "local" and not cl_renderer.supports_template(cl_template):
+        render_mode = "llm"
+
+    cache_key = make_cache_key(
+        "generate-cover-letter", render_mode, template_choice, template.digest,
+        {"job": job_data, "applicant": applicant_data}, model_router.router.route_model()
     )
+    with tracing.span("cache_lookup") as span:
+        cached_html = response_cache.get(cache_key)
+        span.set(hit=cached_html is not None)
+    metrics.record_cache_lookup("miss" if cached_html is None else "hit")
+    if cached_html is not None:
+        if stream:
+            return stream_result(lambda: cached_html, cache_status="HIT")
+        return cached_html, 200, {'Content-Type': 'text/html', 'X-Cache': 'HIT'}
+
+    if render_mode == "local":
+        def build_html():
+            html_content = generate_cover_letter_local(cl_template, job_data, applicant_data)
+            response_cache.set(cache_key, html_content)
+            return html_content
+
+        if stream:
+            return stream_result(build_html)
+        return build_html(), 200, {'Content-Type': 'text/html', 'X-Cache': 'MISS'}
+
+    with tracing.span("prompt_build"):
+        compact = template.compact
+        messages = prompts.cover_letter_messages(compact.html, job_data, applicant_data)
+
+    if stream:
+        return stream_html(messages, on_complete=lambda html: response_cache.set(cache_key, html),
+                           restorer=compact.stream_restorer())
+
+    response = chat_completion(messages)
 
     # Clean the response content to ensure it's proper HTML
-    html_content = clean_html_response(response.choices[0].message.content)
+    with tracing.span("post_process"):
+        html_content = compact.restore(clean_html_response(response.choices[0].message.content))
+        response_cache.set(cache_key, html_content)
     
-    return html_content, 200, {'Content-Type': 'text/html'}
+    return html_content, 200, {'Content-Type': 'text/html', 'X-Cache': 'MISS'}
+
+
+def generate_cover_letter_local(cl_template, job_data, applicant_data):
+    """
+    Fill the known placeholders on the server and only ask the model
+    for the five body paragraphs as JSON.
+    """
+    with tracing.span("prompt_build"):
+        messages = prompts.cover_letter_paragraph_messages(job_data, applicant_data)
+    response = chat_completion(messages, response_format=prompts.JSON_RESPONSE_FORMAT)
+    paragraphs = cl_renderer.parse_paragraphs(response.choices[0].message.content)
+    model_router.router.record_quality(bool(paragraphs))
+    with tracing.span("render"):
+        return cl_renderer.render_cover_letter(cl_template, job_data, applicant_data, paragraphs)
 
 def extract_text_from_pdf(pdf_file):
     """Extract text from uploaded PDF or text file."""
+    kind = "pdf" if pdf_file.filename.lower().endswith('.pdf') else "text"
     try:
-        # Check if it's a PDF file
-        if pdf_file.filename.lower().endswith('.pdf'):
-            if fitz is None:
-                raise ValueError("PyMuPDF not available. Cannot process PDF files.")
-            
-            text = ""
-            with fitz.open(stream=pdf_file.read(), filetype="pdf") as doc:
-                for page in doc:
-                    text += page.get_text("text")
+        with tracing.span("text_extraction", kind=kind) as span:
+            cache_key = f"{hash_upload(pdf_file)}:{kind}"
+            cached_text = text_cache.get(cache_key)
+            span.set(cache_hit=cached_text is not None)
+            if cached_text is not None:
+                return cached_text
+
+            result = extract_upload_text(pdf_file)
+            metrics.record_extraction(kind, result.total_seconds)
+            span.set(pages=len(result.page_timings), truncated=result.truncated)
+            logger.info(describe_timings("upload", result),
+                        extra={"kind": kind, "pages": len(result.page_timings), "seconds": round(result.total_seconds, 3)})
+            text = normalize_text(result.text)
+            text_cache.set(cache_key, text)
             return text
-        else:
-            # Handle text files
-            pdf_file.seek(0)  # Reset file pointer
-            return pdf_file.read().decode('utf-8')
     except Exception as e:
-        print(f"Text extraction error: {str(e)}")
+        logger.warning("Text extraction error: %s", e)
         raise ValueError(f"Failed to extract text from file: {str(e)}")
 
+def job_terms(job_description):
+    """Keyword terms of a job description, shared by near-duplicate postings."""
+    return jd_index.artifact(job_description, "terms", ats_scoring.extract_terms)
+
+def local_ats_report(cv_text, job_description, suggestions=True):
+    """
+    Score the CV locally and return (score, html). The model is only asked
+    for the improvement suggestions, and only when suggestions is True.
+    """
+    with tracing.span("scoring"):
+        score = ats_scoring.score_cv(cv_text, job_description, jd_terms=job_terms(job_description))
+    suggestions_html = None
+    if suggestions:
+        with tracing.span("prompt_build"):
+            messages = prompts.ats_suggestions_messages(cv_text, job_description, score)
+        response = chat_completion(messages)
+        suggestions_html = clean_html_response(response.choices[0].message.content)
+    with tracing.span("render"):
+        return score, ats_scoring.render_score_html(score, suggestions_html)
+
 @app.route('/generate-ats-score', methods=['POST'])
 def generate_ats_score():
     """
@@ -345,36 +629,26 @@ def generate_ats_score():
 
     cv_text = extract_text_from_pdf(cv_file)
 
-    prompt = f"""
-You are an ATS (Applicant Tracking System) evaluator. 
-Compare the following CV with the Job Description and provide an ATS compatibility score (0-100).  
-Return the result in **HTML format** with the following sections:
+    if request.form.get("scoring", ATS_SCORING_MODE) == "local":
+        suggestions = request.form.get("suggestions", str(ATS_LLM_SUGGESTIONS)).lower() == "true"
+        if wants_stream(request.form):
+            return stream_result(lambda: local_ats_report(cv_text, job_description, suggestions)[1])
+        score, html_content = local_ats_report(cv_text, job_description, suggestions)
+        if request.args.get("format") == "json":
+            return jsonify({"score": score, "response": html_content}), 200
+        return html_content, 200, {'Content-Type': 'text/html'}
 
-1. **Overall ATS Score** (percentage with color bar)  
-2. **Matched Keywords** (list of important job-specific keywords found in CV)  
-3. **Missing Keywords** (keywords required by JD but missing in CV)  
-4. **Skills Match** (match rate and table of skills: CV vs JD)  
-5. **Experience Match** (how relevant the experience is, 1-2 sentences + percentage)  
-6. **Education Match** (short analysis + percentage)  
-7. **Suggestions for Improvement** (bullet points for enhancing CV to improve score)
+    with tracing.span("prompt_build"):
+        messages = prompts.ats_score_messages(cv_text, job_description)
 
-CV Text:
-{cv_text}
-
-Job Description:
-{job_description}
-    """
+    if wants_stream(request.form):
+        return stream_html(messages)
 
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[
-            {"role": "system", "content": "You are an ATS scoring assistant that outputs results in HTML format only."},
-            {"role": "user", "content": prompt}
-        ]
-    )
+    response = chat_completion(messages)
 
     # Clean the response content to ensure it's proper HTML
-    html_content = clean_html_response(response.choices[0].message.content)
+    with tracing.span("post_process"):
+        html_content = clean_html_response(response.choices[0].message.content)
     
     return html_content, 200, {'Content-Type': 'text/html'}
 
@@ -389,6 +663,10 @@ def ats_analyze():
     pdf_file = request.files['pdf_file']
     job_description = request.form.get("job_description", "")
     analysis_type = request.form.get("analysis_type", "match")
+    # Used as a metric label and to pick the model tier, so only known types get through
+    if analysis_type not in prompts.ANALYSIS_TYPES + ["all"]:
+        return jsonify({"error": f"analysis_type must be one of: {', '.join(prompts.ANALYSIS_TYPES)}, all"}), 400
+    metrics.set_labels(analysis_type=analysis_type)
 
     if not job_description:
         return jsonify({"error": "Missing Job Description"}), 400
@@ -398,113 +676,129 @@ def ats_analyze():
         if not cv_text or len(cv_text.strip()) < 10:
             return jsonify({"error": "Could not extract text from PDF. Please ensure the PDF contains readable text."}), 400
     except Exception as e:
-        print(f"PDF extraction error: {str(e)}")
+        logger.warning("PDF extraction error: %s", e)
         return jsonify({"error": f"Failed to process PDF: {str(e)}"}), 400
 
-    # Different prompts based on analysis type
-    prompts = {
-        'match': f"""
-You are an ATS (Applicant Tracking System) evaluator. 
-Compare the following CV with the Job Description and provide an ATS compatibility score (0-100).
-Return the result in **HTML format** with the following sections:
-
-1. **Overall ATS Score** (percentage with color bar)  
-2. **Matched Keywords** (list of important job-specific keywords found in CV)  
-3. **Missing Keywords** (keywords required by JD but missing in CV)  
-4. **Skills Match** (match rate and table of skills: CV vs JD)  
-5. **Experience Match** (how relevant the experience is, 1-2 sentences + percentage)  
-6. **Education Match** (short analysis + percentage)  
-7. **Suggestions for Improvement** (bullet points for enhancing CV to improve score)
-
-CV Text:
-{cv_text}
-
-Job Description:
-{job_description}
-        """,
-        
-        'about': f"""
-You are a resume analysis expert. 
-Provide a detailed evaluation of the following CV against the job description.
-Return the result in **HTML format** with the following sections:
-
-1. **Resume Overview** (strengths and weaknesses)
-2. **Content Analysis** (completeness, relevance, formatting)
-3. **Keyword Optimization** (keyword density and placement)
-4. **Experience Relevance** (how well experience matches job requirements)
-5. **Skills Assessment** (technical and soft skills evaluation)
-6. **Education Fit** (educational background relevance)
-7. **Overall Assessment** (summary with recommendations)
-
-CV Text:
-{cv_text}
-
-Job Description:
-{job_description}
-        """,
-        
-        'improve': f"""
-You are a career development expert. 
-Analyze the following CV and provide specific improvement recommendations.
-Return the result in **HTML format** with the following sections:
-
-1. **Skills Enhancement** (specific skills to develop)
-2. **Experience Optimization** (how to better present experience)
-3. **Keyword Integration** (strategic keyword placement)
-4. **Formatting Improvements** (layout and structure suggestions)
-5. **Content Additions** (what to add to strengthen the CV)
-6. **Professional Development** (courses, certifications, activities)
-7. **Action Plan** (step-by-step improvement roadmap)
-
-CV Text:
-{cv_text}
-
-Job Description:
-{job_description}
-        """,
-        
-        'tailor': f"""
-You are a resume tailoring expert. 
-Create a tailored version of the following CV for the specific job description.
-Return the result in **HTML format** with the following sections:
-
-1. **Tailored Summary** (customized professional summary)
-2. **Optimized Experience** (reworded experience to match job requirements)
-3. **Enhanced Skills Section** (prioritized skills based on job needs)
-4. **Keyword Integration** (strategically placed keywords)
-5. **Relevant Achievements** (highlighted accomplishments that match job)
-6. **Customized Education** (emphasized relevant education)
-7. **Final Tailored CV** (complete optimized version)
-
-CV Text:
-{cv_text}
-
-Job Description:
-{job_description}
-        """
-    }
-
-    prompt = prompts.get(analysis_type, prompts['match'])
+    if analysis_type == "all":
+        local = request.form.get("scoring", ATS_SCORING_MODE) == "local"
+        suggestions = request.form.get("suggestions", str(ATS_LLM_SUGGESTIONS)).lower() == "true"
+        if wants_stream(request.form):
+            return stream_result(lambda: run_all_analyses(cv_text, job_description, local, suggestions)[0])
+        try:
+            html_content, sections, score = run_all_analyses(cv_text, job_description, local, suggestions)
+            return jsonify({"response": html_content, "sections": sections, "score": score}), 200
+        except Exception as e:
+            logger.exception("AI generation error: %s", e)
+            status, headers = openai_client.error_status(e)
+            return jsonify({"error": f"Failed to generate analysis: {str(e)}"}), status, headers
+
+    if analysis_type == "match" and request.form.get("scoring", ATS_SCORING_MODE) == "local":
+        suggestions = request.form.get("suggestions", str(ATS_LLM_SUGGESTIONS)).lower() == "true"
+        if wants_stream(request.form):
+            return stream_result(lambda: local_ats_report(cv_text, job_description, suggestions)[1])
+        try:
+            score, html_content = local_ats_report(cv_text, job_description, suggestions)
+            return jsonify({"response": html_content, "score": score}), 200
+        except Exception as e:
+            logger.exception("AI generation error: %s", e)
+            status, headers = openai_client.error_status(e)
+            return jsonify({"error": f"Failed to generate analysis: {str(e)}"}), status, headers
+
+    with tracing.span("prompt_build"):
+        messages = prompts.ats_analysis_messages(cv_text, job_description, analysis_type)
+
+    if wants_stream(request.form):
+        return stream_html(messages)
 
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "You are an ATS analysis assistant that outputs results in HTML format only."},
-                {"role": "user", "content": prompt}
-            ]
-        )
+        response = chat_completion(messages)
 
         # Clean the response content to ensure it's proper HTML
-        html_content = clean_html_response(response.choices[0].message.content)
+        with tracing.span("post_process"):
+            html_content = clean_html_response(response.choices[0].message.content)
         
-        if not html_content or len(html_content.strip()) < 50:
+        usable = bool(html_content) and len(html_content.strip()) >= 50
+        model_router.router.record_quality(usable)
+        if not usable:
             return jsonify({"error": "AI response was too short or empty. Please try again."}), 500
         
         return jsonify({"response": html_content}), 200
     except Exception as e:
-        print(f"AI generation error: {str(e)}")
-        return jsonify({"error": f"Failed to generate analysis: {str(e)}"}), 500
+        logger.exception("AI generation error: %s", e)
+        status, headers = openai_client.error_status(e)
+        return jsonify({"error": f"Failed to generate analysis: {str(e)}"}), status, headers
+
+def run_all_analyses(cv_text, job_description, local_scoring=True, suggestions=True):
+    """
+    Run every analysis type concurrently on the same extracted text.
+    Returns (combined_html, sections, score); score is None unless scored locally.
+    """
+    def run_analysis(analysis_type):
+        metrics.set_labels(analysis_type=analysis_type)
+        with tracing.span("analysis", analysis_type=analysis_type):
+            if analysis_type == "match" and local_scoring:
+                return local_ats_report(cv_text, job_description, suggestions)
+            response = chat_completion(
+                messages=prompts.ats_analysis_messages(cv_text, job_description, analysis_type)
+            )
+            return None, clean_html_response(response.choices[0].message.content)
+
+    with ThreadPoolExecutor(max_workers=len(prompts.ANALYSIS_TYPES)) as pool:
+        results = dict(zip(prompts.ANALYSIS_TYPES, pool.map(metrics.with_labels(run_analysis), prompts.ANALYSIS_TYPES)))
+
+    sections = {analysis_type: html for analysis_type, (_, html) in results.items()}
+    combined = "".join(
+        f'<section class="ats-{analysis_type}">{html}</section>' for analysis_type, html in sections.items()
+    )
+    return combined, sections, results["match"][0]
+
+@app.route('/ats-batch', methods=['POST'])
+def ats_batch_score():
+    """
+    Score many CVs against one or more job descriptions and rank them.
+    CVs: repeated 'cv_files' fields and/or 'cv_zip' archives.
+    Job descriptions: repeated 'job_description' fields or a JSON list in 'job_descriptions'.
+    """
+    uploads = request.files.getlist('cv_files')
+    try:
+        for zip_upload in request.files.getlist('cv_zip'):
+            uploads.extend(ats_batch.uploads_from_zip(zip_upload, ATS_BATCH_MAX_FILES))
+    except Exception as e:
+        return jsonify({"error": f"Failed to read zip: {str(e)}"}), 400
+
+    job_descriptions = [jd for jd in request.form.getlist("job_description") if jd.strip()]
+    if request.form.get("job_descriptions"):
+        try:
+            job_descriptions.extend(jd for jd in json.loads(request.form["job_descriptions"]) if jd.strip())
+        except (ValueError, TypeError, AttributeError):
+            return jsonify({"error": "job_descriptions must be a JSON list of strings"}), 400
+
+    if not uploads:
+        return jsonify({"error": "Missing CV files"}), 400
+    if not job_descriptions:
+        return jsonify({"error": "Missing Job Description"}), 400
+    if len(uploads) > ATS_BATCH_MAX_FILES or len(job_descriptions) > ATS_BATCH_MAX_JOBS:
+        return jsonify({"error": f"Batch limited to {ATS_BATCH_MAX_FILES} CVs and {ATS_BATCH_MAX_JOBS} job descriptions"}), 400
+
+    if request.form.get("scoring", ATS_SCORING_MODE) == "llm":
+        def score_pair(cv_text, job_description):
+            response = chat_completion(
+                messages=prompts.ats_score_messages(cv_text, job_description)
+            )
+            return {"overall_score": ats_batch.parse_llm_score(response.choices[0].message.content)}
+        concurrency = ATS_BATCH_LLM_CONCURRENCY
+    else:
+        terms = {jd: job_terms(jd) for jd in job_descriptions}
+
+        def score_pair(cv_text, job_description):
+            return ats_scoring.score_cv(cv_text, job_description, jd_terms=terms[job_description])
+        concurrency = ATS_BATCH_CONCURRENCY
+
+    result = ats_batch.run_batch(uploads, job_descriptions, metrics.with_labels(extract_text_from_pdf),
+                                 metrics.with_labels(score_pair), concurrency)
+    logger.info("ATS batch: %s pairs in %ss (%s pairs/s)", result['stats']['pairs_scored'],
+                result['stats']['total_seconds'], result['stats']['pairs_per_second'], extra=result['stats'])
+    return jsonify(result), 200
 
 @app.route('/generate-resume-from-job', methods=['POST'])
 def generate_resume_from_job():
@@ -517,39 +811,292 @@ def generate_resume_from_job():
     if not job_description:
         return jsonify({"error": "Missing Job Description"}), 400
 
-    prompt = f"""
-You are a professional resume writer. 
-Based on the following job description, create a comprehensive professional resume in HTML format.
-The resume should be tailored to this specific job and include:
+    # Near-duplicate postings share one cache entry
+    jd_key, _ = jd_index.canonical(job_description)
+    cache_key = make_cache_key("generate-resume-from-job", jd_key, model_router.router.route_model())
+    with tracing.span("cache_lookup") as span:
+        cached_html = response_cache.get(cache_key)
+        span.set(hit=cached_html is not None)
+    metrics.record_cache_lookup("miss" if cached_html is None else "hit")
+    if cached_html is not None:
+        if wants_stream(data):
+            return stream_result(lambda: cached_html, cache_status="HIT")
+        return cached_html, 200, {'Content-Type': 'text/html', 'X-Cache': 'HIT'}
+
+    with tracing.span("prompt_build"):
+        messages = prompts.resume_from_job_messages(job_description)
 
-1. **Professional Summary** (tailored to the job)
-2. **Key Skills** (relevant to the job requirements)
-3. **Professional Experience** (relevant experience that matches the job)
-4. **Education** (appropriate education background)
-5. **Certifications** (if relevant to the job)
-6. **Projects** (relevant projects that demonstrate skills)
+    if wants_stream(data):
+        return stream_html(messages, on_complete=lambda html: response_cache.set(cache_key, html))
 
-Use a professional HTML template with clean styling.
-Focus on keywords and requirements mentioned in the job description.
+    response = chat_completion(messages)
+
+    # Clean the response content to ensure it's proper HTML
+    with tracing.span("post_process"):
+        html_content = clean_html_response(response.choices[0].message.content)
+        response_cache.set(cache_key, html_content)
+    
+    return html_content, 200, {'Content-Type': 'text/html', 'X-Cache': 'MISS'}
 
-Job Description:
-{job_description}
+
+def pdf_export_css(data, html):
+    """Template CSS for HTML sent without its <style> blocks (template / folder in the body)."""
+    if not data.get("template") or pdf_export.has_styles(html):
+        return ""
+    return pdf_export.template_css(get_template(data["template"], folder=data.get("folder", "cv")).html)
+
+
+@app.route('/export-pdf', methods=['POST'])
+def export_pdf():
+    """
+    Render a generated CV or cover letter to PDF.
+    Body: {"html": "...", "filename": "cv.pdf", "template": "cv_1", "folder": "cv"}
+    template / folder are only needed when the HTML does not carry its styles.
     """
+    data = request.get_json(silent=True) or {}
+    html = data.get("html") or ""
+    if not html.strip():
+        return jsonify({"error": "Missing HTML"}), 400
+    try:
+        css = pdf_export_css(data, html)
+    except (FileNotFoundError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    cache_key = make_cache_key("export-pdf", html, css)
+    with tracing.span("cache_lookup") as span:
+        cached_pdf = pdf_cache.get(cache_key)
+        span.set(hit=cached_pdf is not None)
+    metrics.record_cache_lookup("miss" if cached_pdf is None else "hit")
+
+    if cached_pdf is not None:
+        pdf = base64.b64decode(cached_pdf)
+    else:
+        try:
+            with tracing.span("pdf_render") as span:
+                pdf, pages, seconds = pdf_export.export_pdf(html, css)
+                span.set(pages=pages, bytes=len(pdf))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except Exception as e:
+            logger.exception("PDF export error: %s", e)
+            return jsonify({"error": f"Failed to export PDF: {str(e)}"}), 500
+        metrics.pdf_render_seconds.observe(seconds, **metrics.current_labels())
+        pdf_cache.set(cache_key, base64.b64encode(pdf).decode("ascii"))
+
+    filename = pdf_export.safe_filename(data.get("filename"))
+    return Response(pdf, mimetype="application/pdf", headers={
+        "Content-Disposition": f'attachment; filename="{filename}"',
+        "X-Cache": "MISS" if cached_pdf is None else "HIT",
+    })
+
 
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[
-            {"role": "system", "content": "You are a resume generation assistant that outputs results in HTML format only."},
-            {"role": "user", "content": prompt}
-        ]
+# Endpoints that can be run in the background through POST /jobs/<endpoint>
+JOB_ENDPOINTS = [
+    "generate-cv",
+    "generate-cover-letter",
+    "generate-ats-score",
+    "ats-analyze",
+    "generate-resume-from-job",
+]
+
+
+def run_endpoint_job(path, body, content_type, query_string, request_id=None):
+    """Replay a captured request against the app inside a worker thread."""
+    headers = {tracing.REQUEST_ID_HEADER: request_id} if request_id else None
+    with app.test_request_context(path, method="POST", data=body, headers=headers,
+                                  content_type=content_type, query_string=query_string):
+        response = app.full_dispatch_request()
+        response.close()
+
+    content = response.get_json() if response.is_json else response.get_data(as_text=True)
+    if response.status_code >= 400:
+        error = content.get("error") if isinstance(content, dict) else content
+        raise ValueError(error or f"Request failed with status {response.status_code}")
+    return {"status_code": response.status_code, "content_type": response.mimetype, "body": content}
+
+
+@app.route('/jobs/<endpoint>', methods=['POST'])
+def submit_job(endpoint):
+    """
+    Queue a generation and return its job id immediately.
+    Accepts the same payload as the endpoint itself, e.g. POST /jobs/generate-cv.
+    """
+    if endpoint not in JOB_ENDPOINTS:
+        return jsonify({"error": f"Unknown job endpoint: {endpoint}"}), 404
+
+    # Streaming makes no sense for a job, the result is fetched when complete
+    query_string = {k: v for k, v in request.args.items() if k != "stream"}
+    try:
+        job_id = job_queue.submit(
+            endpoint, run_endpoint_job,
+            f"/{endpoint}", request.get_data(), request.content_type, query_string, g.request_id
+        )
+    except QueueFullError as e:
+        return jsonify({"error": str(e)}), 503
+
+    return jsonify({"job_id": job_id, "status": "queued", "status_url": f"/jobs/{job_id}"}), 202
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Return the status of a job and, once completed, its result."""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job)
+
+
+def generate_batch_cv(template_choice, answers, store=None):
+    """
+    Generate one CV of a bulk batch through /generate-cv, at the batch route's
+    priority; store holds the run's prefilled sections (see cv_batch.section_store).
+    """
+    with app.test_request_context("/generate-cv", method="POST",
+                                  json={"template": template_choice, "questionnaire": answers}), \
+            cv_sections.prefilled(store):
+        metrics.reset_labels(route="/generate-cv/batch")
+        response = app.make_response(generate_cv())
+    if response.status_code >= 400:
+        raise ValueError(f"Generation failed with status {response.status_code}")
+    return response.get_data(as_text=True)
+
+
+def cv_batch_dir(batch_id):
+    """Directory of a batch, or None for an unknown or malformed batch id."""
+    if not re.fullmatch(r"[0-9a-f]{32}", batch_id):
+        return None
+    path = os.path.join(CV_BATCH_DIR, batch_id)
+    return path if os.path.isdir(path) else None
+
+
+def run_bulk_cvs(input_path, output, template="cv_1", concurrency=cv_batch.CV_BATCH_CONCURRENCY,
+                 execution=cv_batch.CV_BATCH_EXECUTION, resume=True):
+    """
+    Generate a CV for every row of a CSV / JSONL file into output (directory or .zip).
+    With execution='batch' the prose is generated through the Batch API first
+    into the run's own section store, which the rows are rendered from;
+    sections the batch could not produce fall back to live calls at bulk priority.
+    """
+    metrics.reset_labels(route="/generate-cv/batch")
+    prefill = store = None
+    if execution == "batch":
+        with tracing.span("batch_api"):
+            prefill = cv_batch.prefill_sections(input_path, section_cache, model_router.router.route_model(),
+                                                batch_api, output, resume=resume)
+        store = cv_batch.section_store(output)
+    summary = cv_batch.run_batch(input_path, output, functools.partial(generate_batch_cv, store=store),
+                                 template=template, concurrency=concurrency, resume=resume)
+    summary["execution"] = execution
+    if prefill is not None:
+        summary["batch_api"] = prefill
+    return summary
+
+
+def run_cv_batch(batch_dir):
+    """Run (or resume) the batch stored in batch_dir; the summary becomes the job result."""
+    with open(os.path.join(batch_dir, "batch.json")) as f:
+        settings = json.load(f)
+    return run_bulk_cvs(
+        os.path.join(batch_dir, settings["input"]), os.path.join(batch_dir, "cvs.zip"),
+        template=settings["template"], concurrency=settings["concurrency"],
+        execution=settings.get("execution", "live"),
     )
 
-    # Clean the response content to ensure it's proper HTML
-    html_content = clean_html_response(response.choices[0].message.content)
-    
-    return html_content, 200, {'Content-Type': 'text/html'}
+
+def submit_cv_batch(batch_id, batch_dir):
+    try:
+        job_id = job_queue.submit("generate-cv-batch", run_cv_batch, batch_dir)
+    except QueueFullError as e:
+        return jsonify({"error": str(e)}), 503
+    with open(os.path.join(batch_dir, "job_id"), "w") as f:
+        f.write(job_id)
+    return jsonify({
+        "batch_id": batch_id,
+        "job_id": job_id,
+        "status": "queued",
+        "status_url": f"/generate-cv/batch/{batch_id}",
+    }), 202
+
+
+@app.route('/generate-cv/batch', methods=['POST'])
+def generate_cv_batch():
+    """
+    Generate a CV for every row of an uploaded CSV or JSONL file (`file`) in the background.
+    Optional form fields: `template` (for rows without one), `concurrency` and
+    `execution` ('live', or 'batch' to generate the prose through the Batch API).
+    """
+    upload = request.files.get("file")
+    if upload is None or not upload.filename:
+        return jsonify({"error": "Upload a CSV or JSONL file as 'file'"}), 400
+    try:
+        cv_batch.check_input(upload.filename)
+        concurrency = max(1, min(int(request.form.get("concurrency", cv_batch.CV_BATCH_CONCURRENCY)),
+                                 cv_batch.CV_BATCH_CONCURRENCY))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    execution = request.form.get("execution", cv_batch.CV_BATCH_EXECUTION)
+    if execution not in ("live", "batch"):
+        return jsonify({"error": "execution must be 'live' or 'batch'"}), 400
+
+    batch_id = uuid.uuid4().hex
+    batch_dir = os.path.join(CV_BATCH_DIR, batch_id)
+    os.makedirs(batch_dir)
+    input_name = "input" + os.path.splitext(upload.filename)[1].lower()
+    upload.save(os.path.join(batch_dir, input_name))
+    with open(os.path.join(batch_dir, "batch.json"), "w") as f:
+        json.dump({"input": input_name, "template": request.form.get("template", "cv_1"),
+                   "concurrency": concurrency, "execution": execution, "created_at": time.time()}, f)
+    return submit_cv_batch(batch_id, batch_dir)
+
+
+@app.route('/generate-cv/batch/<batch_id>/resume', methods=['POST'])
+def resume_cv_batch(batch_id):
+    """Resume a batch interrupted by a restart; rows already generated are skipped."""
+    batch_dir = cv_batch_dir(batch_id)
+    if batch_dir is None:
+        return jsonify({"error": "Batch not found"}), 404
+    return submit_cv_batch(batch_id, batch_dir)
+
+
+@app.route('/generate-cv/batch/<batch_id>', methods=['GET'])
+def get_cv_batch(batch_id):
+    """Progress of a batch from its checkpoint, plus its job status and summary once finished."""
+    batch_dir = cv_batch_dir(batch_id)
+    if batch_dir is None:
+        return jsonify({"error": "Batch not found"}), 404
+    job_path = os.path.join(batch_dir, "job_id")
+    job = None
+    if os.path.exists(job_path):
+        with open(job_path) as f:
+            job = job_queue.get(f.read().strip())
+    ready = os.path.exists(os.path.join(batch_dir, "cvs.zip"))
+    return jsonify({
+        "batch_id": batch_id,
+        # Unknown after a restart (unless JOBS_DB_PATH is set): resume the batch
+        "status": job["status"] if job else "interrupted",
+        "progress": cv_batch.progress(os.path.join(batch_dir, "cvs")),
+        "batch_api": cv_batch.batch_api_status(os.path.join(batch_dir, "cvs.zip")),
+        "result": job.get("result") if job else None,
+        "error": job.get("error") if job else None,
+        "download_url": f"/generate-cv/batch/{batch_id}/download" if ready else None,
+    })
+
+
+@app.route('/generate-cv/batch/<batch_id>/download', methods=['GET'])
+def download_cv_batch(batch_id):
+    """Zip of the generated CVs (plus errors.json when rows failed)."""
+    batch_dir = cv_batch_dir(batch_id)
+    zip_path = os.path.join(batch_dir, "cvs.zip") if batch_dir else None
+    if zip_path is None or not os.path.exists(zip_path):
+        return jsonify({"error": "Batch output not ready"}), 404
+    return send_file(os.path.abspath(zip_path), mimetype="application/zip", as_attachment=True,
+                     download_name=f"cvs-{batch_id}.zip")
 
 
 if __name__ == '__main__':
+    # Not at import: cv_batch and app_async import this module without serving it.
+    # In debug mode only the reloader's child process serves requests
+    if PDF_EXPORT_WARM and (not DEBUG or os.environ.get("WERKZEUG_RUN_MAIN") == "true"):
+        pdf_export.start_workers_in_background()
     app.run(host=HOST, port=PORT, debug=DEBUG)
 
@@ -0,0 +1,618 @@
+"""
+Async (ASGI) server for the Resume Builder API.
+Serves the interactive routes of app.py with the same payloads, but uses Quart
+and AsyncOpenAI so a single process can hold many model calls in flight at once.
+The background-job routes (/jobs, /ats-batch and /generate-cv/batch with its
+status, resume and download routes) are served by app.py only. Cache and rate
+limiter calls that may hit SQLite run in worker threads, off the event loop.
+
+Run with an ASGI server, e.g.:
+    hypercorn app_async:app --bind 0.0.0.0:5001
+"""
+
+import asyncio
+import base64
+import datetime
+import logging
+import time
+
+import openai
+from quart import Quart, Response, g, request, jsonify
+from quart_cors import cors
+
+import ats_scoring
+import cl_renderer
+import cv_renderer
+import cv_sections
+import metrics
+import model_router
+import openai_client
+import pdf_export
+import prompts
+import tracing
+from app import (
+    ATS_LLM_SUGGESTIONS, ATS_SCORING_MODE, CL_RENDER_MODE, CV_RENDER_MODE, CV_SECTION_CONCURRENCY,
+    CV_SECTION_MODE, DEBUG, HOST, PDF_EXPORT_WARM, PORT,
+    QUESTIONNAIRE, QUESTIONNAIRE_CL, api_key, clean_html_response,
+    extract_text_from_pdf, get_template, jd_index, job_terms, pdf_cache, pdf_export_css, response_cache,
+    section_cache, template_registry, text_cache,
+)
+from response_cache import make_cache_key
+from streaming import HTMLStreamCleaner, sse_event
+
+logger = logging.getLogger(__name__)
+
+# Non-blocking OpenAI client shared by all requests
+client = openai_client.create_async_client(api_key)
+
+app = cors(Quart(__name__), allow_origin="*")
+
+
+@app.before_serving
+async def warm_pdf_workers():
+    if PDF_EXPORT_WARM:
+        pdf_export.start_workers_in_background()
+
+
+@app.before_request
+async def start_request_metrics():
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    g.request_started = time.perf_counter()
+    g.request_id, g.trace = tracing.start_trace(
+        f"{request.method} {route}", request.headers.get(tracing.REQUEST_ID_HEADER), route=route
+    )
+    metrics.start_request(route)
+
+
+@app.after_request
+async def finish_request_metrics(response):
+    response.headers[tracing.REQUEST_ID_HEADER] = g.request_id
+    # Quart has no close hook; streamed responses are timed until the headers are sent
+    labels = metrics.current_labels()
+    metrics.finish_request(labels, response.status_code, time.perf_counter() - g.request_started)
+    g.trace.set(status=response.status_code, **labels)
+    g.trace.end()
+    return response
+
+
+@app.errorhandler(openai.APIError)
+@app.errorhandler(openai_client.CircuitOpenError)
+@app.errorhandler(openai_client.ThrottledError)
+async def model_unavailable(e):
+    """Model failures not handled by a route: 503 when the upstream is degraded."""
+    logger.error("Model call failed: %s", e)
+    status, headers = openai_client.error_status(e)
+    return jsonify({"error": f"Failed to generate: {str(e)}"}), status, headers
+
+
+async def chat_completion(messages, **kwargs):
+    """Run a chat completion on the routed model tier, recording its latency, token usage and cost."""
+    tier, model = model_router.router.select()
+    started = time.perf_counter()
+    with tracing.span("model_call", model=model, tier=tier) as span:
+        try:
+            response = await openai_client.acreate_completion(client, model=model, messages=messages, **kwargs)
+        except Exception as e:
+            metrics.record_model_error(model, e)
+            raise
+        seconds = time.perf_counter() - started
+        metrics.record_completion(model, seconds, response.usage, tier=tier)
+        model_router.router.observe(tier, seconds)
+        if response.usage:
+            span.set(prompt_tokens=response.usage.prompt_tokens,
+                     completion_tokens=response.usage.completion_tokens)
+    return response
+
+
+def wants_stream(data=None):
+    """Return True if the caller opted in to a streamed (SSE) response."""
+    value = request.args.get("stream") or (data or {}).get("stream")
+    return str(value).lower() in ("1", "true", "yes")
+
+
+def sse_response(events):
+    """
+    Wrap an async event generator in a Server-Sent Events response. Quart sends
+    the body from the request's task, so metric labels and trace spans carry over.
+    """
+    response = Response(events, mimetype="text/event-stream",
+                        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    response.timeout = None
+    return response
+
+
+def stream_html(messages, on_complete=None, restorer=None):
+    """
+    Stream model output as SSE 'chunk' events, cleaning code fences on the fly.
+    restorer (see token_budget.CompactTemplate) puts stripped template CSS back.
+    """
+    async def generate():
+        cleaner = HTMLStreamCleaner()
+        parts = []
+        usage = None
+        started = time.perf_counter()
+        first_token = None
+        tier, model = model_router.router.select()
+        try:
+            with tracing.span("model_call", model=model, tier=tier, stream=True) as span:
+                stream = await openai_client.acreate_completion(
+                    client, model=model, messages=messages, stream=True,
+                    stream_options={"include_usage": True}
+                )
+                async for chunk in stream:
+                    usage = chunk.usage or usage
+                    if not chunk.choices or not chunk.choices[0].delta.content:
+                        continue
+                    if first_token is None:
+                        first_token = time.perf_counter() - started
+                    text = cleaner.feed(chunk.choices[0].delta.content)
+                    if restorer:
+                        text = restorer.feed(text)
+                    if text:
+                        parts.append(text)
+                        yield sse_event("chunk", {"html": text})
+                text = cleaner.finish()
+                if restorer:
+                    text = restorer.feed(text) + restorer.finish()
+                if text:
+                    parts.append(text)
+                    yield sse_event("chunk", {"html": text})
+                metrics.record_completion(model, time.perf_counter() - started, usage, first_token, tier=tier)
+                if first_token is not None:
+                    model_router.router.observe(tier, first_token)
+                if usage:
+                    span.set(prompt_tokens=usage.prompt_tokens, completion_tokens=usage.completion_tokens)
+            if on_complete:
+                await asyncio.to_thread(on_complete, "".join(parts))
+            yield sse_event("done", {})
+        except Exception as e:
+            metrics.record_model_error(model, e)
+            logger.error("Streaming error: %s", e)
+            yield sse_event("error", {"error": f"Failed to generate: {str(e)}"})
+
+    return sse_response(generate())
+
+
+def stream_result(build_html, cache_status="MISS"):
+    """Stream a result assembled on the server; build_html is a coroutine function."""
+    async def generate():
+        yield ": generating\n\n"
+        try:
+            yield sse_event("chunk", {"html": await build_html()})
+            yield sse_event("done", {"cache": cache_status})
+        except Exception as e:
+            logger.error("Streaming error: %s", e)
+            yield sse_event("error", {"error": f"Failed to generate: {str(e)}"})
+
+    return sse_response(generate())
+
+
+async def complete_html(messages):
+    """Run a completion and return the cleaned HTML."""
+    response = await chat_completion(messages)
+    with tracing.span("post_process"):
+        return clean_html_response(response.choices[0].message.content)
+
+
+async def local_ats_report(cv_text, job_description, suggestions=True):
+    """Score the CV locally; the model is only asked for the suggestions."""
+    with tracing.span("scoring"):
+        score = ats_scoring.score_cv(cv_text, job_description, jd_terms=job_terms(job_description))
+    suggestions_html = None
+    if suggestions:
+        with tracing.span("prompt_build"):
+            messages = prompts.ats_suggestions_messages(cv_text, job_description, score)
+        suggestions_html = await complete_html(messages)
+    with tracing.span("render"):
+        return score, ats_scoring.render_score_html(score, suggestions_html)
+
+
+async def run_all_analyses(cv_text, job_description, local_scoring=True, suggestions=True):
+    """Run every analysis type concurrently; returns (combined_html, sections, score)."""
+    async def run_analysis(analysis_type):
+        # Each gathered task runs in its own copy of the context
+        metrics.set_labels(analysis_type=analysis_type)
+        with tracing.span("analysis", analysis_type=analysis_type):
+            if analysis_type == "match" and local_scoring:
+                return await local_ats_report(cv_text, job_description, suggestions)
+            messages = prompts.ats_analysis_messages(cv_text, job_description, analysis_type)
+            return None, await complete_html(messages)
+
+    results = dict(zip(
+        prompts.ANALYSIS_TYPES,
+        await asyncio.gather(*(run_analysis(t) for t in prompts.ANALYSIS_TYPES))
+    ))
+    sections = {analysis_type: html for analysis_type, (_, html) in results.items()}
+    combined = "".join(
+        f'<section class="ats-{analysis_type}">{html}</section>' for analysis_type, html in sections.items()
+    )
+    return combined, sections, results["match"][0]
+
+
+def wants_local_scoring(form):
+    """Return (local, suggestions) flags for the ATS endpoints."""
+    local = form.get("scoring", ATS_SCORING_MODE) == "local"
+    suggestions = form.get("suggestions", str(ATS_LLM_SUGGESTIONS)).lower() == "true"
+    return local, suggestions
+
+
+@app.route('/health', methods=['GET'])
+async def health_check():
+    """Health check endpoint"""
+    return jsonify({
+        "status": "healthy",
+        "message": "Resume Builder API is running (async)",
+        "templates": template_registry.names("cv"),
+        "cover_letter_templates": template_registry.names("cl"),
+        "cache": response_cache.stats(),
+        "job_descriptions": jd_index.stats(),
+        "pdf_cache": pdf_cache.stats(),
+        "section_cache": section_cache.stats(),
+        "in_flight": metrics.in_flight(),
+        "openai": openai_client.breaker.stats(),
+        "rate_limiter": await asyncio.to_thread(openai_client.limiter.stats),
+        "model_tiers": model_router.router.stats(),
+        "timestamp": str(datetime.datetime.now())
+    })
+
+
+@app.route('/metrics', methods=['GET'])
+async def get_metrics():
+    """Prometheus metrics for this process."""
+    body = metrics.render_prometheus({"response": response_cache, "text": text_cache, "pdf": pdf_cache, "cv_sections": section_cache})
+    return body, 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
+
+@app.route('/questionnaire', methods=['GET'])
+async def get_questionnaire():
+    """Return hardcoded questionnaire with template info."""
+    return jsonify({
+        "template": request.args.get("template", "cv_1"),
+        "questionnaire": QUESTIONNAIRE
+    })
+
+
+@app.route('/questionnaire-cover-letter', methods=['GET'])
+async def get_questionnaire_cover_letter():
+    """Return questionnaire for Cover Letter."""
+    return jsonify({
+        "template": request.args.get("template", "cl"),
+        "questionnaire": QUESTIONNAIRE_CL
+    })
+
+
+@app.route('/generate-cv', methods=['POST'])
+async def generate_cv():
+    """Async version of app.generate_cv."""
+    data = await request.get_json()
+    template_choice = data.get("template", "cv_1")
+    answers = data.get("questionnaire", {})
+    stream = wants_stream(data)
+
+    with tracing.span("template_load", template=template_choice):
+        template = get_template(f"{template_choice}.html", folder="cv")
+    cv_template = template.html
+
+    render_mode = data.get("render_mode", CV_RENDER_MODE)
+    if render_mode == "local" and not cv_renderer.supports_template(template_choice):
+        render_mode = "llm"
+
+    cache_key = make_cache_key("generate-cv", render_mode, template_choice, template.digest, answers, model_router.router.route_model())
+    with tracing.span("cache_lookup") as span:
+        cached_html = await asyncio.to_thread(response_cache.get, cache_key)
+        span.set(hit=cached_html is not None)
+    metrics.record_cache_lookup("miss" if cached_html is None else "hit")
+    if cached_html is not None:
+        if stream:
+            async def cached():
+                return cached_html
+            return stream_result(cached, cache_status="HIT")
+        return cached_html, 200, {'Content-Type': 'text/html', 'X-Cache': 'HIT'}
+
+    if render_mode == "local":
+        async def build_html():
+            html_content = await generate_cv_local(template_choice, cv_template, answers,
+                                                   data.get("section_mode", CV_SECTION_MODE))
+            await asyncio.to_thread(response_cache.set, cache_key, html_content)
+            return html_content
+
+        if stream:
+            return stream_result(build_html)
+        return await build_html(), 200, {'Content-Type': 'text/html', 'X-Cache': 'MISS'}
+
+    with tracing.span("prompt_build"):
+        compact = template.compact
+        messages = prompts.cv_messages(compact.html, answers)
+    if stream:
+        return stream_html(messages, on_complete=lambda html: response_cache.set(cache_key, html),
+                           restorer=compact.stream_restorer())
+
+    html_content = await complete_html(messages)
+    with tracing.span("post_process"):
+        html_content = compact.restore(html_content)
+        await asyncio.to_thread(response_cache.set, cache_key, html_content)
+    return html_content, 200, {'Content-Type': 'text/html', 'X-Cache': 'MISS'}
+
+
+async def generate_cv_sections(sections):
+    """Generate the prose of the given sections in one JSON completion."""
+    with tracing.span("prompt_build"):
+        messages = prompts.cv_section_messages(sections)
+    response = await chat_completion(messages, response_format=prompts.JSON_RESPONSE_FORMAT)
+    generated = cv_sections.parse_sections(response.choices[0].message.content, sections)
+    model_router.router.record_quality(len(generated) == len(sections))
+    await asyncio.to_thread(cv_sections.store_outputs, section_cache, sections, generated)
+    return generated
+
+
+async def generate_cv_local(template_choice, cv_template, answers, section_mode=CV_SECTION_MODE):
+    """Render the CV locally and only ask the model for the prose of the sections not cached."""
+    with tracing.span("section_cache") as span:
+        sections = cv_sections.plan_sections(answers, model_router.router.route_model())
+        outputs, missing = await asyncio.to_thread(cv_sections.cached_outputs, section_cache, sections)
+        span.set(reused=len(outputs), generate=len(missing))
+    if section_mode == "fanout" and len(missing) > 1:
+        semaphore = asyncio.Semaphore(CV_SECTION_CONCURRENCY)
+
+        async def run_section(section):
+            async with semaphore:
+                with tracing.span("section", section=section.id):
+                    return await generate_cv_sections([section])
+
+        for generated in await asyncio.gather(*(run_section(s) for s in missing)):
+            outputs.update(generated)
+    elif missing:
+        outputs.update(await generate_cv_sections(missing))
+    narrative = cv_sections.to_narrative(sections, outputs)
+
+    with tracing.span("render", template=template_choice):
+        return cv_renderer.render_cv(template_choice, cv_template, answers, narrative)
+
+
+@app.route('/generate-cover-letter', methods=['POST'])
+async def generate_cover_letter():
+    """Async version of app.generate_cover_letter."""
+    data = await request.get_json()
+    template_choice = data.get("template", "cl")
+    job_data = data.get("job", {})
+    applicant_data = data.get("applicant", {})
+    stream = wants_stream(data)
+
+    with tracing.span("template_load", template=template_choice):
+        template = get_template(f"{template_choice}.html", folder="cl")
+    cl_template = template.html
+
+    render_mode = data.get("render_mode", CL_RENDER_MODE)
+    if render_mode == "local" and not cl_renderer.supports_template(cl_template):
+        render_mode = "llm"
+
+    cache_key = make_cache_key(
+        "generate-cover-letter", render_mode, template_choice, template.digest,
+        {"job": job_data, "applicant": applicant_data}, model_router.router.route_model()
+    )
+    with tracing.span("cache_lookup") as span:
+        cached_html = await asyncio.to_thread(response_cache.get, cache_key)
+        span.set(hit=cached_html is not None)
+    metrics.record_cache_lookup("miss" if cached_html is None else "hit")
+    if cached_html is not None:
+        if stream:
+            async def cached():
+                return cached_html
+            return stream_result(cached, cache_status="HIT")
+        return cached_html, 200, {'Content-Type': 'text/html', 'X-Cache': 'HIT'}
+
+    if render_mode == "local":
+        async def build_html():
+            with tracing.span("prompt_build"):
+                messages = prompts.cover_letter_paragraph_messages(job_data, applicant_data)
+            response = await chat_completion(messages, response_format=prompts.JSON_RESPONSE_FORMAT)
+            paragraphs = cl_renderer.parse_paragraphs(response.choices[0].message.content)
+            model_router.router.record_quality(bool(paragraphs))
+            with tracing.span("render"):
+                html_content = cl_renderer.render_cover_letter(cl_template, job_data, applicant_data, paragraphs)
+            await asyncio.to_thread(response_cache.set, cache_key, html_content)
+            return html_content
+
+        if stream:
+            return stream_result(build_html)
+        return await build_html(), 200, {'Content-Type': 'text/html', 'X-Cache': 'MISS'}
+
+    with tracing.span("prompt_build"):
+        compact = template.compact
+        messages = prompts.cover_letter_messages(compact.html, job_data, applicant_data)
+    if stream:
+        return stream_html(messages, on_complete=lambda html: response_cache.set(cache_key, html),
+                           restorer=compact.stream_restorer())
+
+    html_content = await complete_html(messages)
+    with tracing.span("post_process"):
+        html_content = compact.restore(html_content)
+        await asyncio.to_thread(response_cache.set, cache_key, html_content)
+    return html_content, 200, {'Content-Type': 'text/html', 'X-Cache': 'MISS'}
+
+
+@app.route('/generate-ats-score', methods=['POST'])
+async def generate_ats_score():
+    """Async version of app.generate_ats_score."""
+    files = await request.files
+    form = await request.form
+    if 'cv' not in files:
+        return jsonify({"error": "Missing CV PDF file"}), 400
+
+    job_description = form.get("job_description", "")
+    if not job_description:
+        return jsonify({"error": "Missing Job Description"}), 400
+
+    # PDF parsing is CPU-bound, keep it off the event loop
+    cv_text = await asyncio.to_thread(extract_text_from_pdf, files['cv'])
+
+    local, suggestions = wants_local_scoring(form)
+    if local:
+        async def build_html():
+            return (await local_ats_report(cv_text, job_description, suggestions))[1]
+
+        if wants_stream(form):
+            return stream_result(build_html)
+        score, html_content = await local_ats_report(cv_text, job_description, suggestions)
+        if request.args.get("format") == "json":
+            return jsonify({"score": score, "response": html_content}), 200
+        return html_content, 200, {'Content-Type': 'text/html'}
+
+    with tracing.span("prompt_build"):
+        messages = prompts.ats_score_messages(cv_text, job_description)
+
+    if wants_stream(form):
+        return stream_html(messages)
+
+    html_content = await complete_html(messages)
+    return html_content, 200, {'Content-Type': 'text/html'}
+
+
+@app.route('/ats-analyze', methods=['POST'])
+async def ats_analyze():
+    """Async version of app.ats_analyze."""
+    files = await request.files
+    form = await request.form
+    if 'pdf_file' not in files:
+        return jsonify({"error": "Missing PDF file"}), 400
+
+    job_description = form.get("job_description", "")
+    analysis_type = form.get("analysis_type", "match")
+    # Used as a metric label and to pick the model tier, so only known types get through
+    if analysis_type not in prompts.ANALYSIS_TYPES + ["all"]:
+        return jsonify({"error": f"analysis_type must be one of: {', '.join(prompts.ANALYSIS_TYPES)}, all"}), 400
+    metrics.set_labels(analysis_type=analysis_type)
+    if not job_description:
+        return jsonify({"error": "Missing Job Description"}), 400
+
+    try:
+        cv_text = await asyncio.to_thread(extract_text_from_pdf, files['pdf_file'])
+        if not cv_text or len(cv_text.strip()) < 10:
+            return jsonify({"error": "Could not extract text from PDF. Please ensure the PDF contains readable text."}), 400
+    except Exception as e:
+        logger.warning("PDF extraction error: %s", e)
+        return jsonify({"error": f"Failed to process PDF: {str(e)}"}), 400
+
+    local, suggestions = wants_local_scoring(form)
+    if analysis_type == "all":
+        async def build_all():
+            return (await run_all_analyses(cv_text, job_description, local, suggestions))[0]
+
+        if wants_stream(form):
+            return stream_result(build_all)
+        try:
+            html_content, sections, score = await run_all_analyses(cv_text, job_description, local, suggestions)
+            return jsonify({"response": html_content, "sections": sections, "score": score}), 200
+        except Exception as e:
+            logger.exception("AI generation error: %s", e)
+            status, headers = openai_client.error_status(e)
+            return jsonify({"error": f"Failed to generate analysis: {str(e)}"}), status, headers
+
+    if analysis_type == "match" and local:
+        async def build_html():
+            return (await local_ats_report(cv_text, job_description, suggestions))[1]
+
+        if wants_stream(form):
+            return stream_result(build_html)
+        try:
+            score, html_content = await local_ats_report(cv_text, job_description, suggestions)
+            return jsonify({"response": html_content, "score": score}), 200
+        except Exception as e:
+            logger.exception("AI generation error: %s", e)
+            status, headers = openai_client.error_status(e)
+            return jsonify({"error": f"Failed to generate analysis: {str(e)}"}), status, headers
+
+    with tracing.span("prompt_build"):
+        messages = prompts.ats_analysis_messages(cv_text, job_description, analysis_type)
+    if wants_stream(form):
+        return stream_html(messages)
+
+    try:
+        html_content = await complete_html(messages)
+        usable = bool(html_content) and len(html_content.strip()) >= 50
+        model_router.router.record_quality(usable)
+        if not usable:
+            return jsonify({"error": "AI response was too short or empty. Please try again."}), 500
+        return jsonify({"response": html_content}), 200
+    except Exception as e:
+        logger.exception("AI generation error: %s", e)
+        status, headers = openai_client.error_status(e)
+        return jsonify({"error": f"Failed to generate analysis: {str(e)}"}), status, headers
+
+
+@app.route('/generate-resume-from-job', methods=['POST'])
+async def generate_resume_from_job():
+    """Async version of app.generate_resume_from_job."""
+    data = await request.get_json()
+    job_description = data.get("job_description", "")
+    if not job_description:
+        return jsonify({"error": "Missing Job Description"}), 400
+
+    jd_key, _ = jd_index.canonical(job_description)
+    cache_key = make_cache_key("generate-resume-from-job", jd_key, model_router.router.route_model())
+    with tracing.span("cache_lookup") as span:
+        cached_html = await asyncio.to_thread(response_cache.get, cache_key)
+        span.set(hit=cached_html is not None)
+    metrics.record_cache_lookup("miss" if cached_html is None else "hit")
+    if cached_html is not None:
+        if wants_stream(data):
+            async def cached():
+                return cached_html
+            return stream_result(cached, cache_status="HIT")
+        return cached_html, 200, {'Content-Type': 'text/html', 'X-Cache': 'HIT'}
+
+    with tracing.span("prompt_build"):
+        messages = prompts.resume_from_job_messages(job_description)
+    if wants_stream(data):
+        return stream_html(messages, on_complete=lambda html: response_cache.set(cache_key, html))
+
+    html_content = await complete_html(messages)
+    await asyncio.to_thread(response_cache.set, cache_key, html_content)
+    return html_content, 200, {'Content-Type': 'text/html', 'X-Cache': 'MISS'}
+
+
+
+@app.route('/export-pdf', methods=['POST'])
+async def export_pdf():
+    """Async version of app.export_pdf; rendering runs in the shared export workers."""
+    data = await request.get_json(silent=True) or {}
+    html = data.get("html") or ""
+    if not html.strip():
+        return jsonify({"error": "Missing HTML"}), 400
+    try:
+        css = pdf_export_css(data, html)
+    except (FileNotFoundError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    cache_key = make_cache_key("export-pdf", html, css)
+    with tracing.span("cache_lookup") as span:
+        cached_pdf = await asyncio.to_thread(pdf_cache.get, cache_key)
+        span.set(hit=cached_pdf is not None)
+    metrics.record_cache_lookup("miss" if cached_pdf is None else "hit")
+
+    if cached_pdf is not None:
+        pdf = base64.b64decode(cached_pdf)
+    else:
+        try:
+            with tracing.span("pdf_render") as span:
+                pdf, pages, seconds = await asyncio.wait_for(
+                    asyncio.wrap_future(pdf_export.submit(html, css)), pdf_export.PDF_EXPORT_TIMEOUT
+                )
+                span.set(pages=pages, bytes=len(pdf))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except Exception as e:
+            logger.exception("PDF export error: %s", e)
+            return jsonify({"error": f"Failed to export PDF: {str(e)}"}), 500
+        metrics.pdf_render_seconds.observe(seconds, **metrics.current_labels())
+        await asyncio.to_thread(pdf_cache.set, cache_key, base64.b64encode(pdf).decode("ascii"))
+
+    filename = pdf_export.safe_filename(data.get("filename"))
+    return Response(pdf, mimetype="application/pdf", headers={
+        "Content-Disposition": f'attachment; filename="{filename}"',
+        "X-Cache": "MISS" if cached_pdf is None else "HIT",
+    })
+
+
+if __name__ == '__main__':
+    app.run(host=HOST, port=PORT, debug=DEBUG)
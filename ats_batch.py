@@ -0,0 +1,129 @@
+"""
+Batch ATS scoring: many CVs against one or more job descriptions.
+Text extraction and scoring run on a bounded thread pool; the result is a
+ranking per job description plus throughput figures for the batch.
+"""
+
+import io
+import re
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.datastructures import FileStorage
+
+from pdf_extraction import PDF_MAX_BYTES
+
+SUPPORTED_EXTENSIONS = (".pdf", ".txt")
+
+# The score report marks its overall score (see prompts.ats_score_messages)
+SCORE_ATTRIBUTE = re.compile(r"""data-ats-score\s*=\s*["']?(\d{1,3})""", re.I)
+# Reports without the mark: the first percentage after the "Overall ATS Score" heading
+OVERALL_SCORE = re.compile(r"overall\s+ats\s+score\D{0,80}?(\d{1,3})\s*(?:%|/\s*100)", re.I)
+HIDDEN_BLOCKS = re.compile(r"<(style|script)\b.*?</\1\s*>", re.I | re.S)
+TAG = re.compile(r"<[^>]*>")
+
+
+def uploads_from_zip(zip_upload, max_files):
+    """Unpack the PDFs/text files in an uploaded zip into FileStorage objects."""
+    uploads = []
+    with zipfile.ZipFile(zip_upload.stream) as archive:
+        for info in archive.infolist():
+            name = info.filename
+            if info.is_dir() or name.startswith("__MACOSX/") or not name.lower().endswith(SUPPORTED_EXTENSIONS):
+                continue
+            if info.file_size > PDF_MAX_BYTES:
+                raise ValueError(f"{name} is larger than the {PDF_MAX_BYTES // (1024 * 1024)} MB limit")
+            if len(uploads) >= max_files:
+                raise ValueError(f"Zip contains more than {max_files} CVs")
+            uploads.append(FileStorage(stream=io.BytesIO(archive.read(info)), filename=name.rsplit("/", 1)[-1]))
+    return uploads
+
+
+def parse_llm_score(html_content):
+    """
+    Pull the overall score out of an LLM-generated ATS report. Without the
+    data-ats-score mark, only the report's text is searched, so CSS such as
+    width:100% or a sub-score is never taken for the overall score.
+    Raises ValueError when the report has no overall score, so the pair is
+    reported as an error instead of ranking last with 0.
+    """
+    html_content = html_content or ""
+    match = SCORE_ATTRIBUTE.search(html_content)
+    if match is None:
+        text = TAG.sub(" ", HIDDEN_BLOCKS.sub(" ", html_content))
+        match = OVERALL_SCORE.search(text)
+    if match is None:
+        raise ValueError("No overall score found in the ATS report")
+    return min(100, int(match.group(1)))
+
+
+def run_batch(uploads, job_descriptions, extract_text, score_pair, concurrency):
+    """
+    Extract every CV, score every (CV, job description) pair and rank the CVs
+    per job description. score_pair(cv_text, job_description) returns a dict
+    with at least an "overall_score".
+    """
+    started = time.perf_counter()
+    errors = []
+
+    def safe_extract(upload):
+        try:
+            return extract_text(upload)
+        except Exception as e:
+            errors.append({"cv": upload.filename, "error": str(e)})
+            return None
+
+    def safe_score(pair):
+        cv_index, job_index = pair
+        try:
+            return cv_index, job_index, score_pair(texts[cv_index], job_descriptions[job_index])
+        except Exception as e:
+            errors.append({"cv": uploads[cv_index].filename, "job_index": job_index, "error": str(e)})
+            return cv_index, job_index, None
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        texts = list(pool.map(safe_extract, uploads))
+        extracted_at = time.perf_counter()
+        pairs = [
+            (cv_index, job_index)
+            for cv_index, text in enumerate(texts) if text
+            for job_index in range(len(job_descriptions))
+        ]
+        scored = list(pool.map(safe_score, pairs))
+
+    rankings = []
+    for job_index, job_description in enumerate(job_descriptions):
+        results = [
+            {
+                "cv": uploads[cv_index].filename,
+                "score": score["overall_score"],
+                "matched_keywords": score.get("matched_keywords", []),
+                "missing_keywords": score.get("missing_keywords", []),
+            }
+            for cv_index, scored_job, score in scored
+            if scored_job == job_index and score is not None
+        ]
+        results.sort(key=lambda r: r["score"], reverse=True)
+        for rank, result in enumerate(results, start=1):
+            result["rank"] = rank
+        rankings.append({
+            "job_index": job_index,
+            "job_description": job_description[:200],
+            "results": results,
+        })
+
+    elapsed = time.perf_counter() - started
+    return {
+        "rankings": rankings,
+        "errors": errors,
+        "stats": {
+            "cvs": len(uploads),
+            "job_descriptions": len(job_descriptions),
+            "pairs_scored": len(pairs),
+            "extraction_seconds": round(extracted_at - started, 3),
+            "total_seconds": round(elapsed, 3),
+            "cvs_per_second": round(len(uploads) / elapsed, 2) if elapsed else None,
+            "pairs_per_second": round(len(pairs) / elapsed, 2) if elapsed else None,
+        },
+    }
@@ -0,0 +1,246 @@
+"""
+Local, deterministic ATS scoring.
+Tokenizes the CV and job description, weights job-description keywords by their
+frequency in the job description with BM25's saturation curve (there is no IDF:
+a single job description has no corpus; skills vocabulary terms count double)
+and reports the overall score, matched/missing keywords and per-section scores.
+"""
+
+import datetime
+import re
+from collections import Counter
+from html import escape
+
+# Seed vocabulary, grouped like the "skills" section of the questionnaire
+SKILL_VOCABULARY = {
+    "languages": [
+        "python", "java", "javascript", "typescript", "c", "c++", "c#", "go", "golang", "rust",
+        "ruby", "php", "swift", "kotlin", "scala", "r", "matlab", "sql", "bash", "dart",
+        "html", "css",
+    ],
+    "frameworks": [
+        "react", "angular", "vue", "django", "flask", "fastapi", "spring", "express", "node.js",
+        "next.js", ".net", "rails", "laravel", "flutter", "tensorflow", "pytorch", "keras",
+        "scikit-learn", "pandas", "numpy", "spark", "hadoop", "bootstrap", "tailwind",
+    ],
+    "tools": [
+        "git", "github", "gitlab", "docker", "kubernetes", "jenkins", "aws", "azure", "gcp",
+        "terraform", "ansible", "linux", "jira", "figma", "excel", "tableau", "power bi",
+        "postgresql", "mysql", "mongodb", "redis", "elasticsearch", "kafka", "airflow",
+        "graphql", "rest", "ci/cd",
+    ],
+    "technical_skills": [
+        "machine learning", "deep learning", "data analysis", "data science", "nlp",
+        "computer vision", "statistics", "microservices", "api", "testing", "devops",
+        "cloud", "security", "agile", "scrum", "etl", "data visualization", "frontend",
+        "backend", "full-stack", "database", "distributed systems", "algorithms",
+    ],
+    "soft_skills": [
+        "communication", "leadership", "teamwork", "collaboration", "problem solving",
+        "mentoring", "stakeholder management", "time management", "ownership",
+    ],
+}
+
+SKILL_TERMS = {term for terms in SKILL_VOCABULARY.values() for term in terms}
+SKILL_PHRASES = sorted((t for t in SKILL_TERMS if " " in t), key=len, reverse=True)
+
+EDUCATION_TERMS = ["phd", "doctorate", "master", "masters", "msc", "mba", "bachelor", "bachelors", "bsc", "degree", "diploma"]
+
+STOPWORDS = set("""
+a about above after again against all also am an and any are as at be because been before being
+below between both but by can could did do does doing down during each etc few for from further had
+has have having he her here hers him his how i if in into is it its itself just looking may me
+more most must my need needs no nor not now of off on once only or other our ours out over own
+per plus preferred required requirements responsibilities role same she should so some such than
+that the their theirs them then there these they this those through to too under until up us using
+very via was we well were what when where which while who whom why will with within work working
+would years year you your team teams strong experience ability able knowledge skills skill good
+excellent including candidate candidates job company position apply join new use based etc
+""".split())
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#./-]*[a-z0-9+#]|[a-z0-9]")
+YEARS_PATTERN = re.compile(r"(\d+)\s*\+?\s*(?:years|yrs)", re.IGNORECASE)
+# "2015 - 2022", "Jan 2015 – Mar 2022", "03/2018 to present"
+DATE_RANGE = re.compile(
+    r"\b((?:19|20)\d{2})\s*(?:-|–|—|to|until)\s*(?:[a-z]{3,9}\.?\s+|\d{1,2}/)?((?:19|20)\d{2}|present|current|now|today)\b",
+    re.IGNORECASE,
+)
+EXPERIENCE_HEADINGS = {"experience", "work experience", "professional experience", "employment",
+                       "employment history", "work history", "career history"}
+OTHER_HEADINGS = {"education", "skills", "technical skills", "projects", "certifications", "languages",
+                  "summary", "profile", "interests", "awards", "publications", "references", "volunteering"}
+# Lines naming a school or degree are education dates, not experience
+NOT_EXPERIENCE = set(EDUCATION_TERMS) | {"university", "college", "school", "graduated", "graduation"}
+
+# BM25 saturation parameter for job-description term frequency
+K1 = 1.2
+
+
+def tokenize(text):
+    """Lowercase and split text into tokens, keeping terms like c++, c# and node.js."""
+    return [t.strip(".") for t in TOKEN_PATTERN.findall((text or "").lower()) if t.strip(".")]
+
+
+def extract_terms(text):
+    """Return a Counter of keyword terms (skill phrases plus single tokens) in text."""
+    lowered = " " + " ".join(tokenize(text)) + " "
+    terms = Counter()
+    for phrase in SKILL_PHRASES:
+        count = lowered.count(f" {phrase} ")
+        if count:
+            terms[phrase] += count
+            lowered = lowered.replace(f" {phrase} ", " ")
+    for token in lowered.split():
+        if token in SKILL_TERMS or (token not in STOPWORDS and len(token) > 2 and not token.isdigit()):
+            terms[token] += 1
+    return terms
+
+
+def term_weight(term, frequency):
+    """Saturating weight of a term's job-description frequency (BM25's TF part); skills terms count double."""
+    weight = frequency * (K1 + 1) / (frequency + K1)
+    return weight * (2.0 if term in SKILL_TERMS else 1.0)
+
+
+def experience_years(cv_text):
+    """
+    Years covered by the date ranges of the CV's experience entries: those in
+    an experience section when the CV has one, skipping education lines.
+    Overlapping jobs are only counted once.
+    """
+    lines = (cv_text or "").splitlines()
+    headings = {line.strip().rstrip(":").lower() for line in lines}
+    if headings & EXPERIENCE_HEADINGS:
+        section, in_experience = [], False
+        for line in lines:
+            heading = line.strip().rstrip(":").lower()
+            if heading in EXPERIENCE_HEADINGS or heading in OTHER_HEADINGS:
+                in_experience = heading in EXPERIENCE_HEADINGS
+            elif in_experience:
+                section.append(line)
+        lines = section
+
+    this_year = datetime.date.today().year
+    ranges = []
+    for line in lines:
+        if NOT_EXPERIENCE & set(tokenize(line)):
+            continue
+        for start, end in DATE_RANGE.findall(line):
+            end = int(end) if end.isdigit() else this_year
+            if int(start) <= end <= this_year:
+                ranges.append((int(start), end))
+
+    years = covered_until = 0
+    for start, end in sorted(ranges):
+        years += max(0, end - max(start, covered_until))
+        covered_until = max(covered_until, end)
+    return years
+
+
+def _percentage(matched, total):
+    return round(100 * matched / total) if total else 100
+
+
+def score_cv(cv_text, job_description, max_keywords=40, jd_terms=None):
+    """
+    Score a CV against a job description; returns a JSON-serializable dict.
+    jd_terms, if given, are the precomputed extract_terms() of the job description.
+    """
+    cv_terms = extract_terms(cv_text)
+    if jd_terms is None:
+        jd_terms = extract_terms(job_description)
+
+    weights = {term: term_weight(term, count) for term, count in jd_terms.items()}
+    ranked = sorted(weights, key=lambda t: (-weights[t], t))[:max_keywords]
+
+    matched = [t for t in ranked if t in cv_terms]
+    missing = [t for t in ranked if t not in cv_terms]
+    total_weight = sum(weights[t] for t in ranked)
+    keyword_score = _percentage(sum(weights[t] for t in matched), total_weight)
+
+    jd_skills = [t for t in ranked if t in SKILL_TERMS]
+    skills_table = [{"skill": t, "in_cv": t in cv_terms} for t in jd_skills]
+    skills_score = _percentage(sum(1 for row in skills_table if row["in_cv"]), len(skills_table))
+
+    required_years = max((int(y) for y in YEARS_PATTERN.findall(job_description or "")), default=0)
+    cv_years = max((int(y) for y in YEARS_PATTERN.findall(cv_text or "")), default=0)
+    cv_years = max(cv_years, experience_years(cv_text))
+    experience_score = min(100, _percentage(cv_years, required_years)) if required_years else keyword_score
+
+    jd_education = [t for t in EDUCATION_TERMS if t in jd_terms]
+    cv_education = [t for t in EDUCATION_TERMS if t in cv_terms]
+    if jd_education:
+        education_score = 100 if cv_education else 0
+    else:
+        education_score = 100 if cv_education else 50
+
+    overall = round(0.5 * keyword_score + 0.25 * skills_score + 0.15 * experience_score + 0.10 * education_score)
+
+    return {
+        "overall_score": overall,
+        "keyword_score": keyword_score,
+        "matched_keywords": matched,
+        "missing_keywords": missing,
+        "skills": {"score": skills_score, "table": skills_table},
+        "experience": {"score": experience_score, "required_years": required_years, "cv_years": cv_years},
+        "education": {"score": education_score, "required": jd_education, "found": cv_education},
+    }
+
+
+def _score_color(score):
+    if score >= 75:
+        return "#2e7d32"
+    if score >= 50:
+        return "#f9a825"
+    return "#c62828"
+
+
+def render_score_html(result, suggestions_html=None):
+    """Render a score dict as the HTML report shown by the ATS checker."""
+    score = result["overall_score"]
+
+    def keyword_list(terms):
+        if not terms:
+            return "<p>None</p>"
+        return "<ul>" + "".join(f"<li>{escape(t)}</li>" for t in terms) + "</ul>"
+
+    rows = "".join(
+        f"<tr><td>{escape(row['skill'])}</td><td>{'✔' if row['in_cv'] else '✘'}</td><td>✔</td></tr>"
+        for row in result["skills"]["table"]
+    )
+    experience = result["experience"]
+    if experience["required_years"]:
+        experience_text = (
+            f"The job asks for {experience['required_years']}+ years; "
+            f"the CV shows about {experience['cv_years']} years."
+        )
+    else:
+        experience_text = "No explicit years of experience required; relevance is based on keyword overlap."
+    education = result["education"]
+    if education["required"]:
+        education_text = "Required: " + ", ".join(education["required"]) + ". Found in CV: " + (
+            ", ".join(education["found"]) or "none") + "."
+    else:
+        education_text = "No specific education requirement found in the job description."
+
+    if suggestions_html is None:
+        missing = result["missing_keywords"][:10]
+        suggestions_html = "<ul>" + "".join(
+            f"<li>Add evidence of <strong>{escape(t)}</strong> if you have this experience.</li>" for t in missing
+        ) + "</ul>" if missing else "<p>Your CV already covers the key terms of this job description.</p>"
+
+    return (
+        '<div class="ats-report">'
+        "<h2>Overall ATS Score</h2>"
+        f"<p><strong>{score}%</strong></p>"
+        '<div style="background:#eee;border-radius:4px;height:16px;">'
+        f'<div style="width:{score}%;background:{_score_color(score)};height:16px;border-radius:4px;"></div></div>'
+        "<h2>Matched Keywords</h2>" + keyword_list(result["matched_keywords"]) +
+        "<h2>Missing Keywords</h2>" + keyword_list(result["missing_keywords"]) +
+        f"<h2>Skills Match</h2><p>Match rate: {result['skills']['score']}%</p>"
+        "<table><tr><th>Skill</th><th>CV</th><th>JD</th></tr>" + rows + "</table>"
+        f"<h2>Experience Match</h2><p>{escape(experience_text)} ({experience['score']}%)</p>"
+        f"<h2>Education Match</h2><p>{escape(education_text)} ({education['score']}%)</p>"
+        "<h2>Suggestions for Improvement</h2>" + suggestions_html +
+        "</div>"
+    )
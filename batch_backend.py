@@ -0,0 +1,243 @@
+"""
+Offline execution through the provider's Batch API.
+Chat completion requests are written to JSONL batch files, submitted through
+a pluggable backend and polled until the provider has finished them; results
+are matched back to their requests by custom_id. Batch calls use their own
+client and skip the interactive rate limiter: the provider prices and
+rate-limits batches separately, so offline bulk work does not compete with
+interactive traffic for capacity.
+"""
+
+import json
+import logging
+import os
+import time
+import uuid
+
+from openai import OpenAI
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# openai | local (in-process fake, for tests and development)
+BATCH_BACKEND = os.getenv("BATCH_BACKEND", "openai").lower()
+BATCH_POLL_INTERVAL = float(os.getenv("BATCH_POLL_INTERVAL", 60))
+# Give up on batches the provider has not finished after this many seconds
+BATCH_MAX_WAIT = float(os.getenv("BATCH_MAX_WAIT", 25 * 3600))
+# Requests per batch file (the provider accepts up to 50,000)
+BATCH_MAX_REQUESTS = int(os.getenv("BATCH_MAX_REQUESTS", 50000))
+# Batch requests are billed at this fraction of the regular price
+BATCH_PRICE_FACTOR = float(os.getenv("BATCH_PRICE_FACTOR", 0.5))
+
+ENDPOINT = "/v1/chat/completions"
+COMPLETION_WINDOW = "24h"
+COMPLETED = "completed"
+FAILED_STATES = ("failed", "expired", "cancelled")
+
+
+class BatchError(Exception):
+    """Raised when a batch fails as a whole or does not finish in time."""
+
+
+def write_batch_file(path, requests):
+    """Write (custom_id, chat completion kwargs) pairs as a Batch API input file."""
+    with open(path, "w", encoding="utf-8") as f:
+        for custom_id, body in requests:
+            f.write(json.dumps({"custom_id": custom_id, "method": "POST", "url": ENDPOINT, "body": body}) + "\n")
+
+
+def parse_results(lines):
+    """Yield (custom_id, response body or None, error or None) from batch output / error files."""
+    for line in lines:
+        if not line.strip():
+            continue
+        item = json.loads(line)
+        response = item.get("response") or {}
+        error = item.get("error")
+        if error is None and response.get("status_code") != 200:
+            error = (response.get("body") or {}).get("error") or f"status {response.get('status_code')}"
+        if error is not None:
+            yield item["custom_id"], None, error.get("message", str(error)) if isinstance(error, dict) else str(error)
+        else:
+            yield item["custom_id"], response["body"], None
+
+
+class OpenAIBatchBackend:
+    """Submits batch files to the OpenAI Batch API."""
+
+    name = "openai"
+
+    def __init__(self, client):
+        self.client = client
+
+    def submit(self, path, metadata=None):
+        """Upload a batch file and create its batch; returns the batch id."""
+        with open(path, "rb") as f:
+            uploaded = self.client.files.create(file=f, purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=uploaded.id, endpoint=ENDPOINT, completion_window=COMPLETION_WINDOW,
+            metadata=metadata or None,
+        )
+        return batch.id
+
+    def status(self, batch_id):
+        """Return (state, {"total", "completed", "failed"}) of a batch."""
+        batch = self.client.batches.retrieve(batch_id)
+        counts = batch.request_counts
+        return batch.status, {
+            "total": counts.total if counts else 0,
+            "completed": counts.completed if counts else 0,
+            "failed": counts.failed if counts else 0,
+        }
+
+    def results(self, batch_id):
+        """Lines of the output and error files of a finished batch."""
+        batch = self.client.batches.retrieve(batch_id)
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                yield from self.client.files.content(file_id).text.splitlines()
+
+
+class LocalBatchBackend:
+    """
+    Completes batches in-process, for tests and development. reply(body)
+    returns the message content of each request; batches finish after
+    `polls` status checks. State is in memory only.
+    """
+
+    name = "local"
+
+    def __init__(self, reply=None, polls=1):
+        self.reply = reply or (lambda body: "{}")
+        self.polls = polls
+        self._batches = {}
+
+    def submit(self, path, metadata=None):
+        with open(path, encoding="utf-8") as f:
+            requests = [json.loads(line) for line in f if line.strip()]
+        batch_id = "local-" + uuid.uuid4().hex
+        self._batches[batch_id] = {"requests": requests, "polls": 0}
+        return batch_id
+
+    def status(self, batch_id):
+        batch = self._batches.get(batch_id)
+        if batch is None:
+            # Lost with the process that submitted it
+            return "expired", {"total": 0, "completed": 0, "failed": 0}
+        batch["polls"] += 1
+        total = len(batch["requests"])
+        if batch["polls"] < self.polls:
+            return "in_progress", {"total": total, "completed": 0, "failed": 0}
+        return COMPLETED, {"total": total, "completed": total, "failed": 0}
+
+    def results(self, batch_id):
+        for request in self._batches[batch_id]["requests"]:
+            try:
+                content = self.reply(request["body"])
+            except Exception as e:
+                yield json.dumps({"custom_id": request["custom_id"], "response": None,
+                                  "error": {"message": str(e)}})
+                continue
+            body = {
+                "model": request["body"].get("model"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            }
+            yield json.dumps({"custom_id": request["custom_id"], "response": {"status_code": 200, "body": body},
+                              "error": None})
+
+
+def _load_state(state_path):
+    if state_path and os.path.exists(state_path):
+        with open(state_path, encoding="utf-8") as f:
+            return json.load(f)
+    return {"batches": []}
+
+
+def _save_state(state_path, state):
+    if not state_path:
+        return
+    with open(state_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(state_path + ".tmp", state_path)
+
+
+def run(backend, requests, state_path=None, work_dir=None, poll_interval=BATCH_POLL_INTERVAL,
+        max_wait=BATCH_MAX_WAIT):
+    """
+    Submit (custom_id, chat completion kwargs) requests in batches of at most
+    BATCH_MAX_REQUESTS, poll until every batch has finished and return
+    {custom_id: {"content": str or None, "error": str or None}}.
+    state_path records the submitted batches, so a restarted process polls
+    them instead of submitting the same requests again.
+    """
+    state = _load_state(state_path)
+    submitted = {custom_id for batch in state["batches"] for custom_id in batch["custom_ids"]}
+    pending = [(custom_id, body) for custom_id, body in requests if custom_id not in submitted]
+    work_dir = work_dir or os.path.dirname(os.path.abspath(state_path or "batch"))
+
+    for start in range(0, len(pending), BATCH_MAX_REQUESTS):
+        chunk = pending[start:start + BATCH_MAX_REQUESTS]
+        path = os.path.join(work_dir, f"batch-input-{len(state['batches']) + 1}.jsonl")
+        write_batch_file(path, chunk)
+        batch_id = backend.submit(path, metadata={"requests": str(len(chunk))})
+        state["batches"].append({
+            "id": batch_id, "backend": backend.name, "status": "submitted",
+            "custom_ids": [custom_id for custom_id, _ in chunk], "submitted_at": time.time(),
+        })
+        _save_state(state_path, state)
+        metrics.batch_requests.inc(len(chunk), result="submitted", backend=backend.name)
+        logger.info("Submitted batch %s with %d requests", batch_id, len(chunk),
+                    extra={"batch_id": batch_id, "requests": len(chunk)})
+
+    results = {}
+    deadline = time.monotonic() + max_wait
+    waiting = [batch for batch in state["batches"] if batch["status"] not in FAILED_STATES]
+    while waiting:
+        for batch in list(waiting):
+            status, counts = backend.status(batch["id"])
+            batch.update(status=status, counts=counts)
+            if status == COMPLETED:
+                waiting.remove(batch)
+                _collect(backend, batch, results)
+            elif status in FAILED_STATES:
+                waiting.remove(batch)
+                logger.warning("Batch %s %s", batch["id"], status, extra={"batch_id": batch["id"]})
+        _save_state(state_path, state)
+        if not waiting:
+            break
+        if time.monotonic() >= deadline:
+            raise BatchError(f"{len(waiting)} batch(es) did not finish within {max_wait:.0f}s")
+        time.sleep(poll_interval)
+
+    for custom_id, _ in requests:
+        if custom_id not in results:
+            results[custom_id] = {"content": None, "error": "No result from the batch"}
+    return results
+
+
+def _collect(backend, batch, results):
+    ok = failed = 0
+    for custom_id, body, error in parse_results(backend.results(batch["id"])):
+        if error is not None:
+            results[custom_id] = {"content": None, "error": error}
+            failed += 1
+            continue
+        results[custom_id] = {"content": body["choices"][0]["message"]["content"], "error": None}
+        ok += 1
+        if body.get("usage"):
+            metrics.record_batch_usage(body.get("model", ""), body["usage"], BATCH_PRICE_FACTOR)
+    metrics.batch_requests.inc(ok, result="completed", backend=backend.name)
+    metrics.batch_requests.inc(failed, result="failed", backend=backend.name)
+    logger.info("Batch %s completed: %d ok, %d failed", batch["id"], ok, failed,
+                extra={"batch_id": batch["id"], "ok": ok, "failed": failed})
+
+
+def create_batch_backend(api_key, name=BATCH_BACKEND):
+    """Build the configured batch backend; OpenAI batches get a client separate from interactive calls."""
+    if name == "local":
+        return LocalBatchBackend()
+    if name == "openai":
+        return OpenAIBatchBackend(OpenAI(api_key=api_key, max_retries=3))
+    raise ValueError(f"Unknown batch backend: {name}")
@@ -0,0 +1,75 @@
+"""
+Placeholder fast path for the cover letter templates.
+Known fields are substituted on the server; the model only writes the
+five body paragraphs, returned as JSON.
+"""
+
+import json
+from html import escape
+
+from cv_renderer import has_text, parse_narrative
+
+PARAGRAPH_COUNT = 5
+PARAGRAPH_PLACEHOLDER = "[COVER_LETTER_CONTENT_PARAGRAPH_{}]"
+
+
+def supports_template(template_html):
+    """Return True if the template uses the paragraph placeholders."""
+    return PARAGRAPH_PLACEHOLDER.format(1) in template_html
+
+
+def placeholder_values(job_data, applicant_data):
+    """Map template placeholders to the user's data."""
+    hr_name = job_data.get("hr_name", "")
+    return {
+        "[APPLICANT_NAME]": applicant_data.get("name", ""),
+        "[APPLICANT_DESIGNATION]": applicant_data.get("designation", ""),
+        "[APPLICANT_ADDRESS]": applicant_data.get("address", ""),
+        "[APPLICANT_PHONE]": applicant_data.get("phone", ""),
+        "[APPLICANT_EMAIL]": applicant_data.get("email", ""),
+        "[APPLICATION_DATE]": job_data.get("date", ""),
+        "[HR_NAME]": hr_name if has_text(hr_name) else "HR Manager",
+        "[COMPANY_NAME]": job_data.get("company", ""),
+    }
+
+
+def build_paragraph_prompt(job_data, applicant_data):
+    """Build a prompt asking only for the cover letter paragraphs as JSON."""
+    user_data = {
+        "job": {k: v for k, v in job_data.items() if has_text(v)},
+        "applicant": {
+            k: v for k, v in applicant_data.items()
+            if has_text(v) and k not in ("address", "phone", "email")
+        },
+    }
+    return (
+        f"Write the body of a cover letter as exactly {PARAGRAPH_COUNT} professional paragraphs "
+        "based on the job description, company, experience and skills in the JSON data below. "
+        "Use the actual company name and the applicant's experience and skills. "
+        "If job_found is provided, incorporate it naturally. "
+        "Do not include a greeting, a sign-off, placeholder text or square brackets. "
+        'Return ONLY a JSON object of the form {"paragraphs": ["...", "...", "...", "...", "..."]}.\n'
+        "UserData:\n" + json.dumps(user_data, separators=(",", ":"))
+    )
+
+
+def parse_paragraphs(content):
+    """Return the list of paragraphs from the model's JSON response."""
+    paragraphs = parse_narrative(content).get("paragraphs") or []
+    return [p.strip() for p in paragraphs if has_text(p)]
+
+
+def render_cover_letter(template_html, job_data, applicant_data, paragraphs):
+    """Substitute the known fields and paragraphs into the template."""
+    html_content = template_html
+    for placeholder, value in placeholder_values(job_data, applicant_data).items():
+        html_content = html_content.replace(placeholder, escape(value or ""))
+
+    for index in range(1, PARAGRAPH_COUNT + 1):
+        placeholder = PARAGRAPH_PLACEHOLDER.format(index)
+        if index <= len(paragraphs):
+            html_content = html_content.replace(placeholder, escape(paragraphs[index - 1]))
+        else:
+            # Drop the empty paragraph entirely rather than leaving "<p></p>"
+            html_content = html_content.replace(f"<p>{placeholder}</p>", "").replace(placeholder, "")
+    return html_content
@@ -0,0 +1,9 @@
+import os
+import sys
+
+# The app modules read their settings at import time
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# test_ats.py is a manual script against a running server (needs `requests`)
+collect_ignore = ["test_ats.py"]
@@ -0,0 +1,356 @@
+"""
+Bulk CV generation from a CSV or JSONL file of questionnaire answers.
+Rows are streamed through a bounded thread pool; every finished row is
+appended to a checkpoint file next to the outputs, so a batch interrupted by
+a restart resumes where it stopped. Outputs are HTML files in a directory,
+optionally zipped once the batch is complete. With the "batch" execution
+mode the CV prose is first generated offline through the provider's Batch
+API (see batch_backend) into a per-run section store next to the checkpoint,
+and the rows are then rendered from that store.
+
+CSV columns are dotted questionnaire paths, e.g. personal_info.full_name or
+experience.0.job_title; JSONL lines are questionnaire objects, or objects
+with "questionnaire" plus optional "template" and "id".
+
+Usage: python cv_batch.py answers.csv --output cvs.zip [--template cv_1] [--execution batch]
+"""
+
+import argparse
+import csv
+import json
+import logging
+import os
+import re
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import batch_backend
+import cv_sections
+import prompts
+from response_cache import ResponseCache
+
+logger = logging.getLogger(__name__)
+
+CV_BATCH_CONCURRENCY = int(os.getenv("CV_BATCH_CONCURRENCY", 4))
+CV_BATCH_MAX_ROWS = int(os.getenv("CV_BATCH_MAX_ROWS", 5000))
+# Seconds between progress log lines
+CV_BATCH_PROGRESS_INTERVAL = float(os.getenv("CV_BATCH_PROGRESS_INTERVAL", 30))
+# 'live' calls the model per row as it is rendered; 'batch' generates all prose
+# through the Batch API first (cheaper, slower, separate capacity)
+CV_BATCH_EXECUTION = os.getenv("CV_BATCH_EXECUTION", "live").lower()
+
+SUPPORTED_EXTENSIONS = (".csv", ".jsonl", ".ndjson")
+CHECKPOINT_FILE = ".checkpoint.jsonl"
+BATCH_STATE_FILE = ".batch_api.json"
+SECTION_STORE_FILE = ".sections.db"
+# Columns / keys that describe the row rather than the questionnaire
+ROW_FIELDS = ("id", "template")
+
+
+def _set_path(target, path, value):
+    """Set a dotted path such as experience.0.job_title, creating dicts and lists on the way."""
+    keys = [int(key) if key.isdigit() else key for key in path.split(".")]
+    for key, next_key in zip(keys, keys[1:]):
+        child = [] if isinstance(next_key, int) else {}
+        if isinstance(key, int):
+            target.extend(None for _ in range(key + 1 - len(target)))
+            if target[key] is None:
+                target[key] = child
+        else:
+            target.setdefault(key, child)
+        target = target[key]
+    if isinstance(keys[-1], int):
+        target.extend(None for _ in range(keys[-1] + 1 - len(target)))
+    target[keys[-1]] = value
+
+
+def _cell(value):
+    lowered = value.strip().lower()
+    if lowered in ("true", "false"):
+        return lowered == "true"
+    return value.strip()
+
+
+def unflatten(row):
+    """Turn a CSV row with dotted column names into (row fields, questionnaire)."""
+    fields, answers = {}, {}
+    for column, value in row.items():
+        if not column or value is None or not value.strip():
+            continue
+        column = column.strip()
+        if column in ROW_FIELDS:
+            fields[column] = value.strip()
+        else:
+            _set_path(answers, column, _cell(value))
+    return fields, answers
+
+
+def read_rows(stream, filename):
+    """Yield (row number, row fields, questionnaire) from a CSV or JSONL text stream."""
+    if filename.lower().endswith(".csv"):
+        for number, row in enumerate(csv.DictReader(stream), start=1):
+            yield (number, *unflatten(row))
+        return
+    number = 0
+    for line in stream:
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            data = json.loads(line)
+        except ValueError as e:
+            raise ValueError(f"Line {number} is not valid JSON: {e}") from e
+        if not isinstance(data, dict):
+            raise ValueError(f"Line {number} is not a JSON object")
+        if "questionnaire" in data:
+            yield number, {k: data[k] for k in ROW_FIELDS if data.get(k)}, data["questionnaire"]
+        else:
+            yield number, {}, data
+
+
+def output_name(number, fields, answers):
+    """Stable file name of a row's CV, so a resumed batch finds earlier outputs."""
+    label = fields.get("id") or (answers.get("personal_info") or {}).get("full_name") or "cv"
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", str(label)).strip("_")[:60] or "cv"
+    return f"{number:05d}_{slug}.html"
+
+
+def load_checkpoint(output_dir):
+    """Return {row number: checkpoint record} of the rows already processed."""
+    records = {}
+    path = os.path.join(output_dir, CHECKPOINT_FILE)
+    if not os.path.exists(path):
+        return records
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A line cut short by a crash
+                continue
+            records[record["row"]] = record
+    return records
+
+
+def _completed(record, output_dir):
+    return record and record["status"] == "done" and os.path.exists(os.path.join(output_dir, record["file"]))
+
+
+def _write_output(output_dir, name, html):
+    # Written under a temporary name first so a crash never leaves half a file
+    path = os.path.join(output_dir, name)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        f.write(html)
+    os.replace(path + ".tmp", path)
+
+
+def _zip_outputs(output_dir, zip_path, records):
+    with zipfile.ZipFile(zip_path + ".tmp", "w", zipfile.ZIP_DEFLATED) as archive:
+        for record in sorted(records.values(), key=lambda r: r["row"]):
+            if record["status"] == "done":
+                archive.write(os.path.join(output_dir, record["file"]), record["file"])
+        errors = [r for r in records.values() if r["status"] == "failed"]
+        if errors:
+            archive.writestr("errors.json", json.dumps(errors, indent=2))
+    os.replace(zip_path + ".tmp", zip_path)
+
+
+def progress(output_dir):
+    """Summarize a batch's checkpoint (readable while it runs or after a restart)."""
+    records = load_checkpoint(output_dir)
+    done = [r for r in records.values() if r["status"] == "done"]
+    return {
+        "done": len(done),
+        "failed": len(records) - len(done),
+        "last_update": max((r["at"] for r in records.values()), default=None),
+    }
+
+
+def staging_dir(output):
+    """Directory the row outputs and checkpoint are written to."""
+    return output[:-4] if output.lower().endswith(".zip") else output
+
+
+def section_store(output):
+    """
+    Store of the sections generated for a bulk run, kept on disk with its
+    checkpoint. Nothing is evicted or expires, so every row renders from it
+    however many sections the run has, including after a restart.
+    """
+    output_dir = staging_dir(output)
+    os.makedirs(output_dir, exist_ok=True)
+    return ResponseCache(max_entries=256, db_path=os.path.join(output_dir, SECTION_STORE_FILE),
+                         ttl=0, max_db_entries=0)
+
+
+def prefill_sections(input_path, cache, model, backend, output, resume=True, max_rows=CV_BATCH_MAX_ROWS,
+                     poll_interval=batch_backend.BATCH_POLL_INTERVAL, max_wait=batch_backend.BATCH_MAX_WAIT):
+    """
+    Generate the prose sections of every row through the batch API into the
+    run's section store (see section_store), so the rows then render without
+    interactive model calls. Sections shared by several rows are requested
+    once; sections already in the section cache are copied instead of being
+    requested. Returns a summary of the sections generated.
+    """
+    output_dir = staging_dir(output)
+    store = section_store(output)
+    state_path = os.path.join(output_dir, BATCH_STATE_FILE)
+    if not resume:
+        store.clear()
+        if os.path.exists(state_path):
+            os.remove(state_path)
+
+    sections, reused = {}, 0
+    with open(input_path, encoding="utf-8-sig", newline="") as stream:
+        for number, _, answers in read_rows(stream, input_path):
+            if number > max_rows:
+                raise ValueError(f"Input has more than {max_rows} rows")
+            for section in cv_sections.plan_sections(answers, model):
+                if section.key in sections or store.get(section.key) is not None:
+                    continue
+                cached = cache.get(section.key)
+                if cached is not None:
+                    store.set(section.key, cached)
+                    reused += 1
+                else:
+                    sections[section.key] = section
+
+    requests = [
+        (key, {"model": model, "messages": prompts.cv_section_messages([section]),
+               "response_format": prompts.JSON_RESPONSE_FORMAT})
+        for key, section in sections.items()
+    ]
+    results = batch_backend.run(backend, requests, state_path=state_path, poll_interval=poll_interval,
+                                max_wait=max_wait) if requests else {}
+    generated = 0
+    for key, section in sections.items():
+        content = results[key]["content"]
+        outputs = cv_sections.parse_sections(content, [section]) if content else {}
+        cv_sections.store_outputs(store, [section], outputs)
+        generated += len(outputs)
+    return {"sections": len(sections), "generated": generated, "failed": len(sections) - generated,
+            "reused": reused}
+
+
+def batch_api_status(output):
+    """Batches submitted for a bulk run, as recorded in its state file."""
+    path = os.path.join(staging_dir(output), BATCH_STATE_FILE)
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        batches = json.load(f)["batches"]
+    return [{k: batch.get(k) for k in ("id", "backend", "status", "counts", "submitted_at")} for batch in batches]
+
+
+def run_batch(input_path, output, generate, template="cv_1", concurrency=CV_BATCH_CONCURRENCY,
+              max_rows=CV_BATCH_MAX_ROWS, resume=True):
+    """
+    Generate a CV for every row of input_path with generate(template, answers) -> html.
+    output is a directory, or a .zip path whose rows are staged in a directory
+    of the same name. Rows already checkpointed as done are skipped when resuming;
+    failed rows are retried. Returns a summary with throughput figures.
+    """
+    output_dir = staging_dir(output)
+    os.makedirs(output_dir, exist_ok=True)
+    checkpoint_path = os.path.join(output_dir, CHECKPOINT_FILE)
+    if not resume and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    records = load_checkpoint(output_dir)
+
+    started = time.perf_counter()
+    counts = {"done": 0, "failed": 0, "skipped": 0}
+    last_report = started
+
+    def process(number, fields, answers):
+        name = output_name(number, fields, answers)
+        try:
+            html = generate(fields.get("template") or template, answers)
+            _write_output(output_dir, name, html)
+            return {"row": number, "id": fields.get("id"), "status": "done", "file": name}
+        except Exception as e:
+            logger.warning("Batch row %d failed: %s", number, e, extra={"row": number})
+            return {"row": number, "id": fields.get("id"), "status": "failed", "file": name, "error": str(e)}
+
+    def record(futures, checkpoint):
+        nonlocal last_report
+        for future in futures:
+            result = {**future.result(), "at": time.time()}
+            records[result["row"]] = result
+            counts[result["status"]] += 1
+            # One line per finished row, flushed to disk: this is what a restart resumes from
+            checkpoint.write(json.dumps(result) + "\n")
+            checkpoint.flush()
+            os.fsync(checkpoint.fileno())
+        now = time.perf_counter()
+        if now - last_report >= CV_BATCH_PROGRESS_INTERVAL:
+            last_report = now
+            logger.info("Batch progress: %d done, %d failed, %.1f rows/min", counts["done"], counts["failed"],
+                        (counts["done"] + counts["failed"]) / (now - started) * 60, extra=counts)
+
+    with open(input_path, encoding="utf-8-sig", newline="") as stream, \
+            open(checkpoint_path, "a", encoding="utf-8") as checkpoint, \
+            ThreadPoolExecutor(max_workers=concurrency) as pool:
+        pending = set()
+        try:
+            for number, fields, answers in read_rows(stream, input_path):
+                if number > max_rows:
+                    raise ValueError(f"Input has more than {max_rows} rows")
+                if resume and _completed(records.get(number), output_dir):
+                    counts["skipped"] += 1
+                    continue
+                # Only a few rows in flight at a time, so large files are streamed
+                if len(pending) >= concurrency * 2:
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    record(finished, checkpoint)
+                pending.add(pool.submit(process, number, fields, answers))
+        finally:
+            record(wait(pending).done, checkpoint)
+
+    if output != output_dir:
+        _zip_outputs(output_dir, output, records)
+
+    elapsed = time.perf_counter() - started
+    processed = counts["done"] + counts["failed"]
+    return {
+        **counts,
+        "rows": len(records),
+        "output": output,
+        "errors": [
+            {"row": r["row"], "id": r.get("id"), "error": r["error"]}
+            for r in sorted(records.values(), key=lambda r: r["row"]) if r["status"] == "failed"
+        ],
+        "total_seconds": round(elapsed, 3),
+        "rows_per_minute": round(processed / elapsed * 60, 2) if elapsed and processed else None,
+    }
+
+
+def check_input(filename):
+    """Raise ValueError unless filename is a supported batch input."""
+    if not (filename or "").lower().endswith(SUPPORTED_EXTENSIONS):
+        raise ValueError(f"Batch input must be one of: {', '.join(SUPPORTED_EXTENSIONS)}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate CVs for every row of a CSV or JSONL file.")
+    parser.add_argument("input", help="CSV or JSONL file of questionnaire answers")
+    parser.add_argument("--output", required=True, help="output directory, or a .zip file")
+    parser.add_argument("--template", default="cv_1", help="CV template for rows without a template column")
+    parser.add_argument("--concurrency", type=int, default=CV_BATCH_CONCURRENCY)
+    parser.add_argument("--execution", choices=("live", "batch"), default=CV_BATCH_EXECUTION,
+                        help="'batch' generates the prose through the Batch API first")
+    parser.add_argument("--no-resume", action="store_true", help="start over instead of resuming")
+    args = parser.parse_args(argv)
+    check_input(args.input)
+
+    # Imported here so the app (and its OpenAI client) is only set up when generating
+    from app import run_bulk_cvs
+
+    summary = run_bulk_cvs(args.input, args.output, template=args.template, concurrency=args.concurrency,
+                           execution=args.execution, resume=not args.no_resume)
+    print(json.dumps(summary, indent=2))
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,445 @@
+"""
+Local rendering engine for the CV templates.
+The structural HTML of cv_1 and cv_2 is rendered here from the questionnaire
+answers; the model is only asked for the prose (summary and bullet points).
+"""
+
+import datetime
+import json
+import re
+from html import escape
+
+# Sections that the frontend sends as lists of entries
+LIST_SECTIONS = ["education", "experience", "certifications", "projects", "awards/achievements"]
+
+EXPERIENCE_BULLETS = 5
+PROJECT_BULLETS = 3
+
+# Links from the answers are only rendered as hrefs with these schemes
+SAFE_URL_SCHEMES = ("http", "https")
+
+
+def has_text(value):
+    """Return True if value is a non-empty string (after stripping)."""
+    return isinstance(value, str) and bool(value.strip())
+
+
+def _text(value):
+    """Coerce an answer to text: None and False become '', lists become lines."""
+    if value is None or value is False:
+        return ""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, bool):
+        return "true"
+    if isinstance(value, list):
+        return "\n".join(str(item) for item in value if item is not None)
+    return str(value)
+
+
+def safe_url(value):
+    """Return the href of a link from the answers, or None unless it is http(s) or has no scheme."""
+    url = re.sub(r"[\x00-\x20\x7f]", "", value)
+    match = re.match(r"([A-Za-z][A-Za-z0-9+.-]*):", url)
+    if match is None:
+        return "https://" + url.lstrip("/")
+    return url if match.group(1).lower() in SAFE_URL_SCHEMES else None
+
+
+def split_items(value):
+    """Split a comma or newline separated answer into a list of items."""
+    if not has_text(value):
+        return []
+    return [item.strip() for item in re.split(r"[,\n]", value) if item.strip()]
+
+
+def format_date(value):
+    """Format an ISO date from the form (YYYY-MM-DD or YYYY-MM) as 'Mon YYYY'."""
+    if not has_text(value):
+        return ""
+    value = value.strip()
+    for fmt in ("%Y-%m-%d", "%Y-%m"):
+        try:
+            return datetime.datetime.strptime(value, fmt).strftime("%b %Y")
+        except ValueError:
+            continue
+    return value
+
+
+def normalize_answers(answers):
+    """
+    Normalize questionnaire answers into a predictable shape.
+    List sections become lists of non-empty dicts, other sections become dicts,
+    and the answers in them text (see _text).
+    """
+    normalized = {}
+    for section, value in (answers or {}).items():
+        if section in LIST_SECTIONS:
+            entries = value if isinstance(value, list) else [value]
+            normalized[section] = [
+                {k: _text(v) for k, v in entry.items()} for entry in entries
+                # A flag such as currently_working alone does not make an entry
+                if isinstance(entry, dict) and any(has_text(_text(v)) for v in entry.values() if not isinstance(v, bool))
+            ]
+        else:
+            normalized[section] = {k: _text(v) for k, v in value.items()} if isinstance(value, dict) else {}
+    for section in LIST_SECTIONS:
+        normalized.setdefault(section, [])
+    return normalized
+
+
+def date_range(entry):
+    """Return 'start – end' for an experience entry."""
+    start = format_date(entry.get("start_date"))
+    if entry.get("currently_working") or str(entry.get("end_date", "")).lower() == "present":
+        end = "Present"
+    else:
+        end = format_date(entry.get("end_date"))
+    return " – ".join(part for part in (start, end) if part)
+
+
+def parse_narrative(content):
+    """Parse the model's JSON prose response, tolerating code fences."""
+    content = (content or "").strip()
+    if content.startswith("```"):
+        content = re.sub(r"^```[a-zA-Z]*\s*|\s*```$", "", content)
+    try:
+        data = json.loads(content)
+    except ValueError:
+        match = re.search(r"\{.*\}", content, re.DOTALL)
+        if not match:
+            return {}
+        try:
+            data = json.loads(match.group(0))
+        except ValueError:
+            return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _bullets(narrative, key, index, fallback):
+    """Return bullet list for entry index from the narrative, or a fallback list."""
+    entries = narrative.get(key) or []
+    if index < len(entries) and isinstance(entries[index], list):
+        bullets = [b for b in entries[index] if has_text(b)]
+        if bullets:
+            return bullets
+    return split_items_by_line(fallback)
+
+
+def split_items_by_line(value):
+    """Split free text into bullet lines, one per non-empty line."""
+    if not has_text(value):
+        return []
+    lines = [line.strip(" -•\t") for line in value.splitlines() if line.strip(" -•\t")]
+    return lines if len(lines) > 1 else [value.strip()]
+
+
+def _summary(answers, narrative):
+    summary = narrative.get("summary")
+    if has_text(summary):
+        return summary.strip()
+    return answers.get("summary", {}).get("summary_text", "").strip()
+
+
+def _ul(items, css_class=None, indent=8):
+    if not items:
+        return ""
+    pad = " " * indent
+    class_attr = f' class="{css_class}"' if css_class else ""
+    rows = "\n".join(f"{pad}  <li>{escape(item)}</li>" for item in items)
+    return f"{pad}<ul{class_attr}>\n{rows}\n{pad}</ul>\n"
+
+
+def _skill_categories(answers):
+    """Return (label, items) pairs for the non-empty skill fields."""
+    skills = answers.get("skills", {})
+    labels = [
+        ("technical_skills", "Technical Skills"),
+        ("languages", "Programming Languages"),
+        ("frameworks", "Frameworks"),
+        ("tools", "Tools"),
+        ("soft_skills", "Soft Skills"),
+    ]
+    return [(label, split_items(skills.get(key))) for key, label in labels if split_items(skills.get(key))]
+
+
+def _certification_lines(answers):
+    lines = []
+    for cert in answers["certifications"]:
+        details = " – ".join(p for p in (cert.get("issuer", ""), cert.get("year", "")) if has_text(p))
+        name = cert.get("cert_name", "")
+        lines.append(f"{name} – {details}" if details else name)
+    return [line for line in lines if has_text(line)]
+
+
+def _award_lines(answers):
+    lines = []
+    for award in answers["awards/achievements"]:
+        title = award.get("award_title", "")
+        year = award.get("award_year", "")
+        lines.append(f"{title} ({year})" if has_text(year) else title)
+    return [line for line in lines if has_text(line)]
+
+
+def render_cv_1_body(answers, narrative):
+    """Render the body of the cv_1 (Professional) template."""
+    personal = answers.get("personal_info", {})
+    parts = ['  <div class="container">\n']
+
+    parts.append('    <div class="header">\n')
+    parts.append(f'      <h1>{escape(personal.get("full_name", ""))}</h1>\n')
+    if answers["experience"] and has_text(answers["experience"][0].get("job_title")):
+        parts.append(f'      <h2>{escape(answers["experience"][0]["job_title"])}</h2>\n')
+    parts.append("    </div>\n\n")
+
+    contact = [personal.get(k, "") for k in ("email", "phone", "address", "linkedin", "portfolio")]
+    contact = [c for c in contact if has_text(c)]
+    if contact:
+        parts.append('    <div class="contact-info">\n')
+        parts.extend(f"      <p>{escape(c)}</p>\n" for c in contact)
+        parts.append("    </div>\n\n")
+
+    summary = _summary(answers, narrative)
+    if summary:
+        parts.append('    <div class="section summary">\n')
+        parts.append('      <div class="section-heading">Professional Summary</div>\n')
+        parts.append(f"      <p>{escape(summary)}</p>\n")
+        parts.append("    </div>\n\n")
+
+    categories = _skill_categories(answers)
+    if categories:
+        parts.append('    <div class="section">\n')
+        parts.append('      <div class="section-heading">Technical Proficiencies</div>\n')
+        parts.append('      <table class="skills">\n        <tr>\n')
+        for label, items in categories:
+            parts.append(
+                f'          <td>\n            <span class="category">{escape(label)}:</span><br />\n'
+                f"            {escape(', '.join(items))}\n          </td>\n"
+            )
+        parts.append("        </tr>\n      </table>\n    </div>\n\n")
+
+    if answers["experience"]:
+        parts.append('    <div class="section">\n')
+        parts.append('      <div class="section-heading">Career Experience</div>\n')
+        for index, job in enumerate(answers["experience"]):
+            bullets = _bullets(narrative, "experience", index, job.get("responsibilities"))
+            parts.append('      <div class="subsection">\n        <div class="subheader">\n')
+            parts.append(f'          <span>{escape(job.get("company", ""))}</span>\n')
+            parts.append(f'          <span class="location">{escape(date_range(job))}</span>\n')
+            parts.append("        </div>\n")
+            parts.append(f'        <div class="role-title">{escape(job.get("job_title", ""))}</div>\n')
+            parts.append(_ul(bullets))
+            parts.append("      </div>\n")
+        parts.append("    </div>\n\n")
+
+    if answers["projects"]:
+        parts.append('    <div class="section">\n')
+        parts.append('      <div class="section-heading">Projects</div>\n')
+        for index, project in enumerate(answers["projects"]):
+            bullets = _bullets(narrative, "projects", index, project.get("description"))
+            parts.append('      <div class="subsection">\n        <div class="subheader">\n')
+            parts.append(f'          <span>{escape(project.get("project_title", ""))}</span>\n')
+            parts.append(f'          <span class="location">{escape(project.get("technologies", ""))}</span>\n')
+            parts.append("        </div>\n")
+            parts.append(_ul(bullets))
+            parts.append("      </div>\n")
+        parts.append("    </div>\n\n")
+
+    if answers["education"]:
+        parts.append('    <div class="section">\n')
+        parts.append('      <div class="section-heading">Education</div>\n')
+        for edu in answers["education"]:
+            parts.append('      <div class="education-item">\n')
+            parts.append(f'        <div class="institution">{escape(edu.get("university", ""))}</div>\n')
+            parts.append('        <div class="details">\n')
+            degree_line = f"<strong>{escape(edu.get('degree', ''))}</strong>"
+            if has_text(edu.get("graduation_year")):
+                degree_line += f" — {escape(edu['graduation_year'])}"
+            parts.append(f"          <p>{degree_line}</p>\n")
+            if has_text(edu.get("gpa")):
+                parts.append(f"          <p>GPA: {escape(edu['gpa'])}</p>\n")
+            parts.append("        </div>\n      </div>\n")
+        parts.append("    </div>\n\n")
+
+    courses = split_items(answers.get("courses", {}).get("relevant_courses"))
+    if courses:
+        parts.append('    <div class="section">\n')
+        parts.append('      <div class="section-heading">Relevant Courses</div>\n')
+        parts.append(_ul(courses, "cert-list", indent=6))
+        parts.append("    </div>\n\n")
+
+    for heading, lines, css_class in (
+        ("Achievements and Awards", _award_lines(answers), "awards-list"),
+        ("Certifications", _certification_lines(answers), "cert-list"),
+    ):
+        if lines:
+            parts.append('    <div class="section">\n')
+            parts.append(f'      <div class="section-heading">{heading}</div>\n')
+            parts.append(_ul(lines, css_class, indent=6))
+            parts.append("    </div>\n\n")
+
+    languages = split_items(answers.get("languages", {}).get("language"))
+    if languages:
+        parts.append('    <div class="section">\n')
+        parts.append('      <div class="section-heading">Languages</div>\n')
+        parts.append(f'      <p class="languages">{escape(", ".join(languages))}</p>\n')
+        parts.append("    </div>\n\n")
+
+    parts.append("  </div>\n")
+    return "".join(parts)
+
+
+def render_cv_2_body(answers, narrative):
+    """Render the body of the cv_2 (Creative) template."""
+    personal = answers.get("personal_info", {})
+    parts = ['    <div class="cv-container">\n']
+
+    parts.append('        <div class="header">\n')
+    parts.append(f'            <div class="name">{escape(personal.get("full_name", "").upper())}</div>\n')
+    if has_text(personal.get("address")):
+        parts.append(f'            <div class="contact-info">{escape(personal["address"])}</div>\n')
+    links = []
+    if has_text(personal.get("phone")):
+        links.append(escape(personal["phone"]))
+    if has_text(personal.get("email")):
+        email = escape(personal["email"])
+        links.append(f'<a href="mailto:{email}">{email}</a>')
+    for key in ("linkedin", "portfolio"):
+        if has_text(personal.get(key)):
+            href = safe_url(personal[key])
+            text = escape(personal[key])
+            links.append(f'<a href="{escape(href)}">{text}</a>' if href else text)
+    if links:
+        parts.append(
+            '            <div class="contact-info">\n                '
+            + " &nbsp;&nbsp;\n                ".join(links)
+            + "\n            </div>\n"
+        )
+    parts.append("        </div>\n\n")
+
+    summary = _summary(answers, narrative)
+    if summary:
+        parts.append('        <div class="section">\n')
+        parts.append('            <div class="section-title">Summary</div>\n')
+        parts.append(f'            <div class="description">{escape(summary)}</div>\n')
+        parts.append("        </div>\n\n")
+
+    courses = split_items(answers.get("courses", {}).get("relevant_courses"))
+    if answers["education"] or courses:
+        parts.append('        <div class="section">\n')
+        parts.append('            <div class="section-title">Education</div>\n')
+        for edu in answers["education"]:
+            details = [edu.get("graduation_year", "")]
+            if has_text(edu.get("gpa")):
+                details.append(f"GPA: {edu['gpa']}")
+            details = " | ".join(d for d in details if has_text(d))
+            parts.append('            <div class="education-item">\n                <div class="entry-header">\n')
+            parts.append(f'                    <div class="institution">{escape(edu.get("university", ""))}</div>\n')
+            parts.append(f'                    <div class="date-location">{escape(details)}</div>\n')
+            parts.append("                </div>\n")
+            parts.append(f'                <div class="degree">{escape(edu.get("degree", ""))}</div>\n')
+            parts.append("            </div>\n")
+        if courses:
+            parts.append('            <div class="coursework-title">Relevant Coursework</div>\n')
+            parts.append('            <div class="coursework-list">\n')
+            columns = [courses[i::4] for i in range(min(4, len(courses)))]
+            for column in columns:
+                parts.append('                <div class="coursework-column">\n')
+                parts.extend(f'                    <div class="coursework-item">{escape(c)}</div>\n' for c in column)
+                parts.append("                </div>\n")
+            parts.append("            </div>\n")
+        parts.append("        </div>\n\n")
+
+    if answers["experience"]:
+        parts.append('        <div class="section">\n')
+        parts.append('            <div class="section-title">Experience</div>\n')
+        for index, job in enumerate(answers["experience"]):
+            bullets = _bullets(narrative, "experience", index, job.get("responsibilities"))
+            parts.append('            <div class="experience-item">\n                <div class="entry-header">\n')
+            parts.append(f'                    <div class="company">{escape(job.get("company", ""))}</div>\n')
+            parts.append(f'                    <div class="date-location">{escape(date_range(job))}</div>\n')
+            parts.append("                </div>\n")
+            parts.append(f'                <div class="position">{escape(job.get("job_title", ""))}</div>\n')
+            parts.append(_ul(bullets, "description", indent=16))
+            parts.append("            </div>\n")
+        parts.append("        </div>\n\n")
+
+    if answers["projects"]:
+        parts.append('        <div class="section">\n')
+        parts.append('            <div class="section-title">Projects</div>\n')
+        for index, project in enumerate(answers["projects"]):
+            title = project.get("project_title", "")
+            if has_text(project.get("technologies")):
+                title = f"{title} | {project['technologies']}"
+            bullets = _bullets(narrative, "projects", index, project.get("description"))
+            parts.append('            <div class="project-item">\n                <div class="entry-header">\n')
+            parts.append(f'                    <div class="project-title">{escape(title)}</div>\n')
+            parts.append("                </div>\n")
+            parts.append(_ul(bullets, "description", indent=16))
+            parts.append("            </div>\n")
+        parts.append("        </div>\n\n")
+
+    categories = _skill_categories(answers)
+    if categories:
+        parts.append('        <div class="section">\n')
+        parts.append('            <div class="section-title">Technical Skills</div>\n')
+        parts.append('            <div class="skills-section">\n')
+        for label, items in categories:
+            parts.append(
+                '                <div class="skills-category">\n'
+                f'                    <span class="skills-title">{escape(label)}:</span>\n'
+                f'                    <span class="skills-list">{escape(", ".join(items))}</span>\n'
+                "                </div>\n"
+            )
+        parts.append("            </div>\n        </div>\n\n")
+
+    for heading, lines in (
+        ("Certifications", _certification_lines(answers)),
+        ("Awards / Achievements", _award_lines(answers)),
+    ):
+        if lines:
+            parts.append('        <div class="section">\n')
+            parts.append(f'            <div class="section-title">{heading}</div>\n')
+            parts.append(_ul(lines, "description", indent=12))
+            parts.append("        </div>\n\n")
+
+    languages = split_items(answers.get("languages", {}).get("language"))
+    if languages:
+        parts.append('        <div class="section">\n')
+        parts.append('            <div class="section-title">Languages</div>\n')
+        parts.append(f'            <div class="skills-list">{escape(", ".join(languages))}</div>\n')
+        parts.append("        </div>\n\n")
+
+    parts.append("    </div>\n")
+    return "".join(parts)
+
+
+RENDERERS = {
+    "cv_1": render_cv_1_body,
+    "cv_2": render_cv_2_body,
+}
+
+
+def supports_template(template_name):
+    """Return True if the template can be rendered locally."""
+    return template_name in RENDERERS
+
+
+def render_cv(template_name, template_html, answers, narrative=None):
+    """
+    Render the final CV HTML: the template's <head> (CSS) is kept as-is and
+    the body is rebuilt from the answers plus the model-generated prose.
+    """
+    answers = normalize_answers(answers)
+    narrative = narrative or {}
+
+    body_start = template_html.find("<body")
+    head = template_html[:body_start] if body_start != -1 else template_html
+    name = answers.get("personal_info", {}).get("full_name", "")
+    if has_text(name):
+        # A function replacement, so backslashes in the name are not read as group references
+        title = f"<title>{escape(name)} – CV</title>"
+        head = re.sub(r"<title>.*?</title>", lambda _: title, head, count=1, flags=re.DOTALL)
+
+    body = RENDERERS[template_name](answers, narrative)
+    return f"{head}<body>\n{body}</body>\n</html>\n"
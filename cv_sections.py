@@ -0,0 +1,178 @@
+"""
+Section-level generation of CV prose.
+The prose of a locally rendered CV is split into independent sections: the
+summary and the bullet points of each experience entry and each project.
+Every section is keyed by a hash of only the answers it depends on, so when
+an edited questionnaire is re-submitted, only the sections whose inputs
+changed go to the model; the rest are reused from the section cache.
+"""
+
+import contextvars
+import json
+import logging
+from collections import namedtuple
+from contextlib import contextmanager
+
+import metrics
+from cv_renderer import (
+    EXPERIENCE_BULLETS, PROJECT_BULLETS, date_range, has_text, normalize_answers, parse_narrative,
+)
+from response_cache import make_cache_key
+
+logger = logging.getLogger(__name__)
+
+# Bump when the section prompts change so older cached sections are not reused
+SECTION_PROMPT_VERSION = 1
+
+# Store of sections generated ahead of a bulk run (see cv_batch.section_store),
+# read before the shared section cache while that run's rows are rendered
+_prefilled = contextvars.ContextVar("cv_prefilled_sections", default=None)
+
+# id: "summary", "experience_<n>" or "project_<n>"; index is the entry's position in the answers
+Section = namedtuple("Section", ["id", "kind", "index", "inputs", "key"])
+
+
+def _summary_inputs(answers):
+    personal = answers.get("personal_info", {})
+    inputs = {
+        "name": personal.get("full_name", ""),
+        "skills": {k: v for k, v in answers.get("skills", {}).items() if has_text(v)},
+        "education": [
+            {"degree": e.get("degree", ""), "university": e.get("university", "")} for e in answers["education"]
+        ],
+        # Roles only: rewording a responsibility does not change the summary
+        "experience": [
+            {"job_title": e.get("job_title", ""), "company": e.get("company", ""), "dates": date_range(e)}
+            for e in answers["experience"]
+        ],
+    }
+    summary_text = answers.get("summary", {}).get("summary_text", "")
+    if has_text(summary_text):
+        inputs["summary"] = summary_text
+    return inputs
+
+
+def plan_sections(answers, model):
+    """List the prose sections of a CV, each keyed by a hash of its inputs."""
+    answers = normalize_answers(answers)
+
+    def section(section_id, kind, index, inputs):
+        key = make_cache_key("cv-section", SECTION_PROMPT_VERSION, kind, inputs, model)
+        return Section(section_id, kind, index, inputs, key)
+
+    sections = []
+    for index, job in enumerate(answers["experience"]):
+        sections.append(section(f"experience_{index}", "experience", index, {
+            "job_title": job.get("job_title", ""),
+            "company": job.get("company", ""),
+            "dates": date_range(job),
+            "responsibilities": job.get("responsibilities", ""),
+        }))
+    for index, project in enumerate(answers["projects"]):
+        if not has_text(project.get("description")):
+            continue
+        sections.append(section(f"project_{index}", "project", index, {
+            "title": project.get("project_title", ""),
+            "description": project.get("description", ""),
+            "technologies": project.get("technologies", ""),
+        }))
+    # A summary given by the user is only polished when other prose is written too
+    if sections or not has_text(answers.get("summary", {}).get("summary_text")):
+        sections.insert(0, section("summary", "summary", None, _summary_inputs(answers)))
+    return sections
+
+
+INSTRUCTIONS = {
+    "summary": (
+        "a ~100 word professional summary as a string, written from the skills and experience "
+        "(if a summary is given, polish it instead)"
+    ),
+    "experience": (
+        f"a list of exactly {EXPERIENCE_BULLETS} achievement-focused bullet points "
+        "(elaborate the given responsibilities, or generate them if missing)"
+    ),
+    "project": f"a list of {PROJECT_BULLETS} bullet points based on the project description",
+}
+
+
+def build_section_prompt(sections):
+    """Prompt asking for the given sections only, as one JSON object keyed by section id."""
+    kinds = sorted({s.kind for s in sections}, key=list(INSTRUCTIONS).index)
+    rules = "".join(f"- {kind} sections: {INSTRUCTIONS[kind]}\n" for kind in kinds)
+    data = {s.id: s.inputs for s in sections}
+    return (
+        "Write the prose for parts of a CV from the JSON data below, which is keyed by section id.\n"
+        f"{rules}"
+        "Return ONLY a JSON object with exactly these keys: " + ", ".join(data) + ".\n"
+        "Data:\n" + json.dumps(data, separators=(",", ":"))
+    )
+
+
+def _valid(section, value):
+    if section.kind == "summary":
+        return has_text(value)
+    return isinstance(value, list) and any(has_text(item) for item in value)
+
+
+def parse_sections(content, sections):
+    """Return {section id: output} for the sections the model answered properly."""
+    data = parse_narrative(content)
+    outputs = {}
+    for section in sections:
+        value = data.get(section.id)
+        if _valid(section, value):
+            outputs[section.id] = value.strip() if section.kind == "summary" else [
+                item.strip() for item in value if has_text(item)
+            ]
+    return outputs
+
+
+@contextmanager
+def prefilled(store):
+    """Read sections from store before the section cache while rendering in this context."""
+    token = _prefilled.set(store)
+    try:
+        yield
+    finally:
+        _prefilled.reset(token)
+
+
+def cached_outputs(cache, sections):
+    """Return ({section id: output} found in cache, [sections still to generate])."""
+    store = _prefilled.get()
+    outputs, missing = {}, []
+    for section in sections:
+        cached = store.get(section.key) if store is not None else None
+        if cached is None:
+            cached = cache.get(section.key)
+        if cached is None:
+            missing.append(section)
+        else:
+            outputs[section.id] = json.loads(cached)
+    metrics.cv_sections.inc(len(outputs), result="reused", **metrics.current_labels())
+    metrics.cv_sections.inc(len(missing), result="generated", **metrics.current_labels())
+    logger.info("CV sections: %d reused, %d to generate", len(outputs), len(missing),
+                extra={"reused": len(outputs), "generate": len(missing)})
+    return outputs, missing
+
+
+def store_outputs(cache, sections, outputs):
+    """Cache the generated output of every section in outputs."""
+    for section in sections:
+        if section.id in outputs:
+            cache.set(section.key, json.dumps(outputs[section.id], ensure_ascii=False))
+
+
+def to_narrative(sections, outputs):
+    """Assemble section outputs into the narrative shape cv_renderer.render_cv expects."""
+    narrative = {"experience": [], "projects": []}
+    for section in sections:
+        value = outputs.get(section.id)
+        if section.kind == "summary":
+            if value is not None:
+                narrative["summary"] = value
+            continue
+        entries = narrative["experience" if section.kind == "experience" else "projects"]
+        entries.extend([None] * (section.index + 1 - len(entries)))
+        entries[section.index] = value
+    return narrative
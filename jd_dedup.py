@@ -0,0 +1,181 @@
+"""
+Near-duplicate detection for job descriptions.
+Users often paste the same posting with different whitespace, tracking links
+or boilerplate. Job descriptions are normalized and fingerprinted with MinHash
+signatures over word shingles; LSH banding finds earlier postings whose
+estimated Jaccard similarity is above a threshold, so results derived from a
+posting (keyword terms, generated resumes) are reused under its canonical key.
+Runs locally, with no embedding service.
+"""
+
+import hashlib
+import logging
+import os
+import random
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+SHINGLE_SIZE = 4
+NUM_PERMUTATIONS = 64
+# 16 bands of 4 rows: pairs above ~0.5 similarity share a band with high probability
+BANDS = 16
+ROWS = NUM_PERMUTATIONS // BANDS
+
+URL_PATTERN = re.compile(r"(?:https?://|www\.)\S+")
+EMAIL_PATTERN = re.compile(r"\S+@\S+\.\S+")
+WORD_PATTERN = re.compile(r"[a-z0-9+#]+")
+
+_PRIME = (1 << 61) - 1
+# Fixed seed so signatures are the same in every worker process
+_rng = random.Random(20240917)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERMUTATIONS)]
+
+
+def normalize(text):
+    """Lowercase, drop links and emails (tracking text) and collapse punctuation and whitespace."""
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    text = EMAIL_PATTERN.sub(" ", URL_PATTERN.sub(" ", text))
+    return " ".join(WORD_PATTERN.findall(text))
+
+
+def shingles(normalized):
+    words = normalized.split()
+    if len(words) <= SHINGLE_SIZE:
+        return {normalized}
+    return {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def signature(normalized):
+    """MinHash signature of the text's word shingles."""
+    hashes = [
+        int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "big")
+        for s in shingles(normalized)
+    ]
+    return tuple(min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS)
+
+
+def similarity(first, second):
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(1 for a, b in zip(first, second) if a == b) / NUM_PERMUTATIONS
+
+
+def _bands(sig):
+    return [(band, sig[band * ROWS:(band + 1) * ROWS]) for band in range(BANDS)]
+
+
+class _Entry:
+    def __init__(self, key, sig):
+        self.key = key
+        self.signature = sig
+        # Normalized-text digests that resolve to this entry
+        self.digests = {key}
+        # Results derived from this posting, by name
+        self.artifacts = {}
+
+
+class JobDescriptionIndex:
+    """
+    Maps job descriptions to the canonical key of the first near-identical
+    posting seen. Bounded LRU; thread-safe.
+    """
+
+    def __init__(self, threshold=0.8, max_entries=5000):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._exact = {}
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self.counts = {"exact": 0, "near": 0, "new": 0}
+
+    def _lookup(self, text):
+        normalized = normalize(text)
+        digest = hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+        with self._lock:
+            key = self._exact.get(digest)
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key], "exact"
+
+        sig = signature(normalized)
+        with self._lock:
+            candidates = set()
+            for band in _bands(sig):
+                candidates.update(self._buckets.get(band, ()))
+            best, best_score = None, 0.0
+            for key in candidates:
+                score = similarity(sig, self._entries[key].signature)
+                if score > best_score:
+                    best, best_score = key, score
+            if best is not None and best_score >= self.threshold:
+                entry = self._entries[best]
+                self._entries.move_to_end(best)
+                self._exact[digest] = best
+                entry.digests.add(digest)
+                return entry, "near"
+
+            entry = _Entry(digest, sig)
+            self._entries[digest] = entry
+            self._exact[digest] = digest
+            for band in _bands(sig):
+                self._buckets.setdefault(band, set()).add(digest)
+            while len(self._entries) > self.max_entries:
+                self._evict(self._entries.popitem(last=False)[1])
+            return entry, "new"
+
+    def _evict(self, entry):
+        for band in _bands(entry.signature):
+            keys = self._buckets.get(band)
+            if keys is not None:
+                keys.discard(entry.key)
+                if not keys:
+                    del self._buckets[band]
+        for digest in entry.digests:
+            self._exact.pop(digest, None)
+
+    def _record(self, entry, result):
+        with self._lock:
+            self.counts[result] += 1
+        metrics.job_description_lookups.inc(result=result, route=metrics.current_labels()["route"])
+        if result == "near":
+            logger.debug("Job description matched an earlier posting", extra={"jd_key": entry.key[:12]})
+
+    def canonical(self, text):
+        """Return (canonical key, 'exact' | 'near' | 'new') for a job description."""
+        entry, result = self._lookup(text)
+        self._record(entry, result)
+        return entry.key, result
+
+    def artifact(self, text, name, compute):
+        """Return the named result derived from this posting, computing it on the first request."""
+        entry, result = self._lookup(text)
+        self._record(entry, result)
+        value = entry.artifacts.get(name)
+        if value is None:
+            value = compute(text)
+            entry.artifacts[name] = value
+        return value
+
+    def stats(self):
+        with self._lock:
+            lookups = sum(self.counts.values())
+            duplicates = self.counts["exact"] + self.counts["near"]
+            return {
+                **self.counts,
+                "dedup_rate": round(duplicates / lookups, 4) if lookups else 0.0,
+                "entries": len(self._entries),
+            }
+
+
+def create_jd_index():
+    """Build the job description index from environment variables."""
+    return JobDescriptionIndex(
+        threshold=float(os.getenv("JD_DEDUP_THRESHOLD", 0.8)),
+        max_entries=int(os.getenv("JD_DEDUP_MAX_ENTRIES", 5000)),
+    )
@@ -0,0 +1,210 @@
+"""
+Background job queue for long-running generations.
+Jobs run on a bounded thread pool, or on a dedicated pool for kinds that
+hold a worker for hours (bulk CV runs waiting on the Batch API), so they
+cannot starve the short jobs; their status and results are kept in
+memory or, when a database path is given, in SQLite so any worker process
+can answer status queries. Jobs a stopped process left queued or running in
+the database are marked failed when the queue is next created.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+INTERRUPTED = "Interrupted by a restart"
+
+
+class QueueFullError(Exception):
+    """Raised when the queue already holds the maximum number of pending jobs."""
+
+
+class JobQueue:
+    """Bounded worker pool with job status tracking."""
+
+    def __init__(self, max_workers=4, max_queue_depth=100, db_path=None, result_ttl=3600, pools=None):
+        self.max_workers = max_workers
+        self.pools = dict(pools or {})
+        self.max_queue_depth = max_queue_depth
+        self.db_path = db_path
+        self.result_ttl = result_ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        # Job kind -> its own executor, from pools {kind: max_workers}
+        self._executors = {
+            kind: ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"job-{kind}")
+            for kind, workers in self.pools.items()
+        }
+        self._jobs = {}
+        self._pending = 0
+        self._lock = threading.Lock()
+
+        if self.db_path:
+            with self._connect() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS jobs ("
+                    "id TEXT PRIMARY KEY, kind TEXT NOT NULL, status TEXT NOT NULL, "
+                    "result TEXT, error TEXT, created_at REAL NOT NULL, "
+                    "started_at REAL, finished_at REAL)"
+                )
+                columns = [row[1] for row in conn.execute("PRAGMA table_info(jobs)")]
+                if "owner" not in columns:
+                    conn.execute("ALTER TABLE jobs ADD COLUMN owner INTEGER")
+            self._fail_interrupted()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=5)
+
+    def _fail_interrupted(self):
+        """Fail the unfinished jobs of processes that are no longer running."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id, owner FROM jobs WHERE status IN (?, ?)", (QUEUED, RUNNING)
+            ).fetchall()
+            stopped = [job_id for job_id, owner in rows if not _process_alive(owner)]
+            conn.executemany(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+                [(FAILED, INTERRUPTED, time.time(), job_id) for job_id in stopped],
+            )
+        if stopped:
+            logger.warning("Marked %d interrupted jobs as failed", len(stopped))
+
+    def submit(self, kind, func, *args, **kwargs):
+        """
+        Queue func(*args, **kwargs) and return the new job id.
+        func's return value must be JSON-serializable; it becomes the job result.
+        """
+        with self._lock:
+            if self._pending >= self.max_queue_depth:
+                raise QueueFullError(f"Job queue is full ({self.max_queue_depth} pending jobs)")
+            self._pending += 1
+
+        job_id = uuid.uuid4().hex
+        self._save({
+            "id": job_id,
+            "kind": kind,
+            "status": QUEUED,
+            "result": None,
+            "error": None,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+        })
+        self._executors.get(kind, self._executor).submit(self._run, job_id, func, args, kwargs)
+        return job_id
+
+    def _run(self, job_id, func, args, kwargs):
+        self._update(job_id, status=RUNNING, started_at=time.time())
+        try:
+            result = func(*args, **kwargs)
+            self._update(job_id, status=COMPLETED, result=result, finished_at=time.time())
+        except Exception as e:
+            logger.error("Job %s failed: %s", job_id, e, extra={"job_id": job_id})
+            self._update(job_id, status=FAILED, error=str(e), finished_at=time.time())
+        finally:
+            with self._lock:
+                self._pending -= 1
+            self._prune()
+
+    def _save(self, job):
+        if self.db_path:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO jobs "
+                    "(id, kind, status, result, error, created_at, started_at, finished_at, owner) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (job["id"], job["kind"], job["status"], json.dumps(job["result"]),
+                     job["error"], job["created_at"], job["started_at"], job["finished_at"], os.getpid()),
+                )
+        else:
+            with self._lock:
+                self._jobs[job["id"]] = job
+
+    def _update(self, job_id, **fields):
+        job = self.get(job_id)
+        if job is None:
+            return
+        job.update(fields)
+        self._save(job)
+
+    def get(self, job_id):
+        """Return the job record as a dict, or None if unknown."""
+        if self.db_path:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT id, kind, status, result, error, created_at, started_at, finished_at "
+                    "FROM jobs WHERE id = ?", (job_id,)
+                ).fetchone()
+            if row is None:
+                return None
+            keys = ["id", "kind", "status", "result", "error", "created_at", "started_at", "finished_at"]
+            job = dict(zip(keys, row))
+            job["result"] = json.loads(job["result"]) if job["result"] else None
+            return job
+
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def _prune(self):
+        """Forget finished jobs older than result_ttl."""
+        if not self.result_ttl:
+            return
+        cutoff = time.time() - self.result_ttl
+        if self.db_path:
+            with self._connect() as conn:
+                conn.execute(
+                    "DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?", (cutoff,)
+                )
+        else:
+            with self._lock:
+                expired = [
+                    job_id for job_id, job in self._jobs.items()
+                    if job["finished_at"] and job["finished_at"] < cutoff
+                ]
+                for job_id in expired:
+                    del self._jobs[job_id]
+
+    def stats(self):
+        """Return queue occupancy for reporting."""
+        with self._lock:
+            return {
+                "pending": self._pending,
+                "max_workers": self.max_workers,
+                "pools": dict(self.pools),
+                "max_queue_depth": self.max_queue_depth,
+            }
+
+
+def _process_alive(pid):
+    """Whether the worker process that owns a job is still running on this host."""
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def create_job_queue():
+    """Build the job queue from environment variables."""
+    return JobQueue(
+        max_workers=int(os.getenv("JOB_WORKERS", 4)),
+        max_queue_depth=int(os.getenv("JOB_QUEUE_DEPTH", 100)),
+        db_path=os.getenv("JOBS_DB_PATH") or None,
+        result_ttl=int(os.getenv("JOB_RESULT_TTL", 3600)),
+        pools={"generate-cv-batch": int(os.getenv("CV_BATCH_JOB_WORKERS", 2))},
+    )
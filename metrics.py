@@ -0,0 +1,237 @@
+"""
+In-process metrics.
+Counters, gauges and histograms for request latency, model latency, text
+extraction time, token usage and cost, labelled by route and analysis_type,
+rendered in the Prometheus text exposition format for /metrics.
+Values are per process; scrape every worker when running several.
+"""
+
+import contextvars
+import json
+import os
+import threading
+
+# Labels of the request being served (route, analysis_type); copied into
+# asyncio tasks automatically and into thread pools through with_labels()
+_labels = contextvars.ContextVar("metric_labels", default={})
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+
+# USD per million (input, output) tokens; MODEL_PRICES (JSON) adds or overrides entries
+MODEL_PRICES = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1-nano": (0.10, 0.40),
+}
+MODEL_PRICES.update({k: tuple(v) for k, v in json.loads(os.getenv("MODEL_PRICES") or "{}").items()})
+
+
+def set_labels(**labels):
+    """Set labels (route, analysis_type, ...) for metrics recorded in the current context."""
+    _labels.set({**_labels.get(), **labels})
+
+
+def reset_labels(**labels):
+    """Replace the labels of the current context, e.g. at the start of a request."""
+    _labels.set(labels)
+
+
+def current_labels():
+    """Return the route/analysis_type labels of the current context."""
+    labels = _labels.get()
+    return {"route": labels.get("route", ""), "analysis_type": labels.get("analysis_type", "")}
+
+
+def with_labels(fn):
+    """
+    Wrap fn so it runs in a copy of the caller's context when submitted to a
+    thread pool: metric labels and the current trace span carry over.
+    """
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.copy().run(fn, *args, **kwargs)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels, extra=None):
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+
+def _format_value(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self._series = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _header(self):
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def render(self):
+        with self._lock:
+            series = list(self._series.items())
+        return self._header() + [f"{self.name}{_format_labels(k)} {_format_value(v)}" for k, v in series]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._series[tuple(sorted(labels.items()))] = value
+
+    def values(self):
+        """Return {labels tuple: value}."""
+        with self._lock:
+            return dict(self._series)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text)
+        self.buckets = buckets
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        with self._lock:
+            series = [(k, list(v)) for k, v in self._series.items()]
+        lines = self._header()
+        for key, values in series:
+            for bound, count in zip(self.buckets, values):
+                lines.append(f"{self.name}_bucket{_format_labels(key, ('le', _format_value(bound)))} {count}")
+            lines.append(f"{self.name}_bucket{_format_labels(key, ('le', '+Inf'))} {values[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {round(values[-2], 6)}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {values[-1]}")
+        return lines
+
+
+_registry = []
+
+request_seconds = Histogram("http_request_duration_seconds", "Request latency by route.")
+requests_in_flight = Gauge("http_requests_in_flight", "Requests currently being served.")
+model_seconds = Histogram("model_request_duration_seconds", "Chat completion latency.")
+model_first_token_seconds = Histogram("model_first_token_seconds", "Time to the first streamed token.")
+model_errors = Counter("model_errors_total", "Failed chat completion calls.")
+model_retries = Counter("model_retries_total", "Chat completion calls retried after a transient error.")
+circuit_open = Gauge("model_circuit_open", "1 while the OpenAI circuit breaker is open.")
+rate_limit_wait_seconds = Histogram("rate_limit_wait_seconds", "Time model calls waited for rate limiter capacity.")
+model_quality = Counter("model_quality_total", "Model outputs by tier and whether they were usable.")
+model_tier_degraded = Gauge("model_tier_degraded", "1 while a model tier is over its latency SLO.")
+rate_limit_rejections = Counter("rate_limit_rejections_total", "Model calls rejected after waiting too long for capacity.")
+prompt_tokens = Histogram("model_prompt_tokens", "Prompt tokens per chat completion.", TOKEN_BUCKETS)
+completion_tokens = Histogram("model_completion_tokens", "Completion tokens per chat completion.", TOKEN_BUCKETS)
+model_cost = Counter("model_cost_dollars_total", "Estimated model spend in USD.")
+batch_requests = Counter("model_batch_requests_total", "Requests sent through the batch API, by result.")
+extraction_seconds = Histogram("text_extraction_duration_seconds", "CV text extraction time on cache misses.")
+pdf_render_seconds = Histogram("pdf_render_duration_seconds", "HTML-to-PDF render time in the export workers.")
+cache_lookups = Counter("cache_lookups_total", "Response cache lookups by route and result.")
+cv_sections = Counter("cv_sections_total", "CV prose sections reused from the section cache or generated.")
+job_description_lookups = Counter("job_description_lookups_total", "Job description lookups by dedup result (exact, near, new).")
+cache_hit_ratio = Gauge("cache_hit_ratio", "Hit ratio of each cache since startup.")
+
+
+def start_request(route):
+    """Mark a request as in flight and reset the context labels to its route."""
+    reset_labels(route=route)
+    requests_in_flight.inc(route=route)
+
+
+def finish_request(labels, status, seconds):
+    """Record a finished request; labels are the ones captured while it was served."""
+    requests_in_flight.dec(route=labels["route"])
+    request_seconds.observe(seconds, status=str(status), **labels)
+
+
+def in_flight():
+    """Return the number of in-flight requests per route and in total."""
+    routes = {dict(key)["route"]: int(value) for key, value in requests_in_flight.values().items() if value}
+    return {"total": sum(routes.values()), "routes": routes}
+
+
+def record_completion(model, seconds, usage=None, first_token_seconds=None, tier=""):
+    """Record latency, token usage and estimated cost of one chat completion."""
+    labels = current_labels()
+    model_seconds.observe(seconds, model=model, tier=tier, **labels)
+    if first_token_seconds is not None:
+        model_first_token_seconds.observe(first_token_seconds, model=model, tier=tier, **labels)
+    if usage is None:
+        return
+    prompt_tokens.observe(usage.prompt_tokens, model=model, **labels)
+    completion_tokens.observe(usage.completion_tokens, model=model, **labels)
+    prices = MODEL_PRICES.get(model)
+    if prices:
+        cost = (usage.prompt_tokens * prices[0] + usage.completion_tokens * prices[1]) / 1_000_000
+        model_cost.inc(cost, model=model, **labels)
+
+
+def record_batch_usage(model, usage, price_factor=1.0):
+    """Record token usage and estimated cost of one batch API request; usage is the response's dict."""
+    labels = current_labels()
+    prompt, completion = usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+    prompt_tokens.observe(prompt, model=model, **labels)
+    completion_tokens.observe(completion, model=model, **labels)
+    prices = MODEL_PRICES.get(model)
+    if prices:
+        cost = (prompt * prices[0] + completion * prices[1]) / 1_000_000 * price_factor
+        model_cost.inc(cost, model=model, **labels)
+
+
+def record_model_error(model, error):
+    model_errors.inc(model=model, error=type(error).__name__, **current_labels())
+
+
+def record_extraction(kind, seconds):
+    extraction_seconds.observe(seconds, kind=kind, **current_labels())
+
+
+def record_cache_lookup(result):
+    """Count a response cache lookup ('hit' or 'miss') for the current route."""
+    cache_lookups.inc(result=result, route=current_labels()["route"])
+
+
+def render_prometheus(caches=None):
+    """Render every metric in the Prometheus text format; caches maps name -> ResponseCache."""
+    for name, cache in (caches or {}).items():
+        cache_hit_ratio.set(cache.stats()["hit_ratio"], cache=name)
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
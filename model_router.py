@@ -0,0 +1,162 @@
+"""
+Model routing.
+Maps each route and analysis_type to a model tier, so simple tasks such as
+cover letter prose or the short match analysis run on a cheaper, faster model.
+When a tier's recent latency breaches its SLO, its calls fall back to a faster
+tier for a cooldown period. Latency is the whole call for regular completions
+and the time to the first token for streams.
+"""
+
+import contextvars
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_map(value, cast=str):
+    """Parse "key=value,key=value" settings."""
+    return {
+        key.strip(): cast(item.strip())
+        for key, item in (pair.split("=", 1) for pair in (value or "").split(",") if "=" in pair)
+    }
+
+
+# Tier name -> model; MODEL_TIERS adds or overrides, e.g. "fast=gpt-4.1-nano,premium=gpt-4.1"
+MODEL_TIERS = {
+    "fast": os.getenv("MODEL_TIER_FAST", "gpt-4o-mini"),
+    "standard": os.getenv("OPENAI_MODEL", "gpt-4o"),
+    **_parse_map(os.getenv("MODEL_TIERS")),
+}
+MODEL_DEFAULT_TIER = os.getenv("MODEL_DEFAULT_TIER", "standard")
+# Tier per route or analysis_type (analysis_type wins); MODEL_ROUTES adds or overrides
+DEFAULT_ROUTES = {
+    "/generate-cover-letter": "fast",
+    "match": "fast",
+    "/ats-batch": "fast",
+}
+MODEL_ROUTES = {**DEFAULT_ROUTES, **_parse_map(os.getenv("MODEL_ROUTES"))}
+# Latency SLO in seconds per tier, e.g. "standard=45"; tiers without one never fall back
+MODEL_LATENCY_SLOS = _parse_map(os.getenv("MODEL_LATENCY_SLOS"), float)
+MODEL_FALLBACKS = _parse_map(os.getenv("MODEL_FALLBACKS", "standard=fast"))
+# The SLO is checked against this percentile of the last MODEL_SLO_WINDOW calls
+MODEL_SLO_PERCENTILE = float(os.getenv("MODEL_SLO_PERCENTILE", 0.9))
+MODEL_SLO_WINDOW = int(os.getenv("MODEL_SLO_WINDOW", 20))
+MODEL_FALLBACK_COOLDOWN = float(os.getenv("MODEL_FALLBACK_COOLDOWN", 60))
+# Fewest samples needed before a tier can be marked degraded
+MIN_SLO_SAMPLES = 5
+
+# (tier, model) of the last call made in this context, for record_quality()
+_last_choice = contextvars.ContextVar("model_choice", default=None)
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class ModelRouter:
+    """Picks the tier and model of each call and tracks tier latency against its SLO."""
+
+    def __init__(self, tiers=None, routes=None, default_tier=MODEL_DEFAULT_TIER, slos=None, fallbacks=None,
+                 window=MODEL_SLO_WINDOW, percentile=MODEL_SLO_PERCENTILE, cooldown=MODEL_FALLBACK_COOLDOWN):
+        self.tiers = tiers or MODEL_TIERS
+        self.routes = MODEL_ROUTES if routes is None else routes
+        self.default_tier = default_tier
+        self.slos = MODEL_LATENCY_SLOS if slos is None else slos
+        self.fallbacks = MODEL_FALLBACKS if fallbacks is None else fallbacks
+        self.percentile = percentile
+        self.cooldown = cooldown
+        self._latencies = {tier: deque(maxlen=window) for tier in self.tiers}
+        self._degraded_until = {}
+        self._lock = threading.Lock()
+        for tier in list(self.routes.values()) + [default_tier] + list(self.fallbacks.values()):
+            if tier not in self.tiers:
+                raise ValueError(f"Unknown model tier: {tier}")
+
+    def tier_for(self, labels=None):
+        """Configured tier for the current (or given) route / analysis_type labels."""
+        labels = labels or metrics.current_labels()
+        for key in (labels["analysis_type"], labels["route"]):
+            if key in self.routes:
+                return self.routes[key]
+        return self.default_tier
+
+    def route_model(self):
+        """Model configured for the current request, ignoring fallbacks (used in cache keys)."""
+        return self.tiers[self.tier_for()]
+
+    def _degraded(self, tier):
+        until = self._degraded_until.get(tier)
+        if until is None:
+            return False
+        if time.monotonic() < until:
+            return True
+        with self._lock:
+            if self._degraded_until.pop(tier, None) is not None:
+                metrics.model_tier_degraded.set(0, tier=tier)
+                logger.info("Model tier %s back in service", tier)
+        return False
+
+    def select(self):
+        """Return (tier, model) for a call made while serving the current request."""
+        tier = self.tier_for()
+        fallback = self.fallbacks.get(tier)
+        if fallback and self._degraded(tier):
+            tier = fallback
+        choice = (tier, self.tiers[tier])
+        _last_choice.set(choice)
+        return choice
+
+    def observe(self, tier, seconds):
+        """Record the latency of a call; a tier over its SLO is degraded for the cooldown."""
+        slo = self.slos.get(tier)
+        if not slo:
+            return
+        with self._lock:
+            samples = self._latencies[tier]
+            samples.append(seconds)
+            if len(samples) < MIN_SLO_SAMPLES or tier in self._degraded_until:
+                return
+            observed = _percentile(samples, self.percentile)
+            if observed <= slo:
+                return
+            self._degraded_until[tier] = time.monotonic() + self.cooldown
+            samples.clear()
+        metrics.model_tier_degraded.set(1, tier=tier)
+        logger.warning(
+            "Model tier %s over its latency SLO (p%d %.1fs > %.1fs), falling back to %s for %.0fs",
+            tier, self.percentile * 100, observed, slo, self.fallbacks.get(tier), self.cooldown,
+        )
+
+    def record_quality(self, ok):
+        """Count whether the output of the last call in this context was usable."""
+        choice = _last_choice.get()
+        if choice is None:
+            return
+        tier, model = choice
+        metrics.model_quality.inc(tier=tier, model=model, result="ok" if ok else "invalid",
+                                  **metrics.current_labels())
+
+    def stats(self):
+        with self._lock:
+            latencies = {tier: list(samples) for tier, samples in self._latencies.items()}
+        return {
+            tier: {
+                "model": model,
+                "slo_seconds": self.slos.get(tier),
+                "degraded": self._degraded(tier),
+                f"p{int(self.percentile * 100)}_seconds": (
+                    round(_percentile(latencies[tier], self.percentile), 3) if latencies[tier] else None
+                ),
+            }
+            for tier, model in self.tiers.items()
+        }
+
+
+router = ModelRouter()
@@ -0,0 +1,259 @@
+"""
+OpenAI client layer.
+Builds the sync and async clients on a sized HTTP connection pool with
+explicit timeouts, and wraps chat completion calls with jittered exponential
+backoff for rate limits and transient upstream errors, plus a circuit breaker
+that fails fast while the upstream is degraded.
+"""
+
+import asyncio
+import logging
+from contextlib import contextmanager
+import math
+import os
+import random
+import threading
+import time
+
+import httpx
+import openai
+from openai import AsyncOpenAI, OpenAI
+
+import metrics
+from rate_limiter import GuardedStream, ThrottledError, estimate_tokens, limiter, release_for, release_for_async
+
+logger = logging.getLogger(__name__)
+
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", 100))
+OPENAI_MAX_KEEPALIVE = int(os.getenv("OPENAI_MAX_KEEPALIVE", 20))
+OPENAI_CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", 10))
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", 120))
+# Per-route overrides of OPENAI_TIMEOUT, e.g. "/generate-cv=90,/ats-analyze=60"
+OPENAI_TIMEOUTS = {
+    route.strip(): float(seconds)
+    for route, seconds in (item.split("=", 1) for item in os.getenv("OPENAI_TIMEOUTS", "").split(",") if "=" in item)
+}
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", 3))
+OPENAI_BACKOFF_BASE = float(os.getenv("OPENAI_BACKOFF_BASE", 0.5))
+OPENAI_BACKOFF_MAX = float(os.getenv("OPENAI_BACKOFF_MAX", 20))
+# Consecutive transient failures that open the breaker, and how long it stays open
+OPENAI_BREAKER_THRESHOLD = int(os.getenv("OPENAI_BREAKER_THRESHOLD", 5))
+OPENAI_BREAKER_COOLDOWN = float(os.getenv("OPENAI_BREAKER_COOLDOWN", 30))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the API while the circuit breaker is open."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Model service is temporarily unavailable, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive transient failures and rejects calls
+    for `cooldown` seconds; then lets a single trial call through (half-open)
+    and closes again if it succeeds.
+    """
+
+    def __init__(self, threshold=OPENAI_BREAKER_THRESHOLD, cooldown=OPENAI_BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Raise CircuitOpenError if the call must not go out."""
+        if not self.threshold:
+            return
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            remaining = self.opened_at + self.cooldown - time.monotonic()
+            if self.state == OPEN and remaining <= 0:
+                self._set_state(HALF_OPEN)
+            if self.state == HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return
+            raise CircuitOpenError(max(remaining, 1.0))
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._trial_running = False
+            if self.state != CLOSED:
+                self._set_state(CLOSED)
+
+    def release_trial(self):
+        """End a half-open trial call that neither succeeded nor failed (e.g. it was cancelled)."""
+        with self._lock:
+            self._trial_running = False
+
+    @contextmanager
+    def recording(self):
+        """Record the outcome of the API call made in the block, however the block ends."""
+        succeeded = None
+        try:
+            yield
+            succeeded = True
+        except Exception as e:
+            # A non-transient error (bad request, auth) still means the API answered
+            succeeded = not is_transient(e)
+            raise
+        finally:
+            if succeeded is None:
+                self.release_trial()
+            elif succeeded:
+                self.record_success()
+            else:
+                self.record_failure()
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.threshold and (self.state == HALF_OPEN or self.failures >= self.threshold):
+                self.opened_at = time.monotonic()
+                if self.state != OPEN:
+                    self._set_state(OPEN)
+
+    def _set_state(self, state):
+        logger.warning("OpenAI circuit breaker %s -> %s", self.state, state)
+        self.state = state
+        metrics.circuit_open.set(1 if state == OPEN else 0)
+
+    def stats(self):
+        with self._lock:
+            return {"state": self.state, "consecutive_failures": self.failures}
+
+
+breaker = CircuitBreaker()
+
+
+def is_transient(error):
+    """Rate limits, timeouts, connection failures and 5xx responses are worth retrying."""
+    if isinstance(error, (CircuitOpenError, ThrottledError, openai.RateLimitError, openai.APIConnectionError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+
+def error_status(error):
+    """HTTP status and headers for a failed model call: 429/503 for throttling and upstream errors, else 500."""
+    if isinstance(error, CircuitOpenError):
+        return 503, {"Retry-After": str(math.ceil(error.retry_after))}
+    if isinstance(error, ThrottledError):
+        return 429, {"Retry-After": str(math.ceil(error.retry_after))}
+    if is_transient(error):
+        return 503, {}
+    return 500, {}
+
+
+def backoff_delay(attempt, error=None):
+    """Full-jitter exponential backoff, honouring Retry-After when the API sends one."""
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after:
+        try:
+            return min(float(retry_after), OPENAI_BACKOFF_MAX)
+        except ValueError:
+            pass
+    return random.uniform(0, min(OPENAI_BACKOFF_MAX, OPENAI_BACKOFF_BASE * 2 ** attempt))
+
+
+def request_timeout():
+    """Timeout for a model call made while serving the current route."""
+    return OPENAI_TIMEOUTS.get(metrics.current_labels()["route"], OPENAI_TIMEOUT)
+
+
+def _timeout():
+    return httpx.Timeout(OPENAI_TIMEOUT, connect=OPENAI_CONNECT_TIMEOUT)
+
+
+def _limits():
+    return httpx.Limits(max_connections=OPENAI_MAX_CONNECTIONS, max_keepalive_connections=OPENAI_MAX_KEEPALIVE)
+
+
+def create_client(api_key):
+    """Sync client on a sized connection pool; retries are handled by create_completion."""
+    return OpenAI(
+        api_key=api_key, max_retries=0, timeout=_timeout(),
+        http_client=httpx.Client(limits=_limits(), timeout=_timeout()),
+    )
+
+
+def create_async_client(api_key):
+    """Async counterpart of create_client."""
+    return AsyncOpenAI(
+        api_key=api_key, max_retries=0, timeout=_timeout(),
+        http_client=httpx.AsyncClient(limits=_limits(), timeout=_timeout()),
+    )
+
+
+def _should_retry(error, attempt):
+    if not is_transient(error) or isinstance(error, (CircuitOpenError, ThrottledError)):
+        return False
+    if attempt >= OPENAI_MAX_RETRIES:
+        return False
+    metrics.model_retries.inc(error=type(error).__name__, **metrics.current_labels())
+    return True
+
+
+def create_completion(client, **kwargs):
+    """client.chat.completions.create with rate limiting, timeouts, retries and the circuit breaker."""
+    kwargs.setdefault("timeout", request_timeout())
+    tokens = estimate_tokens(kwargs)
+    attempt = 0
+    while True:
+        # Capacity first: a throttled call must not hold the breaker's half-open trial
+        lease = limiter.acquire(tokens)
+        try:
+            breaker.before_call()
+            with breaker.recording():
+                response = client.chat.completions.create(**kwargs)
+        except BaseException as e:
+            lease.release()
+            if not isinstance(e, Exception) or not _should_retry(e, attempt):
+                raise
+            delay = backoff_delay(attempt, e)
+            logger.warning("OpenAI call failed (%s), retry %d in %.2fs", type(e).__name__, attempt + 1, delay)
+            time.sleep(delay)
+            attempt += 1
+            continue
+        if kwargs.get("stream"):
+            return GuardedStream(response, lease)
+        release_for(lease, response)
+        return response
+
+
+async def acreate_completion(client, **kwargs):
+    """Async counterpart of create_completion."""
+    kwargs.setdefault("timeout", request_timeout())
+    tokens = estimate_tokens(kwargs)
+    attempt = 0
+    while True:
+        # Capacity first: a throttled call must not hold the breaker's half-open trial
+        lease = await limiter.acquire_async(tokens)
+        try:
+            breaker.before_call()
+            with breaker.recording():
+                response = await client.chat.completions.create(**kwargs)
+        except BaseException as e:
+            await lease.release_async()
+            if not isinstance(e, Exception) or not _should_retry(e, attempt):
+                raise
+            delay = backoff_delay(attempt, e)
+            logger.warning("OpenAI call failed (%s), retry %d in %.2fs", type(e).__name__, attempt + 1, delay)
+            await asyncio.sleep(delay)
+            attempt += 1
+            continue
+        if kwargs.get("stream"):
+            return GuardedStream(response, lease)
+        await release_for_async(lease, response)
+        return response
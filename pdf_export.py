@@ -0,0 +1,82 @@
+"""
+HTML-to-PDF export.
+Generated CVs and cover letters are laid out with PyMuPDF's Story API in a
+pool of worker processes. Workers are started and warmed up (fonts and the
+HTML engine loaded) ahead of the first request, so exports run in parallel
+across cores without paying the startup cost on the request path.
+The workers run pdf_worker. Being spawned, they also re-import the main
+script: serve through gunicorn / hypercorn (or another entrypoint with a small
+main module) rather than `python app.py`, which every worker would import.
+"""
+
+import logging
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import pdf_worker
+from token_budget import STYLE_PATTERN
+
+logger = logging.getLogger(__name__)
+
+PDF_EXPORT_WORKERS = int(os.getenv("PDF_EXPORT_WORKERS", os.cpu_count() or 2))
+PDF_EXPORT_TIMEOUT = float(os.getenv("PDF_EXPORT_TIMEOUT", 30))
+PDF_EXPORT_MAX_HTML_BYTES = int(os.getenv("PDF_EXPORT_MAX_HTML_BYTES", 2 * 1024 * 1024))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def template_css(template_html):
+    """CSS of a template's <style> blocks, for HTML that arrives without them."""
+    return "\n".join(match.group(2) for match in STYLE_PATTERN.finditer(template_html or ""))
+
+
+def has_styles(html):
+    return STYLE_PATTERN.search(html) is not None
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # Spawned rather than forked: the server already runs logging and tracing threads
+                _pool = ProcessPoolExecutor(max_workers=PDF_EXPORT_WORKERS, initializer=pdf_worker.warm_up,
+                                            mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def start_workers():
+    """Start and warm up every worker; call at server startup."""
+    pool = _get_pool()
+    for future in [pool.submit(len, "") for _ in range(PDF_EXPORT_WORKERS)]:
+        future.result()
+    logger.info("PDF export workers ready", extra={"workers": PDF_EXPORT_WORKERS})
+
+
+def start_workers_in_background():
+    """Start the workers without delaying server startup; otherwise they start on the first export."""
+    threading.Thread(target=start_workers, name="pdf-warmup", daemon=True).start()
+
+
+def submit(html, css=""):
+    """Render in the worker pool; returns a concurrent Future of (pdf, pages, seconds)."""
+    if len(html.encode("utf-8")) > PDF_EXPORT_MAX_HTML_BYTES:
+        raise ValueError(f"HTML is larger than the {PDF_EXPORT_MAX_HTML_BYTES // 1024} KB export limit")
+    return _get_pool().submit(pdf_worker.render_timed, html, css)
+
+
+def export_pdf(html, css=""):
+    """Render in the worker pool and wait for the result."""
+    return submit(html, css).result(timeout=PDF_EXPORT_TIMEOUT)
+
+
+def safe_filename(name, default="document.pdf"):
+    """Filename for the Content-Disposition header."""
+    name = re.sub(r"[^A-Za-z0-9._-]+", "_", os.path.basename(name or "")).strip("._")
+    if not name:
+        return default
+    return name if name.lower().endswith(".pdf") else name + ".pdf"
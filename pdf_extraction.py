@@ -0,0 +1,165 @@
+"""
+Text extraction pipeline for uploaded CVs.
+Uploads are spooled to a temporary file (with a byte cap), pages are extracted
+in parallel across a process pool for large documents, and per-page timings
+are recorded so slow uploads can be spotted.
+"""
+
+import hashlib
+import logging
+import multiprocessing
+import os
+import re
+import tempfile
+import unicodedata
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+try:
+    import fitz
+except ImportError:
+    # Fallback for different PyMuPDF versions
+    try:
+        import PyMuPDF as fitz
+    except ImportError:
+        logger.warning("PyMuPDF not available. PDF processing will not work.")
+        fitz = None
+
+PDF_MAX_BYTES = int(os.getenv("PDF_MAX_BYTES", 20 * 1024 * 1024))
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", 50))
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", os.cpu_count() or 2))
+# Documents with fewer pages are extracted in-process; the pool startup is not worth it
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", 16))
+
+ExtractionResult = namedtuple("ExtractionResult", ["text", "page_timings", "total_seconds", "truncated"])
+
+_pool = None
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        # Spawned rather than forked, like pdf_export: forking copies the server's
+        # logging and tracing threads' locks into the children
+        _pool = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def _extract_page_range(path, start, stop):
+    """Extract pages [start, stop) from the PDF at path; runs in a worker process."""
+    pages = []
+    with fitz.open(path) as doc:
+        for number in range(start, stop):
+            began = time.perf_counter()
+            text = doc[number].get_text("text")
+            pages.append((text, time.perf_counter() - began))
+    return pages
+
+
+def spool_upload(upload, suffix=""):
+    """Copy an uploaded file to a temporary file, enforcing PDF_MAX_BYTES."""
+    upload.seek(0)
+    spooled = tempfile.NamedTemporaryFile(suffix=suffix, delete=False)
+    try:
+        copied = 0
+        while True:
+            chunk = upload.read(1024 * 1024)
+            if not chunk:
+                break
+            copied += len(chunk)
+            if copied > PDF_MAX_BYTES:
+                raise ValueError(f"File is larger than the {PDF_MAX_BYTES // (1024 * 1024)} MB limit")
+            spooled.write(chunk)
+        spooled.close()
+        return spooled.name
+    except Exception:
+        spooled.close()
+        os.unlink(spooled.name)
+        raise
+
+
+def hash_upload(upload):
+    """Return the SHA-256 hex digest of an uploaded file, enforcing PDF_MAX_BYTES."""
+    digest = hashlib.sha256()
+    size = 0
+    upload.seek(0)
+    while True:
+        chunk = upload.read(1024 * 1024)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > PDF_MAX_BYTES:
+            raise ValueError(f"File is larger than the {PDF_MAX_BYTES // (1024 * 1024)} MB limit")
+        digest.update(chunk)
+    upload.seek(0)
+    return digest.hexdigest()
+
+
+def normalize_text(text):
+    """Normalize extracted text: unicode forms, runs of spaces and blank lines."""
+    text = unicodedata.normalize("NFKC", text)
+    text = re.sub(r"[ \t\u00a0]+", " ", text)
+    text = re.sub(r" *\n *", "\n", text)
+    text = re.sub(r"\n{3,}", "\n\n", text)
+    return text.strip()
+
+
+def extract_pdf_text(path):
+    """Extract text from the PDF at path, in parallel for large documents."""
+    if fitz is None:
+        raise ValueError("PyMuPDF not available. Cannot process PDF files.")
+
+    started = time.perf_counter()
+    with fitz.open(path) as doc:
+        page_count = doc.page_count
+    pages_to_read = min(page_count, PDF_MAX_PAGES)
+
+    if pages_to_read >= PDF_PARALLEL_MIN_PAGES and PDF_WORKERS > 1:
+        chunk_size = -(-pages_to_read // PDF_WORKERS)
+        futures = [
+            _get_pool().submit(_extract_page_range, path, start, min(start + chunk_size, pages_to_read))
+            for start in range(0, pages_to_read, chunk_size)
+        ]
+        pages = [page for future in futures for page in future.result()]
+    else:
+        pages = _extract_page_range(path, 0, pages_to_read)
+
+    return ExtractionResult(
+        text="".join(text for text, _ in pages),
+        page_timings=[seconds for _, seconds in pages],
+        total_seconds=time.perf_counter() - started,
+        truncated=page_count > pages_to_read,
+    )
+
+
+def extract_upload_text(upload):
+    """Extract text from an uploaded PDF or plain-text file."""
+    if upload.filename.lower().endswith('.pdf'):
+        if fitz is None:
+            raise ValueError("PyMuPDF not available. Cannot process PDF files.")
+        path = spool_upload(upload, suffix=".pdf")
+        try:
+            return extract_pdf_text(path)
+        finally:
+            os.unlink(path)
+
+    started = time.perf_counter()
+    upload.seek(0)
+    data = upload.read(PDF_MAX_BYTES + 1)
+    if len(data) > PDF_MAX_BYTES:
+        raise ValueError(f"File is larger than the {PDF_MAX_BYTES // (1024 * 1024)} MB limit")
+    return ExtractionResult(data.decode('utf-8'), [], time.perf_counter() - started, False)
+
+
+def describe_timings(filename, result):
+    """One-line summary of an extraction, naming the slowest page."""
+    summary = f"Extracted {len(result.page_timings)} page(s) from {filename} in {result.total_seconds:.3f}s"
+    if result.page_timings:
+        slowest = max(range(len(result.page_timings)), key=result.page_timings.__getitem__)
+        summary += f" (slowest page {slowest + 1}: {result.page_timings[slowest]:.3f}s)"
+    if result.truncated:
+        summary += f", truncated to {PDF_MAX_PAGES} pages"
+    return summary
@@ -0,0 +1,51 @@
+"""
+Worker side of pdf_export. Kept apart from the app so the spawned worker
+processes only import PyMuPDF and this module.
+"""
+
+import io
+import os
+import time
+
+from pdf_extraction import fitz
+
+# a4 | letter | ...
+PDF_PAGE_SIZE = os.getenv("PDF_PAGE_SIZE", "a4").lower()
+# Page margin in points
+PDF_MARGIN = float(os.getenv("PDF_MARGIN", 36))
+
+WARMUP_HTML = "<html><head><style>body { font-family: Arial, sans-serif; }</style></head><body><p>warm-up</p></body></html>"
+
+
+def render_pdf(html, css=""):
+    """Lay out html (plus extra css) on pages and return the PDF bytes."""
+    if fitz is None:
+        raise ValueError("PyMuPDF not available. Cannot export PDF files.")
+    mediabox = fitz.paper_rect(PDF_PAGE_SIZE)
+    where = mediabox + (PDF_MARGIN, PDF_MARGIN, -PDF_MARGIN, -PDF_MARGIN)
+    story = fitz.Story(html=html, user_css=css or None)
+    output = io.BytesIO()
+    writer = fitz.DocumentWriter(output)
+    more = True
+    while more:
+        device = writer.begin_page(mediabox)
+        more, _ = story.place(where)
+        story.draw(device)
+        writer.end_page()
+    writer.close()
+    return output.getvalue()
+
+
+def render_timed(html, css):
+    """Worker entry point: returns (pdf bytes, page count, seconds)."""
+    started = time.perf_counter()
+    pdf = render_pdf(html, css)
+    with fitz.open(stream=pdf, filetype="pdf") as doc:
+        pages = doc.page_count
+    return pdf, pages, time.perf_counter() - started
+
+
+def warm_up():
+    """Pool initializer: runs once in every worker so the first real export does not load fonts."""
+    if fitz is not None:
+        render_pdf(WARMUP_HTML)
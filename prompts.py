@@ -0,0 +1,271 @@
+"""
+Prompt builders shared by the sync (app.py) and async (app_async.py) servers.
+Each function returns the chat messages for one kind of generation.
+"""
+
+import json
+
+import cl_renderer
+import cv_sections
+from token_budget import (
+    CV_TEXT_TOKEN_BUDGET, JOB_DESCRIPTION_TOKEN_BUDGET, drop_empty, fit_text, log_prompt_tokens,
+)
+
+CV_SYSTEM_PROMPT = "You are a helpful cv maker assistant."
+JSON_SYSTEM_PROMPT = "You are a helpful cv maker assistant that replies with JSON only."
+ATS_SCORE_SYSTEM_PROMPT = "You are an ATS scoring assistant that outputs results in HTML format only."
+ATS_ANALYSIS_SYSTEM_PROMPT = "You are an ATS analysis assistant that outputs results in HTML format only."
+RESUME_SYSTEM_PROMPT = "You are a resume generation assistant that outputs results in HTML format only."
+
+JSON_RESPONSE_FORMAT = {"type": "json_object"}
+
+
+def _messages(system_prompt, prompt, name):
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": prompt}
+    ]
+    log_prompt_tokens(name, messages)
+    return messages
+
+
+def _fit_inputs(cv_text, job_description):
+    """Trim CV and job description text to their token budgets."""
+    return fit_text(cv_text, CV_TEXT_TOKEN_BUDGET), fit_text(job_description, JOB_DESCRIPTION_TOKEN_BUDGET)
+
+
+def cv_messages(cv_template, answers):
+    """
+    Ask the model to fill the whole CV template.
+    cv_template should be the compacted template (token_budget.CompactTemplate.html).
+    """
+    answers = drop_empty(answers)
+    prompt = (
+        "Fill this HTML CV template with the given JSON user data. "
+        "If any section data is missing or empty, remove that section from the CV. "
+        "Add new sections if relevant data is present. "
+        "Summary should be ~100 words. If user doesn't add summary just write one using his skills and experiences. "
+        "There should be 5 bullets for every experience (generate if missing). "
+        "Enhance or elaborate descriptions where needed, but preserve structure and style. "
+        "Output only the final HTML.\n"
+        + cv_template + "\nUserData:\n" + json.dumps(answers)
+    )
+    return _messages(CV_SYSTEM_PROMPT, prompt, "generate-cv")
+
+
+def cv_section_messages(sections):
+    """Ask the model for the prose of the given CV sections only (see cv_sections)."""
+    return _messages(JSON_SYSTEM_PROMPT, cv_sections.build_section_prompt(sections), "generate-cv:sections")
+
+
+def cover_letter_messages(cl_template, job_data, applicant_data):
+    """
+    Ask the model to fill the whole cover letter template.
+    cl_template should be the compacted template (token_budget.CompactTemplate.html).
+    """
+    job_data, applicant_data = drop_empty(job_data), drop_empty(applicant_data)
+    prompt = f"""You are given an HTML Cover Letter template with placeholders and JSON user data. 
+Your task is to generate the FINAL cover letter HTML by REPLACING ALL PLACEHOLDERS with the user's data.
+
+CRITICAL REQUIREMENTS (follow exactly):
+- Keep the original CSS styles and layout structure from the template.
+- REPLACE ALL PLACEHOLDERS with actual user data:
+  * [APPLICANT_NAME] → applicant.name
+  * [APPLICANT_DESIGNATION] → applicant.designation  
+  * [APPLICANT_ADDRESS] → applicant.address
+  * [APPLICANT_PHONE] → applicant.phone
+  * [APPLICANT_EMAIL] → applicant.email
+  * [APPLICATION_DATE] → job.date
+  * [HR_NAME] → job.hr_name (or "HR Manager" if empty)
+  * [COMPANY_NAME] → job.company
+  * [COVER_LETTER_CONTENT_PARAGRAPH_1] through [COVER_LETTER_CONTENT_PARAGRAPH_5] → Generate professional paragraphs based on job description, company, experience, and skills
+- Generate 5 professional paragraphs for the cover letter content using the provided data
+- Do NOT include any placeholder text or bracketed prompts
+- Do NOT generate any text with square brackets
+- Use the actual company name, job description, skills, and experience from the user data
+- If job_found data is provided, incorporate it naturally into the content
+- Output ONLY the final HTML with all placeholders replaced (no explanations, comments, or code fences)
+
+Template:
+{cl_template}
+
+UserData (use only this data):
+{json.dumps({"job": job_data, "applicant": applicant_data})}
+"""
+    return _messages(CV_SYSTEM_PROMPT, prompt, "generate-cover-letter")
+
+
+def cover_letter_paragraph_messages(job_data, applicant_data):
+    """Ask the model for the cover letter paragraphs only (see cl_renderer)."""
+    return _messages(JSON_SYSTEM_PROMPT, cl_renderer.build_paragraph_prompt(job_data, applicant_data),
+                     "generate-cover-letter:paragraphs")
+
+
+def ats_score_messages(cv_text, job_description):
+    """Ask the model for an ATS score report in HTML."""
+    cv_text, job_description = _fit_inputs(cv_text, job_description)
+    prompt = f"""
+You are an ATS (Applicant Tracking System) evaluator. 
+Compare the following CV with the Job Description and provide an ATS compatibility score (0-100).  
+Return the result in **HTML format** with the following sections:
+
+1. **Overall ATS Score** (percentage with color bar)  
+2. **Matched Keywords** (list of important job-specific keywords found in CV)  
+3. **Missing Keywords** (keywords required by JD but missing in CV)  
+4. **Skills Match** (match rate and table of skills: CV vs JD)  
+5. **Experience Match** (how relevant the experience is, 1-2 sentences + percentage)  
+6. **Education Match** (short analysis + percentage)  
+7. **Suggestions for Improvement** (bullet points for enhancing CV to improve score)
+
+Put the overall score as a whole number in a data-ats-score attribute of the element that shows it,
+e.g. <div class="overall-score" data-ats-score="72">.
+
+CV Text:
+{cv_text}
+
+Job Description:
+{job_description}
+    """
+    return _messages(ATS_SCORE_SYSTEM_PROMPT, prompt, "generate-ats-score")
+
+
+ANALYSIS_TYPES = ["match", "about", "improve", "tailor"]
+
+
+def ats_analysis_prompts(cv_text, job_description):
+    """Return the prompt for every analysis type."""
+    cv_text, job_description = _fit_inputs(cv_text, job_description)
+    # Different prompts based on analysis type
+    prompts = {
+        'match': f"""
+You are an ATS (Applicant Tracking System) evaluator. 
+Compare the following CV with the Job Description and provide an ATS compatibility score (0-100).
+Return the result in **HTML format** with the following sections:
+
+1. **Overall ATS Score** (percentage with color bar)  
+2. **Matched Keywords** (list of important job-specific keywords found in CV)  
+3. **Missing Keywords** (keywords required by JD but missing in CV)  
+4. **Skills Match** (match rate and table of skills: CV vs JD)  
+5. **Experience Match** (how relevant the experience is, 1-2 sentences + percentage)  
+6. **Education Match** (short analysis + percentage)  
+7. **Suggestions for Improvement** (bullet points for enhancing CV to improve score)
+
+CV Text:
+{cv_text}
+
+Job Description:
+{job_description}
+        """,
+        
+        'about': f"""
+You are a resume analysis expert. 
+Provide a detailed evaluation of the following CV against the job description.
+Return the result in **HTML format** with the following sections:
+
+1. **Resume Overview** (strengths and weaknesses)
+2. **Content Analysis** (completeness, relevance, formatting)
+3. **Keyword Optimization** (keyword density and placement)
+4. **Experience Relevance** (how well experience matches job requirements)
+5. **Skills Assessment** (technical and soft skills evaluation)
+6. **Education Fit** (educational background relevance)
+7. **Overall Assessment** (summary with recommendations)
+
+CV Text:
+{cv_text}
+
+Job Description:
+{job_description}
+        """,
+        
+        'improve': f"""
+You are a career development expert. 
+Analyze the following CV and provide specific improvement recommendations.
+Return the result in **HTML format** with the following sections:
+
+1. **Skills Enhancement** (specific skills to develop)
+2. **Experience Optimization** (how to better present experience)
+3. **Keyword Integration** (strategic keyword placement)
+4. **Formatting Improvements** (layout and structure suggestions)
+5. **Content Additions** (what to add to strengthen the CV)
+6. **Professional Development** (courses, certifications, activities)
+7. **Action Plan** (step-by-step improvement roadmap)
+
+CV Text:
+{cv_text}
+
+Job Description:
+{job_description}
+        """,
+        
+        'tailor': f"""
+You are a resume tailoring expert. 
+Create a tailored version of the following CV for the specific job description.
+Return the result in **HTML format** with the following sections:
+
+1. **Tailored Summary** (customized professional summary)
+2. **Optimized Experience** (reworded experience to match job requirements)
+3. **Enhanced Skills Section** (prioritized skills based on job needs)
+4. **Keyword Integration** (strategically placed keywords)
+5. **Relevant Achievements** (highlighted accomplishments that match job)
+6. **Customized Education** (emphasized relevant education)
+7. **Final Tailored CV** (complete optimized version)
+
+CV Text:
+{cv_text}
+
+Job Description:
+{job_description}
+        """
+    }
+    return prompts
+
+
+def ats_analysis_messages(cv_text, job_description, analysis_type):
+    """Ask the model for one kind of ATS analysis in HTML (defaults to 'match')."""
+    prompts = ats_analysis_prompts(cv_text, job_description)
+    prompt = prompts.get(analysis_type, prompts['match'])
+    return _messages(ATS_ANALYSIS_SYSTEM_PROMPT, prompt, f"ats-analyze:{analysis_type}")
+
+
+def resume_from_job_messages(job_description):
+    """Ask the model for a resume tailored to a job description."""
+    job_description = fit_text(job_description, JOB_DESCRIPTION_TOKEN_BUDGET)
+    prompt = f"""
+You are a professional resume writer. 
+Based on the following job description, create a comprehensive professional resume in HTML format.
+The resume should be tailored to this specific job and include:
+
+1. **Professional Summary** (tailored to the job)
+2. **Key Skills** (relevant to the job requirements)
+3. **Professional Experience** (relevant experience that matches the job)
+4. **Education** (appropriate education background)
+5. **Certifications** (if relevant to the job)
+6. **Projects** (relevant projects that demonstrate skills)
+
+Use a professional HTML template with clean styling.
+Focus on keywords and requirements mentioned in the job description.
+
+Job Description:
+{job_description}
+    """
+    return _messages(RESUME_SYSTEM_PROMPT, prompt, "generate-resume-from-job")
+
+
+def ats_suggestions_messages(cv_text, job_description, score):
+    """Ask the model only for improvement suggestions, given a locally computed ATS score."""
+    cv_text, job_description = _fit_inputs(cv_text, job_description)
+    prompt = f"""
+An ATS scoring engine compared the CV below with the Job Description.
+Overall score: {score['overall_score']}%
+Missing keywords: {', '.join(score['missing_keywords']) or 'none'}
+
+Write 4-6 specific suggestions for improving the CV for this job.
+Return ONLY an HTML <ul> list (no headings, explanations or code fences).
+
+CV Text:
+{cv_text}
+
+Job Description:
+{job_description}
+    """
+    return _messages(ATS_SCORE_SYSTEM_PROMPT, prompt, "ats-suggestions")
@@ -0,0 +1,404 @@
+"""
+Client-side rate limiting for model calls.
+Every call takes a concurrency slot and draws from requests-per-minute and
+tokens-per-minute buckets before it goes out, so bursts queue locally instead
+of tripping provider rate limits. Waiters are served by priority, and lower
+priorities may not use the share of capacity reserved for higher ones, so
+cheap cover letters are not starved by long tailoring analyses.
+By default the buckets and slots are kept in memory, so the limits apply
+per process: with several worker processes, divide them by the worker count
+or set RATE_LIMIT_DB_PATH to keep them in a SQLite file shared by every
+worker process on the host.
+"""
+
+import asyncio
+import itertools
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+import metrics
+from token_budget import count_message_tokens
+
+logger = logging.getLogger(__name__)
+
+# Per process, or across all workers with RATE_LIMIT_DB_PATH; 0 disables a limit
+RATE_LIMIT_RPM = int(os.getenv("RATE_LIMIT_RPM", 500))
+RATE_LIMIT_TPM = int(os.getenv("RATE_LIMIT_TPM", 200000))
+MODEL_CONCURRENCY = int(os.getenv("MODEL_CONCURRENCY", 16))
+RATE_LIMIT_DB_PATH = os.getenv("RATE_LIMIT_DB_PATH") or None
+# Seconds a call may wait for capacity before the request is rejected with 429
+RATE_LIMIT_MAX_WAIT = float(os.getenv("RATE_LIMIT_MAX_WAIT", 30))
+# Share of each limit kept free per priority level above the caller's
+RATE_LIMIT_RESERVE = float(os.getenv("RATE_LIMIT_RESERVE", 0.1))
+# Completion tokens charged up front when a call sets no max_tokens; settled on usage
+RATE_LIMIT_COMPLETION_ESTIMATE = int(os.getenv("RATE_LIMIT_COMPLETION_ESTIMATE", 1000))
+# Slots of workers that died mid-call are reclaimed after this many seconds
+SLOT_LEASE_SECONDS = 600
+POLL_INTERVAL = 0.05
+
+HIGH, NORMAL, LOW = 0, 1, 2
+PRIORITY_LEVELS = {"high": HIGH, "normal": NORMAL, "low": LOW}
+PRIORITY_NAMES = {level: name for name, level in PRIORITY_LEVELS.items()}
+# Keyed by analysis_type or route; MODEL_PRIORITIES overrides, e.g. "/ats-batch=low,summary=high"
+DEFAULT_PRIORITIES = {
+    "/generate-cover-letter": HIGH,
+    "match": HIGH,
+    "tailor": LOW,
+    "/ats-batch": LOW,
+    "/generate-cv/batch": LOW,
+}
+MODEL_PRIORITIES = {
+    **DEFAULT_PRIORITIES,
+    **{
+        key.strip(): PRIORITY_LEVELS[level.strip().lower()]
+        for key, level in (item.split("=", 1) for item in os.getenv("MODEL_PRIORITIES", "").split(",") if "=" in item)
+    },
+}
+
+
+class ThrottledError(Exception):
+    """Raised when a model call could not get capacity within RATE_LIMIT_MAX_WAIT."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Too many model requests in flight, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+def current_priority():
+    """Priority of the request being served, from its analysis_type or route."""
+    labels = metrics.current_labels()
+    for key in (labels["analysis_type"], labels["route"]):
+        if key in MODEL_PRIORITIES:
+            return MODEL_PRIORITIES[key]
+    return NORMAL
+
+
+def estimate_tokens(kwargs):
+    """Tokens to charge a chat completion call before its usage is known."""
+    completion = kwargs.get("max_tokens") or RATE_LIMIT_COMPLETION_ESTIMATE
+    return count_message_tokens(kwargs.get("messages") or []) + completion
+
+
+def _refill(level, updated_at, limit, now):
+    return min(limit, level + (now - updated_at) * limit / 60.0)
+
+
+def _admit(buckets, slots_in_use, costs, limits, concurrency, priority, reserve, now):
+    """
+    Decide whether a call may go out. buckets maps name -> (level, updated_at);
+    returns (new bucket levels or None, seconds to wait before trying again).
+    """
+    wait = 0.0
+    levels = {}
+    if concurrency:
+        allowed = max(1, concurrency - int(concurrency * reserve * priority))
+        if slots_in_use >= allowed:
+            wait = POLL_INTERVAL
+    for name, limit in limits.items():
+        if not limit:
+            continue
+        level, updated_at = buckets.get(name, (limit, now))
+        level = _refill(level, updated_at, limit, now)
+        headroom = limit * reserve * priority
+        cost = min(costs[name], limit)
+        # A full bucket admits any call so oversized prompts are not stuck forever
+        if level - cost < headroom and level < limit:
+            wait = max(wait, (cost + headroom - level) * 60.0 / limit)
+        levels[name] = level - costs[name]
+    if wait:
+        return None, wait
+    return levels, 0.0
+
+
+class _MemoryStore:
+    """Limiter state for a single process."""
+
+    blocking = False
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._slots = {}
+
+    def try_acquire(self, lease_id, costs, limits, concurrency, priority, reserve):
+        now = time.time()
+        with self._lock:
+            self._slots = {k: v for k, v in self._slots.items() if v > now}
+            levels, wait = _admit(self._buckets, len(self._slots), costs, limits, concurrency, priority, reserve, now)
+            if levels is None:
+                return wait
+            self._buckets.update({name: (level, now) for name, level in levels.items()})
+            if concurrency:
+                self._slots[lease_id] = now + SLOT_LEASE_SECONDS
+            return 0.0
+
+    def release(self, lease_id, token_refund, tokens_limit):
+        with self._lock:
+            self._slots.pop(lease_id, None)
+            if token_refund and "tokens" in self._buckets:
+                level, updated_at = self._buckets["tokens"]
+                self._buckets["tokens"] = (min(tokens_limit, level + token_refund), updated_at)
+
+    def slots_in_use(self):
+        now = time.time()
+        with self._lock:
+            return sum(1 for expires in self._slots.values() if expires > now)
+
+
+class _SqliteStore:
+    """Limiter state shared by every process that opens the same SQLite file."""
+
+    # Calls wait on the file lock, so async callers run them in a worker thread
+    blocking = True
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets ("
+                "name TEXT PRIMARY KEY, level REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS slots (id TEXT PRIMARY KEY, expires_at REAL NOT NULL)")
+
+    def _connect(self):
+        # Autocommit mode so BEGIN IMMEDIATE below controls the write lock
+        return sqlite3.connect(self.db_path, timeout=5, isolation_level=None)
+
+    def try_acquire(self, lease_id, costs, limits, concurrency, priority, reserve):
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM slots WHERE expires_at <= ?", (now,))
+            slots_in_use = conn.execute("SELECT COUNT(*) FROM slots").fetchone()[0]
+            buckets = {name: (level, updated_at) for name, level, updated_at in conn.execute(
+                "SELECT name, level, updated_at FROM buckets"
+            )}
+            levels, wait = _admit(buckets, slots_in_use, costs, limits, concurrency, priority, reserve, now)
+            if levels is not None:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO buckets (name, level, updated_at) VALUES (?, ?, ?)",
+                    [(name, level, now) for name, level in levels.items()],
+                )
+                if concurrency:
+                    conn.execute("INSERT INTO slots (id, expires_at) VALUES (?, ?)", (lease_id, now + SLOT_LEASE_SECONDS))
+            conn.execute("COMMIT")
+            return wait
+        except sqlite3.Error as e:
+            # Fail open: a broken limiter store must not take the API down
+            logger.warning("Rate limiter store error: %s", e)
+            return 0.0
+        finally:
+            conn.close()
+
+    def release(self, lease_id, token_refund, tokens_limit):
+        try:
+            conn = self._connect()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute("DELETE FROM slots WHERE id = ?", (lease_id,))
+                if token_refund:
+                    conn.execute(
+                        "UPDATE buckets SET level = MIN(?, level + ?) WHERE name = 'tokens'",
+                        (tokens_limit, token_refund),
+                    )
+                conn.execute("COMMIT")
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.warning("Rate limiter store error: %s", e)
+
+    def slots_in_use(self):
+        try:
+            with sqlite3.connect(self.db_path, timeout=5) as conn:
+                return conn.execute("SELECT COUNT(*) FROM slots WHERE expires_at > ?", (time.time(),)).fetchone()[0]
+        except sqlite3.Error:
+            return None
+
+
+class Lease:
+    """Capacity held by one model call; release it once the call has finished."""
+
+    def __init__(self, limiter, lease_id, tokens):
+        self._limiter = limiter
+        self.id = lease_id
+        self.tokens = tokens
+        self._released = False
+
+    def release(self, used_tokens=None):
+        """Free the slot; with the actual usage, unused estimated tokens go back to the bucket."""
+        if self._released:
+            return
+        self._released = True
+        refund = self.tokens - used_tokens if used_tokens is not None else 0
+        self._limiter._store.release(self.id, refund, self._limiter.tokens_per_minute)
+
+    async def release_async(self, used_tokens=None):
+        """Async counterpart of release."""
+        if self._limiter._store.blocking:
+            await asyncio.to_thread(self.release, used_tokens)
+        else:
+            self.release(used_tokens)
+
+
+class RateLimiter:
+    """Token-bucket rate limiter plus a concurrency limit, served in priority order."""
+
+    def __init__(self, requests_per_minute=RATE_LIMIT_RPM, tokens_per_minute=RATE_LIMIT_TPM,
+                 concurrency=MODEL_CONCURRENCY, db_path=RATE_LIMIT_DB_PATH,
+                 max_wait=RATE_LIMIT_MAX_WAIT, reserve=RATE_LIMIT_RESERVE):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.concurrency = concurrency
+        self.max_wait = max_wait
+        self.reserve = reserve
+        self.enabled = bool(requests_per_minute or tokens_per_minute or concurrency)
+        self._store = _SqliteStore(db_path) if db_path else _MemoryStore()
+        # Waiters of this process as (priority, arrival); only the first may take capacity
+        self._waiters = []
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self.throttled = 0
+
+    def _try(self, ticket, lease_id, tokens):
+        """Try to take capacity for ticket; return the seconds to wait, 0 once acquired."""
+        with self._lock:
+            if self._waiters[0] != ticket:
+                return POLL_INTERVAL
+            wait = self._store.try_acquire(
+                lease_id, {"requests": 1, "tokens": tokens},
+                {"requests": self.requests_per_minute, "tokens": self.tokens_per_minute},
+                self.concurrency, ticket[0], self.reserve,
+            )
+            if not wait:
+                self._waiters.remove(ticket)
+            return wait
+
+    def _enqueue(self, priority):
+        ticket = (priority, next(self._counter))
+        with self._lock:
+            self._waiters.append(ticket)
+            self._waiters.sort()
+        return ticket
+
+    def _leave(self, ticket):
+        """Drop a waiter that stopped waiting (cancelled, interrupted) so it does not block the queue."""
+        with self._lock:
+            if ticket in self._waiters:
+                self._waiters.remove(ticket)
+
+    def _give_up(self, ticket, waited, wait, priority):
+        self._leave(ticket)
+        with self._lock:
+            self.throttled += 1
+        metrics.rate_limit_rejections.inc(priority=PRIORITY_NAMES[priority], **metrics.current_labels())
+        logger.warning("Model call throttled after %.1fs, capacity expected in %.1fs", waited, wait)
+        return ThrottledError(max(wait, 1.0))
+
+    def _acquired(self, lease_id, tokens, priority, waited):
+        metrics.rate_limit_wait_seconds.observe(waited, priority=PRIORITY_NAMES[priority], **metrics.current_labels())
+        return Lease(self, lease_id, tokens)
+
+    def acquire(self, tokens, priority=None):
+        """Block until the call may go out and return its Lease; raise ThrottledError after max_wait."""
+        if not self.enabled:
+            return Lease(self, None, 0)
+        priority = current_priority() if priority is None else priority
+        lease_id = uuid.uuid4().hex
+        ticket = self._enqueue(priority)
+        started = time.monotonic()
+        try:
+            while True:
+                wait = self._try(ticket, lease_id, tokens)
+                waited = time.monotonic() - started
+                if not wait:
+                    return self._acquired(lease_id, tokens, priority, waited)
+                if waited + wait > self.max_wait:
+                    raise self._give_up(ticket, waited, wait, priority)
+                time.sleep(min(wait, 1.0))
+        except BaseException:
+            self._leave(ticket)
+            raise
+
+    async def acquire_async(self, tokens, priority=None):
+        """Async counterpart of acquire."""
+        if not self.enabled:
+            return Lease(self, None, 0)
+        priority = current_priority() if priority is None else priority
+        lease_id = uuid.uuid4().hex
+        ticket = self._enqueue(priority)
+        started = time.monotonic()
+        try:
+            while True:
+                if self._store.blocking:
+                    wait = await asyncio.to_thread(self._try, ticket, lease_id, tokens)
+                else:
+                    wait = self._try(ticket, lease_id, tokens)
+                waited = time.monotonic() - started
+                if not wait:
+                    return self._acquired(lease_id, tokens, priority, waited)
+                if waited + wait > self.max_wait:
+                    raise self._give_up(ticket, waited, wait, priority)
+                await asyncio.sleep(min(wait, 1.0))
+        except BaseException:
+            self._leave(ticket)
+            raise
+
+    def stats(self):
+        with self._lock:
+            waiting = len(self._waiters)
+        return {
+            "requests_per_minute": self.requests_per_minute,
+            "tokens_per_minute": self.tokens_per_minute,
+            "concurrency": self.concurrency,
+            "slots_in_use": self._store.slots_in_use(),
+            "waiting": waiting,
+            "throttled": self.throttled,
+        }
+
+
+def _usage_tokens(usage):
+    return usage.prompt_tokens + usage.completion_tokens if usage is not None else None
+
+
+class GuardedStream:
+    """Holds a lease for as long as a streamed completion is being read."""
+
+    def __init__(self, stream, lease):
+        self._stream = stream
+        self._lease = lease
+
+    def __iter__(self):
+        usage = None
+        try:
+            for chunk in self._stream:
+                usage = getattr(chunk, "usage", None) or usage
+                yield chunk
+        finally:
+            self._lease.release(_usage_tokens(usage))
+
+    async def __aiter__(self):
+        usage = None
+        try:
+            async for chunk in self._stream:
+                usage = getattr(chunk, "usage", None) or usage
+                yield chunk
+        finally:
+            await self._lease.release_async(_usage_tokens(usage))
+
+
+def release_for(lease, response):
+    """Release a lease with the usage of a finished (non-streamed) completion."""
+    lease.release(_usage_tokens(getattr(response, "usage", None)))
+
+
+async def release_for_async(lease, response):
+    """Async counterpart of release_for."""
+    await lease.release_async(_usage_tokens(getattr(response, "usage", None)))
+
+
+limiter = RateLimiter()
@@ -0,0 +1,225 @@
+"""
+Response cache for AI generations.
+Keeps recent responses in an in-memory LRU and, optionally, in a SQLite file
+so identical requests (same endpoint, template and answers) skip the model call.
+The same class backs the extracted-text cache for uploaded CVs.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+def canonical_json(data):
+    """Serialize data with sorted keys and no whitespace so equal payloads hash equally."""
+    return json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+def make_cache_key(*parts):
+    """Build a SHA-256 cache key from strings or JSON-serializable parts."""
+    digest = hashlib.sha256()
+    for part in parts:
+        if not isinstance(part, str):
+            part = canonical_json(part)
+        encoded = part.encode("utf-8")
+        # Length prefix keeps ("ab", "c") and ("a", "bc") apart
+        digest.update(str(len(encoded)).encode("ascii") + b":")
+        digest.update(encoded)
+    return digest.hexdigest()
+
+
+class ResponseCache:
+    """Two-tier cache: in-memory LRU in front of an optional SQLite store."""
+
+    def __init__(self, max_entries=256, db_path=None, ttl=86400, max_db_entries=5000, max_bytes=None):
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_db_entries = max_db_entries
+        # Optional cap on the total size of values held in memory
+        self.max_bytes = max_bytes
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if self.db_path:
+            with self._connect() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS responses ("
+                    "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                    "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+                )
+                conn.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed_at)"
+                )
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=5)
+
+    def _is_fresh(self, created_at):
+        return not self.ttl or time.time() - created_at < self.ttl
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss."""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, created_at, size = entry
+                if self._is_fresh(created_at):
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._memory[key]
+                self._memory_bytes -= size
+
+        if self.db_path:
+            value = self._get_from_disk(key)
+            if value is not None:
+                with self._lock:
+                    self.hits += 1
+                    self.disk_hits += 1
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def _get_from_disk(self, key):
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                value, created_at = row
+                if not self._is_fresh(created_at):
+                    conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    return None
+                conn.execute(
+                    "UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key)
+                )
+        except sqlite3.Error as e:
+            logger.warning("Cache read error: %s", e)
+            return None
+
+        self._store_in_memory(key, value, created_at)
+        return value
+
+    def _store_in_memory(self, key, value, created_at):
+        size = len(value.encode("utf-8"))
+        if self.max_bytes and size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._memory.pop(key, None)
+            if previous is not None:
+                self._memory_bytes -= previous[2]
+            self._memory[key] = (value, created_at, size)
+            self._memory_bytes += size
+            while len(self._memory) > self.max_entries or (
+                self.max_bytes and self._memory_bytes > self.max_bytes
+            ):
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= evicted[2]
+
+    def set(self, key, value):
+        """Store value under key in memory and, if configured, on disk."""
+        now = time.time()
+        self._store_in_memory(key, value, now)
+
+        if self.db_path:
+            try:
+                with self._connect() as conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO responses (key, value, created_at, accessed_at) "
+                        "VALUES (?, ?, ?, ?)",
+                        (key, value, now, now),
+                    )
+                    self._evict_disk(conn, now)
+            except sqlite3.Error as e:
+                logger.warning("Cache write error: %s", e)
+
+    def _evict_disk(self, conn, now):
+        """Drop expired rows, then the least recently used rows above the size cap."""
+        if self.ttl:
+            conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl,))
+        if self.max_db_entries:
+            conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_db_entries,),
+            )
+
+    def clear(self):
+        """Remove all entries from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+        if self.db_path:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM responses")
+
+    def stats(self):
+        """Return hit/miss counters for reporting."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+            }
+
+
+def create_text_cache():
+    """Build the extracted-text cache (keyed by uploaded file hash) from environment variables."""
+    return ResponseCache(
+        max_entries=int(os.getenv("TEXT_CACHE_MAX_ENTRIES", 1000)),
+        db_path=os.getenv("TEXT_CACHE_DB_PATH") or None,
+        ttl=int(os.getenv("TEXT_CACHE_TTL", 7 * 86400)),
+        max_db_entries=int(os.getenv("TEXT_CACHE_MAX_DB_ENTRIES", 5000)),
+        max_bytes=int(os.getenv("TEXT_CACHE_MAX_BYTES", 64 * 1024 * 1024)),
+    )
+
+
+def create_response_cache():
+    """Build the response cache from environment variables."""
+    return ResponseCache(
+        max_entries=int(os.getenv("CACHE_MAX_ENTRIES", 256)),
+        db_path=os.getenv("CACHE_DB_PATH") or None,
+        ttl=int(os.getenv("CACHE_TTL", 86400)),
+        max_db_entries=int(os.getenv("CACHE_MAX_DB_ENTRIES", 5000)),
+    )
+
+
+def create_pdf_cache():
+    """Build the cache of exported PDFs (base64, keyed by HTML hash) from environment variables."""
+    return ResponseCache(
+        max_entries=int(os.getenv("PDF_CACHE_MAX_ENTRIES", 200)),
+        db_path=os.getenv("PDF_CACHE_DB_PATH") or None,
+        ttl=int(os.getenv("PDF_CACHE_TTL", 86400)),
+        max_db_entries=int(os.getenv("PDF_CACHE_MAX_DB_ENTRIES", 2000)),
+        max_bytes=int(os.getenv("PDF_CACHE_MAX_BYTES", 128 * 1024 * 1024)),
+    )
+
+
+def create_section_cache():
+    """Build the cache of generated CV sections (keyed by each section's inputs) from environment variables."""
+    return ResponseCache(
+        max_entries=int(os.getenv("CV_SECTION_CACHE_MAX_ENTRIES", 2000)),
+        db_path=os.getenv("CV_SECTION_CACHE_DB_PATH") or None,
+        ttl=int(os.getenv("CV_SECTION_CACHE_TTL", 7 * 86400)),
+        max_db_entries=int(os.getenv("CV_SECTION_CACHE_MAX_DB_ENTRIES", 20000)),
+    )
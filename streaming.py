@@ -0,0 +1,156 @@
+"""
+Helpers for streaming generation endpoints as Server-Sent Events.
+HTMLStreamCleaner strips markdown code fences and surrounding quotes from
+model output incrementally, so chunks can be forwarded as they arrive.
+"""
+
+import contextvars
+import json
+import re
+
+# Language tag after an opening fence, with or without a newline after it
+FENCE_LANGUAGE = re.compile(r"[A-Za-z0-9_+-]*[ \t]*\r?\n?")
+
+
+class HTMLStreamCleaner:
+    """
+    Incremental version of clean_html. A leading quote is only treated as
+    wrapping the response when HTML or a fence follows it; text after the last
+    fence is held back until a later fence or the end, so fences inside the
+    HTML are kept as in clean_html.
+    """
+
+    # Characters held back so a closing fence or quote split across chunks is caught
+    HOLD_BACK = 4
+    # Give up looking for a fence or tag after this many characters
+    MAX_PREAMBLE = 2000
+
+    def __init__(self):
+        self._pending = ""
+        self._started = False
+        self._fenced = False
+        self._closed = False
+        self._quote = None
+
+    def _start(self, force=False):
+        """Find where the HTML begins, dropping an opening quote or fence line."""
+        text = self._pending.lstrip()
+        if self._quote is None and text[:1] in ('"', "'"):
+            rest = text[1:].lstrip()
+            if not rest and not force:
+                self._pending = text
+                return False
+            if rest.startswith(("<", "```")):
+                self._quote = text[0]
+                text = rest
+
+        fence = text.find("```")
+        tag = text.find("<")
+        if fence != -1 and (tag == -1 or fence < tag):
+            rest = text[fence + 3:]
+            if "\n" not in rest and "<" not in rest and not force:
+                self._pending = text
+                return False
+            text = rest[FENCE_LANGUAGE.match(rest).end():]
+            self._fenced = True
+        elif tag == -1 and len(text) < self.MAX_PREAMBLE and not force:
+            self._pending = text
+            return False
+
+        self._pending = text.lstrip()
+        self._started = True
+        return True
+
+    def feed(self, chunk):
+        """Add a chunk of model output and return the text that is safe to emit."""
+        if self._closed or not chunk:
+            return ""
+        self._pending += chunk
+        if not self._started and not self._start():
+            return ""
+
+        safe = len(self._pending) - self.HOLD_BACK
+        if self._fenced:
+            # The last fence so far may be the closing one
+            fence = self._pending.rfind("```")
+            if fence != -1:
+                safe = fence
+        # Trailing whitespace may turn out to end the response
+        safe = min(safe, len(self._pending[:safe].rstrip()))
+        if safe <= 0:
+            return ""
+        output, self._pending = self._pending[:safe], self._pending[safe:]
+        return output
+
+    def finish(self):
+        """Flush whatever is left once the model output is complete."""
+        if self._closed:
+            return ""
+        if not self._started:
+            self._start(force=True)
+        output = self._pending
+        if self._fenced and "```" in output:
+            output = output[:output.rfind("```")]
+        output = output.rstrip()
+        self._pending = ""
+        self._closed = True
+        return self._strip_quote(output)
+
+    def _strip_quote(self, output):
+        if self._quote and output.endswith(self._quote):
+            return output[:-1]
+        return output
+
+
+def clean_html(html_content):
+    """Clean a complete model response: drop a surrounding code fence, then a matching pair of quotes."""
+    html_content = (html_content or "").strip()
+    start = html_content.find("```")
+    if start != -1 and (start == 0 or html_content.startswith("```html", start)):
+        start = FENCE_LANGUAGE.match(html_content, start + 3).end()
+        end = html_content.rfind("```")
+        if end > start:
+            html_content = html_content[start:end].strip()
+    if len(html_content) > 1 and html_content[0] in ('"', "'") and html_content[-1] == html_content[0]:
+        html_content = html_content[1:-1]
+    return html_content
+
+
+def sse_event(event, data):
+    """Format a Server-Sent Event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def stream_completion_text(stream, on_usage=None):
+    """
+    Yield the text deltas from a streaming chat completion. on_usage receives
+    the token usage sent in the final chunk when stream_options include_usage is set.
+    """
+    for chunk in stream:
+        if getattr(chunk, "usage", None) and on_usage:
+            on_usage(chunk.usage)
+        if not chunk.choices:
+            continue
+        content = chunk.choices[0].delta.content
+        if content:
+            yield content
+
+
+def iterate_in_context(events):
+    """
+    Iterate a response generator inside a copy of the current context, so the
+    metric labels and trace spans of the request that created it carry over.
+    """
+    context = contextvars.copy_context()
+    iterator = iter(events)
+    sentinel = object()
+    try:
+        while True:
+            item = context.run(next, iterator, sentinel)
+            if item is sentinel:
+                return
+            yield item
+    finally:
+        # Close the generator in the same context, e.g. when the client disconnects
+        if hasattr(iterator, "close"):
+            context.run(iterator.close)
@@ -0,0 +1,172 @@
+"""
+Structured, non-blocking logging.
+Records are filtered and sampled in the calling thread, then handed to a
+queue; a listener thread formats them (JSON or text) and writes to stdout, so
+request handlers never block on I/O. Questionnaire PII is redacted before
+anything is written.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import sys
+import time
+import zlib
+
+import metrics
+import tracing
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# json | text
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+# Share of requests whose DEBUG/INFO records are kept; warnings and errors are always kept
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", 1.0))
+# Per-route overrides, e.g. "/generate-cv=0.1,/questionnaire=0"
+LOG_SAMPLE_RATES = {
+    route.strip(): float(rate)
+    for route, rate in (item.split("=", 1) for item in os.getenv("LOG_SAMPLE_RATES", "").split(",") if "=" in item)
+}
+
+# Questionnaire / cover letter fields that identify the applicant
+PII_FIELDS = {
+    "full_name", "name", "email", "phone", "address", "linkedin", "portfolio", "hr_name", "filename",
+}
+REDACTED = "[REDACTED]"
+EMAIL_PATTERN = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+PHONE_PATTERN = re.compile(r"\+?\d[\d\s().-]{8,}\d")
+
+# Attributes every LogRecord has; anything else was passed through extra= and is logged as a field
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_listener = None
+
+
+def redact(value):
+    """Replace PII fields in questionnaire-shaped data and scrub emails/phone numbers from text."""
+    if isinstance(value, dict):
+        return {k: REDACTED if k in PII_FIELDS and value[k] else redact(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [redact(v) for v in value]
+    if isinstance(value, str):
+        return PHONE_PATTERN.sub(_redact_phone, EMAIL_PATTERN.sub(REDACTED, value))
+    return value
+
+
+def _redact_phone(match):
+    # Dates, years and timings also look like digit runs; phone numbers have at least 10 digits
+    return REDACTED if sum(c.isdigit() for c in match.group()) >= 10 else match.group()
+
+
+def _sample_rate(route):
+    return LOG_SAMPLE_RATES.get(route, LOG_SAMPLE_RATE)
+
+
+class RequestContextFilter(logging.Filter):
+    """
+    Attach the request id and route, and drop DEBUG/INFO records of requests
+    outside the sample. The decision is made per request id, so a sampled
+    request keeps all of its records.
+    """
+
+    def filter(self, record):
+        record.request_id = tracing.request_id()
+        record.route = metrics.current_labels()["route"]
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = _sample_rate(record.route)
+        if rate >= 1:
+            return True
+        if rate <= 0:
+            return False
+        key = record.request_id or f"{record.thread}:{record.created}"
+        return zlib.crc32(key.encode("utf-8")) % 10000 < rate * 10000
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records (and counts them) instead of blocking when the queue is full."""
+
+    dropped = 0
+
+    def prepare(self, record):
+        # Only merge the arguments here; formatting happens on the listener thread
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            NonBlockingQueueHandler.dropped += 1
+
+
+def _fields(record):
+    return {k: v for k, v in vars(record).items() if k not in _RECORD_ATTRIBUTES and k not in ("request_id", "route")}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with extra= fields and PII redacted."""
+
+    def format(self, record):
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": redact(record.getMessage()),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        if getattr(record, "route", None):
+            entry["route"] = record.route
+        entry.update(redact(_fields(record)))
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable lines for local development, with PII redacted."""
+
+    def format(self, record):
+        line = f"{self.formatTime(record)} {record.levelname:<7} {record.name}"
+        if getattr(record, "request_id", None):
+            line += f" [{record.request_id}]"
+        line += " " + redact(record.getMessage())
+        fields = redact(_fields(record))
+        if fields:
+            line += " " + " ".join(f"{k}={json.dumps(v, default=str, ensure_ascii=False)}" for k, v in fields.items())
+        if record.exc_text:
+            line += "\n" + record.exc_text
+        return line
+
+
+def configure_logging():
+    """Route all logging through the queue; safe to call more than once."""
+    global _listener
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else TextFormatter())
+
+    log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    handler = NonBlockingQueueHandler(log_queue)
+    handler.addFilter(RequestContextFilter())
+
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(LOG_LEVEL)
+    # HTTP client chatter from the OpenAI SDK is rarely useful at INFO
+    logging.getLogger("httpx").setLevel(max(logging.WARNING, root.level))
+
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
@@ -0,0 +1,111 @@
+"""
+In-memory registry of CV and cover letter templates.
+Templates are read once at startup together with what the routes derive from
+them (a digest for cache keys and the compact variant sent in prompts).
+Unknown names trigger a rescan of the folder, so new templates are picked up
+without a restart; in reload mode, changed files are reloaded on their mtime.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+
+from token_budget import CompactTemplate
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_FOLDERS = {"cv": "Templates", "cl": "Cover_Letter"}
+# Minimum seconds between folder rescans triggered by unknown template names
+RESCAN_INTERVAL = 5.0
+
+
+class Template:
+    """A loaded template and its precomputed variants."""
+
+    def __init__(self, name, path):
+        self.name = name
+        self.path = path
+        self.mtime = os.stat(path).st_mtime
+        with open(path, "r", encoding="utf-8") as f:
+            self.html = f.read()
+        self.digest = hashlib.sha256(self.html.encode("utf-8")).hexdigest()
+        self.compact = CompactTemplate(self.html)
+
+
+class TemplateRegistry:
+    """Serves templates from memory, keyed by folder ("cv" / "cl") and name without extension."""
+
+    def __init__(self, folders=None, reload=False):
+        self.folders = folders or TEMPLATE_FOLDERS
+        self.reload = reload
+        self._templates = {folder: {} for folder in self.folders}
+        self._last_scan = {}
+        self._lock = threading.Lock()
+        for folder in self.folders:
+            self._scan(folder)
+
+    def _scan(self, folder):
+        """Load templates that are new in the folder and drop the ones that were removed."""
+        directory = self.folders[folder]
+        current = self._templates[folder]
+        templates = {}
+        if os.path.isdir(directory):
+            for filename in sorted(os.listdir(directory)):
+                name, extension = os.path.splitext(filename)
+                if extension.lower() != ".html":
+                    continue
+                if name in current:
+                    templates[name] = current[name]
+                    continue
+                try:
+                    templates[name] = Template(name, os.path.join(directory, filename))
+                except OSError as e:
+                    logger.warning("Could not load template %s: %s", filename, e)
+        # Swap in a new dict so lock-free readers never see it mid-update
+        self._templates[folder] = templates
+        self._last_scan[folder] = time.monotonic()
+
+    def get(self, folder, name):
+        """Return the Template for name, or raise FileNotFoundError."""
+        if folder not in self.folders:
+            raise ValueError("Invalid template folder")
+        template = self._templates[folder].get(name)
+        if template is None:
+            with self._lock:
+                if time.monotonic() - self._last_scan.get(folder, 0) >= RESCAN_INTERVAL or self.reload:
+                    self._scan(folder)
+                template = self._templates[folder].get(name)
+            if template is None:
+                raise FileNotFoundError(f"Template {name}.html not found in {folder} folder")
+        elif self.reload:
+            template = self._reload_if_changed(folder, template)
+        return template
+
+    def _reload_if_changed(self, folder, template):
+        try:
+            mtime = os.stat(template.path).st_mtime
+        except OSError:
+            with self._lock:
+                self._scan(folder)
+            raise FileNotFoundError(f"Template {template.name}.html not found in {folder} folder")
+        if mtime == template.mtime:
+            return template
+        with self._lock:
+            current = self._templates[folder].get(template.name, template)
+            if current.mtime != mtime:
+                current = Template(template.name, template.path)
+                self._templates[folder] = {**self._templates[folder], template.name: current}
+                logger.info("Reloaded template %s", template.path)
+        return current
+
+    def names(self, folder):
+        """Names of the templates currently available in folder."""
+        return sorted(self._templates[folder])
+
+
+def create_template_registry(debug=False):
+    """Build the registry; TEMPLATE_RELOAD (default: DEBUG) enables mtime-based reloading."""
+    reload = os.getenv("TEMPLATE_RELOAD", str(debug)).lower() == "true"
+    return TemplateRegistry(reload=reload)
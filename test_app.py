@@ -0,0 +1,21 @@
+import io
+
+import pytest
+
+import app
+import metrics
+
+
+@pytest.mark.parametrize("analysis_type", ["summary", "match\n", "x" * 200])
+def test_ats_analyze_rejects_unknown_analysis_types(analysis_type, monkeypatch):
+    labels = []
+    monkeypatch.setattr(metrics, "set_labels", lambda **kwargs: labels.append(kwargs))
+    response = app.app.test_client().post("/ats-analyze", data={
+        "pdf_file": (io.BytesIO(b"%PDF-1.4"), "cv.pdf"),
+        "job_description": "Python developer",
+        "analysis_type": analysis_type,
+    })
+    assert response.status_code == 400
+    assert "analysis_type" in response.get_json()["error"]
+    # Never reaches the metric labels or the model router
+    assert labels == []
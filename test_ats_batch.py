@@ -0,0 +1,60 @@
+import io
+
+import pytest
+from werkzeug.datastructures import FileStorage
+
+from ats_batch import parse_llm_score, run_batch
+
+# Shaped like a real /generate-ats-score answer: the bar CSS comes before the score
+SAMPLE_REPORT = """<!DOCTYPE html>
+<html>
+<head>
+<style>
+  body { font-family: Arial, sans-serif; }
+  .score-bar { width: 100%; background: #eee; border-radius: 6px; }
+  .score-fill { height: 18px; background: #4caf50; }
+</style>
+</head>
+<body>
+  <h2>1. Overall ATS Score</h2>
+  <div class="score-bar"><div class="score-fill" style="width: 68%;"></div></div>
+  <p><strong>68%</strong> compatibility with the job description.</p>
+  <h2>2. Matched Keywords</h2>
+  <ul><li>Python</li><li>REST APIs</li></ul>
+  <h2>5. Experience Match</h2>
+  <p>Four years of backend work, mostly relevant. <strong>80%</strong></p>
+</body>
+</html>"""
+
+
+def test_reads_the_score_after_the_overall_heading_not_the_css():
+    assert parse_llm_score(SAMPLE_REPORT) == 68
+
+
+def test_prefers_the_score_attribute():
+    report = SAMPLE_REPORT.replace('<p><strong>68%', '<p data-ats-score="71"><strong>71%')
+    assert parse_llm_score(report) == 71
+
+
+def test_accepts_scores_out_of_100():
+    assert parse_llm_score("<h3>Overall ATS Score:</h3> <b>54 / 100</b>") == 54
+
+
+def test_caps_the_score():
+    assert parse_llm_score('<div data-ats-score="250"></div>') == 100
+
+
+@pytest.mark.parametrize("report", ["<style>.bar { width: 100%; }</style><p>Skills Match: 90%</p>", "", None])
+def test_a_report_without_an_overall_score_is_an_error(report):
+    with pytest.raises(ValueError, match="No overall score"):
+        parse_llm_score(report)
+
+
+def test_unscored_pairs_are_reported_as_errors_not_ranked():
+    uploads = [FileStorage(stream=io.BytesIO(b""), filename=name) for name in ("a.pdf", "b.pdf")]
+    reports = {"cv a": SAMPLE_REPORT, "cv b": "<p>Sorry, I cannot score this CV.</p>"}
+
+    result = run_batch(uploads, ["Python developer"], lambda upload: f"cv {upload.filename[0]}",
+                       lambda cv_text, job: {"overall_score": parse_llm_score(reports[cv_text])}, concurrency=2)
+    assert [r["cv"] for r in result["rankings"][0]["results"]] == ["a.pdf"]
+    assert result["errors"] == [{"cv": "b.pdf", "job_index": 0, "error": "No overall score found in the ATS report"}]
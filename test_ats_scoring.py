@@ -0,0 +1,43 @@
+from ats_scoring import experience_years, extract_terms, render_score_html, score_cv, tokenize
+
+JOB = "Backend engineer with 5+ years of Python, Django and machine learning. Bachelor degree required."
+
+
+def test_tokenize_keeps_language_names():
+    assert tokenize("C++, C# and Node.js.") == ["c++", "c#", "and", "node.js"]
+
+
+def test_extract_terms_counts_skill_phrases_once():
+    terms = extract_terms("Machine learning and more machine learning with Python")
+    assert terms["machine learning"] == 2 and "machine" not in terms and terms["python"] == 1
+
+
+def test_score_rewards_matching_keywords():
+    strong = score_cv("Python and Django engineer, machine learning\nBackend engineer, Acme, 2015 - 2022\n"
+                      "BSc bachelor, State University, 2011 - 2015", JOB)
+    weak = score_cv("Graphic designer using Figma", JOB)
+    assert strong["overall_score"] > weak["overall_score"]
+    assert "python" in strong["matched_keywords"] and "python" in weak["missing_keywords"]
+    assert strong["experience"] == {"score": 100, "required_years": 5, "cv_years": 7}
+    assert weak["education"]["score"] == 0
+
+
+
+def test_experience_years_ignore_years_outside_experience_entries():
+    cv = "Published 1999 thesis reprint\nBSc, State University, 2008 - 2012\nEngineer, Acme, Jan 2016 – Mar 2019"
+    assert experience_years(cv) == 3
+
+
+def test_experience_years_come_from_the_experience_section():
+    cv = "\n".join([
+        "Experience", "Lead, Acme, 2018 - 2021", "Developer, Beta, 03/2016 to 2019",
+        "Projects", "Open source maintainer 2005 - 2021",
+    ])
+    # Overlapping jobs count once; the project range is not experience
+    assert experience_years(cv) == 5
+
+
+def test_report_escapes_terms_and_shows_the_score():
+    result = score_cv("python", "python <script>")
+    html = render_score_html(result)
+    assert "<script>" not in html and f"{result['overall_score']}" in html
@@ -0,0 +1,44 @@
+import json
+
+import pytest
+
+import batch_backend
+
+
+def test_parse_results_separates_errors():
+    lines = [
+        json.dumps({"custom_id": "a", "response": {"status_code": 200, "body": {"choices": []}}, "error": None}),
+        json.dumps({"custom_id": "b", "response": {"status_code": 429, "body": {"error": {"message": "slow down"}}},
+                    "error": None}),
+        json.dumps({"custom_id": "c", "response": None, "error": {"message": "expired"}}),
+        "",
+    ]
+    assert list(batch_backend.parse_results(lines)) == [
+        ("a", {"choices": []}, None), ("b", None, "slow down"), ("c", None, "expired"),
+    ]
+
+
+def test_run_splits_requests_and_matches_results(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch_backend, "BATCH_MAX_REQUESTS", 2)
+    backend = batch_backend.LocalBatchBackend(lambda body: body["messages"][0]["content"].upper())
+    requests = [(f"r{i}", {"model": "m", "messages": [{"role": "user", "content": f"row {i}"}]}) for i in range(3)]
+    results = batch_backend.run(backend, requests, state_path=str(tmp_path / "state.json"), poll_interval=0)
+    assert len(backend._batches) == 2
+    assert results["r2"] == {"content": "ROW 2", "error": None}
+
+
+def test_failed_requests_and_lost_batches_are_reported(tmp_path):
+    def reply(body):
+        raise RuntimeError("refused")
+
+    results = batch_backend.run(batch_backend.LocalBatchBackend(reply), [("a", {})], work_dir=str(tmp_path),
+                                poll_interval=0)
+    assert results == {"a": {"content": None, "error": "refused"}}
+
+    # A new backend does not know the batch recorded in the state file
+    state = str(tmp_path / "state.json")
+    with pytest.raises(batch_backend.BatchError):
+        batch_backend.run(batch_backend.LocalBatchBackend(polls=5), [("b", {})], state_path=state,
+                          poll_interval=0, max_wait=0)
+    results = batch_backend.run(batch_backend.LocalBatchBackend(), [("b", {})], state_path=state, poll_interval=0)
+    assert results == {"b": {"content": None, "error": "No result from the batch"}}
@@ -0,0 +1,198 @@
+import json
+import os
+import zipfile
+
+import pytest
+
+import app
+import batch_backend
+import cv_batch
+import cv_sections
+from response_cache import ResponseCache
+
+REPLY = {
+    "summary": "Engineer with a record of shipping.",
+    "experience_0": ["Shipped the billing service"],
+    "experience_1": ["Ran the on-call rotation"],
+}
+
+
+def reply(body):
+    return json.dumps(REPLY)
+
+
+def questionnaire(name, company):
+    return {
+        "personal_info": {"full_name": name, "email": f"{name.split()[0].lower()}@example.com"},
+        "experience": [
+            {"job_title": "Engineer", "company": company, "responsibilities": "Billing"},
+            {"job_title": "Developer", "company": "Shared Co", "responsibilities": "On-call"},
+        ],
+        "education": [{"degree": "BSc", "university": "State"}],
+    }
+
+
+@pytest.fixture
+def rows(tmp_path):
+    path = tmp_path / "answers.jsonl"
+    with open(path, "w", encoding="utf-8") as f:
+        for index in range(4):
+            f.write(json.dumps({"id": f"r{index}", "questionnaire": questionnaire(f"Person {index}", f"Co {index}")}) + "\n")
+    return str(path)
+
+
+@pytest.fixture
+def offline(monkeypatch):
+    """A tiny shared section cache and no live model calls."""
+    def no_live_calls(*args, **kwargs):
+        raise AssertionError("live model call")
+
+    monkeypatch.setattr(app, "section_cache", ResponseCache(max_entries=1))
+    monkeypatch.setattr(app, "response_cache", ResponseCache(max_entries=1))
+    monkeypatch.setattr(app, "chat_completion", no_live_calls)
+
+
+def test_batch_run_renders_every_row_from_the_run_store(rows, tmp_path, offline, monkeypatch):
+    backend = batch_backend.LocalBatchBackend(reply)
+    monkeypatch.setattr(app, "batch_api", backend)
+    output = str(tmp_path / "out")
+
+    summary = app.run_bulk_cvs(rows, output, concurrency=2, execution="batch")
+
+    # 4 summaries + 4 first jobs + 1 job shared by every row
+    assert summary["batch_api"] == {"sections": 9, "generated": 9, "failed": 0, "reused": 0}
+    assert (summary["done"], summary["failed"]) == (4, 0)
+    assert len(backend._batches) == 1
+    for name in os.listdir(output):
+        if name.endswith(".html"):
+            html = open(os.path.join(output, name), encoding="utf-8").read()
+            assert "Shipped the billing service" in html and "Ran the on-call rotation" in html
+
+
+def test_prefill_resumes_submitted_batches(rows, tmp_path):
+    backend = batch_backend.LocalBatchBackend(reply, polls=3)
+    output = str(tmp_path / "out")
+
+    with pytest.raises(batch_backend.BatchError):
+        cv_batch.prefill_sections(rows, ResponseCache(), "gpt-4o-mini", backend, output,
+                                  poll_interval=0, max_wait=0)
+    summary = cv_batch.prefill_sections(rows, ResponseCache(), "gpt-4o-mini", backend, output,
+                                        poll_interval=0, max_wait=5)
+    assert summary["generated"] == 9
+    assert len(backend._batches) == 1
+
+    # A third run finds every section in the store and submits nothing
+    summary = cv_batch.prefill_sections(rows, ResponseCache(), "gpt-4o-mini", backend, output)
+    assert summary["sections"] == 0
+    assert len(backend._batches) == 1
+
+
+def test_prefill_copies_sections_from_the_section_cache(rows, tmp_path):
+    cache = ResponseCache()
+    with open(rows, encoding="utf-8") as stream:
+        for _, _, answers in cv_batch.read_rows(stream, rows):
+            sections = cv_sections.plan_sections(answers, "gpt-4o-mini")
+            cv_sections.store_outputs(cache, sections, cv_sections.parse_sections(json.dumps(REPLY), sections))
+
+    backend = batch_backend.LocalBatchBackend(reply)
+    output = str(tmp_path / "out")
+    summary = cv_batch.prefill_sections(rows, cache, "gpt-4o-mini", backend, output)
+    assert (summary["sections"], summary["reused"]) == (0, 9)
+    assert backend._batches == {}
+    # Copied into the run's store, so evicting them from the shared cache does not matter
+    cache.clear()
+    with cv_sections.prefilled(cv_batch.section_store(output)):
+        outputs, missing = cv_sections.cached_outputs(cache, sections)
+    assert missing == [] and outputs["experience_1"] == REPLY["experience_1"]
+
+
+def test_resumed_batch_run_renders_the_remaining_rows(rows, tmp_path, offline, monkeypatch):
+    monkeypatch.setattr(app, "batch_api", batch_backend.LocalBatchBackend(reply))
+    output = str(tmp_path / "out")
+    app.run_bulk_cvs(rows, output, concurrency=1, execution="batch")
+    # Lose two rows as if the run had stopped half way
+    records = cv_batch.load_checkpoint(output)
+    for row in (3, 4):
+        os.remove(os.path.join(output, records[row]["file"]))
+
+    monkeypatch.setattr(app, "batch_api", batch_backend.LocalBatchBackend(lambda body: "not json"))
+    summary = app.run_bulk_cvs(rows, output, concurrency=1, execution="batch")
+    assert (summary["done"], summary["skipped"], summary["failed"]) == (2, 2, 0)
+    assert summary["batch_api"]["sections"] == 0
+
+
+def test_unflatten_builds_nested_answers():
+    fields, answers = cv_batch.unflatten({
+        "id": " r1 ", "personal_info.full_name": "Jane", "experience.1.job_title": "Lead",
+        "experience.0.job_title": "Dev", "experience.0.currently_working": "TRUE", "skills.tools": " ",
+    })
+    assert fields == {"id": "r1"}
+    assert answers == {
+        "personal_info": {"full_name": "Jane"},
+        "experience": [{"job_title": "Dev", "currently_working": True}, {"job_title": "Lead"}],
+    }
+
+
+def test_read_rows_rejects_lines_that_are_not_objects():
+    with pytest.raises(ValueError, match="Line 2"):
+        list(cv_batch.read_rows(iter(['{"a": {}}\n', "[1]\n"]), "rows.jsonl"))
+
+
+def run(rows, output, generate, **kwargs):
+    return cv_batch.run_batch(rows, output, generate, concurrency=2, **kwargs)
+
+
+def test_resume_skips_done_rows_and_retries_failed_ones(rows, tmp_path):
+    output = str(tmp_path / "out")
+    calls = []
+
+    def flaky(template, answers):
+        calls.append(answers["personal_info"]["full_name"])
+        if answers["personal_info"]["full_name"] == "Person 2":
+            raise RuntimeError("model down")
+        return "<html></html>"
+
+    summary = run(rows, output, flaky)
+    assert (summary["done"], summary["failed"]) == (3, 1)
+    assert summary["errors"] == [{"row": 3, "id": "r2", "error": "model down"}]
+
+    calls.clear()
+    summary = run(rows, output, lambda template, answers: calls.append(answers) or "<html></html>")
+    assert (summary["done"], summary["failed"], summary["skipped"]) == (1, 0, 3)
+    assert len(calls) == 1
+    assert cv_batch.progress(output)["done"] == 4
+
+
+def test_checkpoint_tolerates_a_line_cut_short(rows, tmp_path):
+    output = str(tmp_path / "out")
+    run(rows, output, lambda template, answers: "<html></html>")
+    with open(os.path.join(output, cv_batch.CHECKPOINT_FILE), "a", encoding="utf-8") as f:
+        f.write('{"row": 9, "sta')
+    assert sorted(cv_batch.load_checkpoint(output)) == [1, 2, 3, 4]
+
+
+def test_no_resume_starts_over(rows, tmp_path):
+    output = str(tmp_path / "out")
+    run(rows, output, lambda template, answers: "<html></html>")
+    summary = run(rows, output, lambda template, answers: "<html></html>", resume=False)
+    assert (summary["done"], summary["skipped"]) == (4, 0)
+
+
+def test_zip_output_holds_the_rows_and_errors(rows, tmp_path):
+    def generate(template, answers):
+        if answers["personal_info"]["full_name"] == "Person 0":
+            raise ValueError("bad row")
+        return f"<html>{template}</html>"
+
+    output = str(tmp_path / "cvs.zip")
+    run(rows, output, generate, template="cv_2")
+    with zipfile.ZipFile(output) as archive:
+        names = archive.namelist()
+        assert "00002_r1.html" in names and "errors.json" in names
+        assert archive.read("00002_r1.html") == b"<html>cv_2</html>"
+    assert len(names) == 4
+
+
+def test_row_limit(rows, tmp_path):
+    with pytest.raises(ValueError, match="more than 2 rows"):
+        run(rows, str(tmp_path / "out"), lambda template, answers: "", max_rows=2)
@@ -0,0 +1,57 @@
+import pytest
+
+from cv_renderer import normalize_answers, render_cv, safe_url
+
+TEMPLATE = "<!DOCTYPE html>\n<html>\n<head>\n<title>CV</title>\n</head>\n<body>\n</body>\n</html>\n"
+
+
+def answers(**personal):
+    return {
+        "personal_info": {"full_name": "Jane Doe", **personal},
+        "experience": [{"job_title": "Engineer", "company": "Acme", "responsibilities": "Built things"}],
+        "education": [{"degree": "BSc", "university": "State", "graduation_year": 2019}],
+    }
+
+
+@pytest.mark.parametrize("template", ["cv_1", "cv_2"])
+def test_backslashes_in_the_name_are_kept_literally(template):
+    html = render_cv(template, TEMPLATE, answers(full_name=r"Jane \1 Doe \g<0>"))
+    assert r"<title>Jane \1 Doe \g&lt;0&gt; – CV</title>" in html
+
+
+@pytest.mark.parametrize("template", ["cv_1", "cv_2"])
+def test_missing_and_numeric_answers_render(template):
+    data = answers(full_name=None, phone=5551234, email=None)
+    data["experience"][0].update(company=42, end_date=None, currently_working=True)
+    data["skills"] = {"technical_skills": None, "languages": ["Python", "Go"]}
+    html = render_cv(template, TEMPLATE, data)
+    assert "5551234" in html and "42" in html and "2019" in html
+    assert "Python" in html and "Present" in html
+
+
+def test_normalize_answers_coerces_values_to_text():
+    data = normalize_answers({
+        "personal_info": {"full_name": None, "phone": 123},
+        "experience": [{"currently_working": True}, {"company": 7, "currently_working": False}],
+    })
+    assert data["personal_info"] == {"full_name": "", "phone": "123"}
+    # The flag alone does not make an entry
+    assert data["experience"] == [{"company": "7", "currently_working": ""}]
+
+
+@pytest.mark.parametrize("url", [
+    "javascript:alert(1)", "JavaScript:alert(1)", " java\tscript:alert(1)", "data:text/html,<b>x</b>",
+    "vbscript:msgbox(1)",
+])
+def test_unsafe_link_schemes_are_not_rendered_as_hrefs(url):
+    assert safe_url(url) is None
+    html = render_cv("cv_2", TEMPLATE, answers(linkedin=url, portfolio=url))
+    # Shown as text, never as a link
+    assert "<a " not in html
+
+
+def test_safe_links_get_a_scheme():
+    assert safe_url("https://example.com/me") == "https://example.com/me"
+    assert safe_url("linkedin.com/in/jane") == "https://linkedin.com/in/jane"
+    html = render_cv("cv_2", TEMPLATE, answers(linkedin="linkedin.com/in/jane"))
+    assert '<a href="https://linkedin.com/in/jane">linkedin.com/in/jane</a>' in html
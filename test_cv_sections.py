@@ -0,0 +1,53 @@
+import json
+
+import cv_sections
+from response_cache import ResponseCache
+
+ANSWERS = {
+    "personal_info": {"full_name": "Jane Doe"},
+    "experience": [
+        {"job_title": "Engineer", "company": "Acme", "responsibilities": "Billing"},
+        {"job_title": "Developer", "company": "Initech", "responsibilities": "Reports"},
+    ],
+    "projects": [{"project_title": "CLI", "description": "A tool"}, {"project_title": "Empty"}],
+}
+
+
+def keys(answers):
+    return {s.id: s.key for s in cv_sections.plan_sections(answers, "gpt-4o-mini")}
+
+
+def test_plan_skips_projects_without_a_description():
+    assert list(keys(ANSWERS)) == ["summary", "experience_0", "experience_1", "project_0"]
+
+
+def test_editing_one_entry_changes_only_its_key():
+    edited = json.loads(json.dumps(ANSWERS))
+    edited["experience"][1]["responsibilities"] = "Reports and dashboards"
+    before, after = keys(ANSWERS), keys(edited)
+    assert [k for k in before if before[k] != after[k]] == ["experience_1"]
+
+
+def test_keys_depend_on_the_model():
+    assert keys(ANSWERS)["summary"] != {s.id: s.key for s in cv_sections.plan_sections(ANSWERS, "gpt-4o")}["summary"]
+
+
+def test_cached_outputs_reports_the_missing_sections():
+    sections = cv_sections.plan_sections(ANSWERS, "gpt-4o-mini")
+    cache = ResponseCache()
+    cv_sections.store_outputs(cache, sections, {"summary": "Engineer.", "project_0": ["Built a CLI"]})
+    outputs, missing = cv_sections.cached_outputs(cache, sections)
+    assert outputs == {"summary": "Engineer.", "project_0": ["Built a CLI"]}
+    assert [s.id for s in missing] == ["experience_0", "experience_1"]
+
+
+def test_parse_sections_drops_invalid_outputs():
+    sections = cv_sections.plan_sections(ANSWERS, "gpt-4o-mini")
+    content = json.dumps({"summary": "  Engineer. ", "experience_0": ["One", " "], "experience_1": "not a list"})
+    assert cv_sections.parse_sections(content, sections) == {"summary": "Engineer.", "experience_0": ["One"]}
+
+
+def test_to_narrative_places_outputs_by_entry_index():
+    sections = cv_sections.plan_sections(ANSWERS, "gpt-4o-mini")
+    narrative = cv_sections.to_narrative(sections, {"experience_1": ["B"], "project_0": ["P"]})
+    assert narrative == {"experience": [None, ["B"]], "projects": [["P"]]}
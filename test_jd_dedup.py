@@ -0,0 +1,47 @@
+from jd_dedup import JobDescriptionIndex, normalize
+
+POSTING = (
+    "Senior Python Engineer. We are hiring a backend engineer to design and build REST APIs with Django "
+    "and PostgreSQL, run services on AWS with Docker and Kubernetes, mentor junior developers and own "
+    "the reliability of our billing platform. Five years of experience required."
+)
+
+
+def test_normalize_drops_links_emails_and_punctuation():
+    assert normalize("Apply at https://jobs.example.com/1?utm=x or HR@Example.com!  Python,  SQL") == "apply at or python sql"
+
+
+def test_reformatted_posting_is_an_exact_duplicate():
+    index = JobDescriptionIndex()
+    key, result = index.canonical(POSTING)
+    assert result == "new"
+    assert index.canonical("  " + POSTING.upper() + "\n\n https://example.com/apply") == (key, "exact")
+
+
+def test_lightly_edited_posting_is_a_near_duplicate():
+    index = JobDescriptionIndex()
+    key, _ = index.canonical(POSTING)
+    assert index.canonical(POSTING + " Remote friendly.") == (key, "near")
+    assert index.canonical("Junior designer for our marketing team, Figma and Illustrator.")[1] == "new"
+
+
+def test_artifacts_are_computed_once_per_posting():
+    index = JobDescriptionIndex()
+    calls = []
+
+    def compute(text):
+        calls.append(text)
+        return len(text)
+
+    index.artifact(POSTING, "terms", compute)
+    index.artifact(POSTING + " Remote friendly.", "terms", compute)
+    assert len(calls) == 1
+    assert index.stats()["dedup_rate"] == 0.5
+
+
+def test_oldest_posting_is_evicted():
+    index = JobDescriptionIndex(max_entries=1)
+    index.canonical(POSTING)
+    index.canonical("Junior designer for our marketing team, Figma and Illustrator.")
+    assert index.canonical(POSTING)[1] == "new"
+    assert index.stats()["entries"] == 1
@@ -0,0 +1,45 @@
+import os
+import subprocess
+import sys
+import threading
+
+from job_queue import COMPLETED, FAILED, INTERRUPTED, QUEUED, RUNNING, JobQueue
+
+
+def wait(queue, job_id):
+    for _ in range(200):
+        job = queue.get(job_id)
+        if job["status"] == COMPLETED:
+            return job
+        threading.Event().wait(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_pooled_kinds_do_not_hold_the_shared_workers():
+    queue = JobQueue(max_workers=1, pools={"generate-cv-batch": 1})
+    release = threading.Event()
+    blocked = queue.submit("generate-cv-batch", release.wait, 5)
+    # The shared worker is still free while the bulk run waits
+    assert wait(queue, queue.submit("generate-cv", lambda: "done"))["result"] == "done"
+    assert queue.get(blocked)["status"] != COMPLETED
+    release.set()
+    assert wait(queue, blocked)["result"] is True
+
+
+def test_unfinished_jobs_of_a_stopped_process_are_failed(tmp_path):
+    db = str(tmp_path / "jobs.db")
+    queue = JobQueue(db_path=db)
+    stopped = subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"],
+                             capture_output=True, text=True).stdout.strip()
+    for job_id, status, owner in (("a", QUEUED, int(stopped)), ("b", RUNNING, None), ("c", RUNNING, os.getpid())):
+        with queue._connect() as conn:
+            conn.execute("INSERT INTO jobs (id, kind, status, created_at, owner) VALUES (?, ?, ?, ?, ?)",
+                         (job_id, "generate-cv", status, 0, owner))
+
+    restarted = JobQueue(db_path=db)
+    for job_id in ("a", "b"):
+        job = restarted.get(job_id)
+        assert (job["status"], job["error"]) == (FAILED, INTERRUPTED)
+        assert job["finished_at"]
+    # Still owned by a live worker process
+    assert restarted.get("c")["status"] == RUNNING
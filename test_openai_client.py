@@ -0,0 +1,123 @@
+import httpx
+import openai
+import pytest
+
+import openai_client
+from openai_client import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+
+def api_error(status):
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    response = httpx.Response(status, request=request)
+    cls = {400: openai.BadRequestError, 401: openai.AuthenticationError}.get(status, openai.InternalServerError)
+    return cls(f"status {status}", response=response, body=None)
+
+
+class FakeCompletions:
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def create(self, **kwargs):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+class FakeClient:
+    def __init__(self, outcomes):
+        self.chat = type("Chat", (), {})()
+        self.chat.completions = FakeCompletions(outcomes)
+
+
+class Response:
+    usage = None
+
+
+@pytest.fixture
+def breaker(monkeypatch):
+    breaker = CircuitBreaker(threshold=2, cooldown=0)
+    monkeypatch.setattr(openai_client, "breaker", breaker)
+    monkeypatch.setattr(openai_client, "OPENAI_MAX_RETRIES", 0)
+    return breaker
+
+
+def call(outcomes):
+    return openai_client.create_completion(FakeClient(outcomes), model="m", messages=[])
+
+
+def trip(breaker):
+    for _ in range(breaker.threshold):
+        with pytest.raises(openai.InternalServerError):
+            call([api_error(500)])
+    assert breaker.state == OPEN
+
+
+def test_transient_failures_open_the_breaker(breaker):
+    trip(breaker)
+
+
+def test_open_breaker_rejects_calls_until_cooldown(breaker):
+    breaker.cooldown = 60
+    trip(breaker)
+    client = FakeClient([Response()])
+    with pytest.raises(CircuitOpenError):
+        openai_client.create_completion(client, model="m", messages=[])
+    assert client.chat.completions.calls == 0
+
+
+def test_half_open_trial_success_closes(breaker):
+    trip(breaker)
+    assert isinstance(call([Response()]), Response)
+    assert breaker.state == CLOSED
+
+
+def test_half_open_trial_transient_failure_reopens(breaker):
+    trip(breaker)
+    with pytest.raises(openai.InternalServerError):
+        call([api_error(503)])
+    assert breaker.state == OPEN
+
+
+@pytest.mark.parametrize("status", [400, 401])
+def test_half_open_trial_non_transient_error_does_not_lock_the_breaker(breaker, status):
+    trip(breaker)
+    with pytest.raises(openai.APIStatusError):
+        call([api_error(status)])
+    # The API answered, so the trial ends and later calls go through
+    assert breaker.state == CLOSED
+    assert isinstance(call([Response()]), Response)
+
+
+def test_cancelled_trial_releases_the_slot():
+    breaker = CircuitBreaker(threshold=1, cooldown=0)
+    breaker.record_failure()
+    breaker.before_call()
+    with pytest.raises(KeyboardInterrupt):
+        with breaker.recording():
+            raise KeyboardInterrupt
+    assert breaker.state == HALF_OPEN
+    breaker.before_call()
+
+
+def test_error_status():
+    assert openai_client.error_status(CircuitOpenError(2.5)) == (503, {"Retry-After": "3"})
+    assert openai_client.error_status(api_error(500)) == (503, {})
+    assert openai_client.error_status(api_error(400)) == (500, {})
+
+
+def test_throttled_call_does_not_hold_the_half_open_trial(breaker, monkeypatch):
+    from rate_limiter import RateLimiter, ThrottledError
+
+    busy = RateLimiter(requests_per_minute=0, tokens_per_minute=0, concurrency=1, db_path=None, max_wait=0.1)
+    lease = busy.acquire(1)
+    trip(breaker)
+    monkeypatch.setattr(openai_client, "limiter", busy)
+    with pytest.raises(ThrottledError):
+        call([Response()])
+    lease.release()
+    # The trial slot is still free once capacity is back
+    assert isinstance(call([Response()]), Response)
+    assert breaker.state == CLOSED
@@ -0,0 +1,128 @@
+import asyncio
+
+import pytest
+
+import rate_limiter
+from rate_limiter import HIGH, LOW, NORMAL, RateLimiter, ThrottledError, _admit
+
+
+def limiter(**kwargs):
+    settings = {"requests_per_minute": 0, "tokens_per_minute": 0, "concurrency": 0, "db_path": None,
+                "max_wait": 0.2, "reserve": 0.25}
+    return RateLimiter(**{**settings, **kwargs})
+
+
+def test_admit_takes_tokens_from_the_bucket():
+    levels, wait = _admit({}, 0, {"requests": 1, "tokens": 100}, {"requests": 10, "tokens": 1000},
+                          0, NORMAL, 0.0, now=0.0)
+    assert wait == 0.0
+    assert levels == {"requests": 9, "tokens": 900}
+
+
+def test_admit_waits_for_refill_when_the_bucket_is_short():
+    levels, wait = _admit({"tokens": (50, 0.0)}, 0, {"requests": 1, "tokens": 110}, {"tokens": 600},
+                          0, NORMAL, 0.0, now=0.0)
+    assert levels is None
+    # 60 tokens missing at 600 tokens/minute
+    assert wait == pytest.approx(6.0)
+
+
+def test_admit_keeps_headroom_for_higher_priorities():
+    buckets = {"tokens": (300, 0.0)}
+    limits = {"tokens": 1000}
+    costs = {"requests": 1, "tokens": 100}
+    assert _admit(buckets, 0, costs, limits, 0, HIGH, 0.25, now=0.0)[0] is not None
+    # LOW must leave 2 * 25% of the bucket untouched
+    assert _admit(buckets, 0, costs, limits, 0, LOW, 0.25, now=0.0)[0] is None
+
+
+def test_concurrency_limit_throttles_until_a_lease_is_released():
+    rl = limiter(concurrency=2)
+    first, second = rl.acquire(10, priority=HIGH), rl.acquire(10, priority=HIGH)
+    with pytest.raises(ThrottledError):
+        rl.acquire(10, priority=HIGH)
+    assert rl.stats()["throttled"] == 1
+    assert rl.stats()["waiting"] == 0
+    first.release()
+    rl.acquire(10, priority=HIGH)
+    second.release()
+
+
+def test_low_priority_cannot_take_the_reserved_slots():
+    rl = limiter(concurrency=4, reserve=0.25)
+    leases = [rl.acquire(1, priority=LOW) for _ in range(2)]
+    with pytest.raises(ThrottledError):
+        rl.acquire(1, priority=LOW)
+    leases.append(rl.acquire(1, priority=HIGH))
+    for lease in leases:
+        lease.release()
+
+
+def test_release_refunds_unused_tokens():
+    rl = limiter(tokens_per_minute=1000)
+    rl.acquire(800, priority=HIGH).release(used_tokens=100)
+    # 700 tokens came back, so another large call fits at once
+    rl.acquire(800, priority=HIGH)
+
+
+def test_cancelled_async_waiter_leaves_the_queue():
+    rl = limiter(concurrency=1, max_wait=5)
+    lease = rl.acquire(1)
+
+    async def main():
+        waiter = asyncio.ensure_future(rl.acquire_async(1))
+        await asyncio.sleep(0.1)
+        assert rl.stats()["waiting"] == 1
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+    asyncio.run(main())
+    assert rl.stats()["waiting"] == 0
+    lease.release()
+    rl.acquire(1)
+
+
+def test_sqlite_store_shares_capacity_between_limiters(tmp_path):
+    db = str(tmp_path / "limits.db")
+    first, second = limiter(concurrency=1, db_path=db), limiter(concurrency=1, db_path=db)
+    lease = first.acquire(1)
+    with pytest.raises(ThrottledError):
+        second.acquire(1)
+    lease.release()
+    second.acquire(1)
+
+
+def test_sqlite_store_is_used_off_the_event_loop(tmp_path, monkeypatch):
+    rl = limiter(concurrency=1, db_path=str(tmp_path / "limits.db"))
+    calls = []
+    to_thread = asyncio.to_thread
+
+    async def record(fn, *args):
+        calls.append(fn.__name__)
+        return await to_thread(fn, *args)
+
+    monkeypatch.setattr(asyncio, "to_thread", record)
+
+    async def main():
+        lease = await rl.acquire_async(1)
+        await lease.release_async()
+
+    asyncio.run(main())
+    assert calls == ["_try", "release"]
+    rl.acquire(1)
+
+
+def test_disabled_limiter_admits_everything():
+    rl = limiter()
+    assert not rl.enabled
+    for _ in range(100):
+        rl.acquire(10 ** 6)
+
+
+def test_current_priority_follows_the_route(monkeypatch):
+    import metrics
+    metrics.reset_labels(route="/ats-batch")
+    assert rate_limiter.current_priority() == LOW
+    metrics.reset_labels(route="/generate-cv")
+    assert rate_limiter.current_priority() == NORMAL
@@ -0,0 +1,80 @@
+import time
+
+from response_cache import ResponseCache, make_cache_key
+
+
+def test_cache_key_is_stable_for_equal_payloads():
+    assert make_cache_key("generate-cv", {"a": 1, "b": [1, 2]}) == make_cache_key("generate-cv", {"b": [1, 2], "a": 1})
+    assert make_cache_key("generate-cv", {"a": 1}) != make_cache_key("generate-cv", {"a": 2})
+
+
+def test_cache_key_keeps_part_boundaries():
+    assert make_cache_key("ab", "c") != make_cache_key("a", "bc")
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = ResponseCache(max_entries=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    cache.get("a")
+    cache.set("c", "3")
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == ("1", "3")
+
+
+def test_memory_tier_respects_max_bytes():
+    cache = ResponseCache(max_entries=10, max_bytes=10)
+    cache.set("a", "12345")
+    cache.set("b", "123456")
+    assert cache.get("a") is None and cache.get("b") == "123456"
+    # Values larger than the whole budget are not kept in memory
+    cache.set("c", "x" * 11)
+    assert cache.get("c") is None
+    assert cache.stats()["memory_bytes"] == 6
+
+
+def test_expired_entries_are_misses(monkeypatch):
+    cache = ResponseCache(ttl=10)
+    cache.set("a", "1")
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 11)
+    assert cache.get("a") is None
+    assert cache.stats()["memory_entries"] == 0
+
+
+def test_disk_tier_serves_entries_evicted_from_memory(tmp_path):
+    db = str(tmp_path / "cache.db")
+    cache = ResponseCache(max_entries=1, db_path=db)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    assert cache.get("a") == "1"
+    assert cache.stats()["disk_hits"] == 1
+    # Shared by another process opening the same file
+    assert ResponseCache(db_path=db).get("b") == "2"
+
+
+def test_clear_empties_both_tiers(tmp_path):
+    cache = ResponseCache(db_path=str(tmp_path / "cache.db"))
+    cache.set("a", "1")
+    cache.clear()
+    assert cache.get("a") is None
+
+
+def test_disk_tier_evicts_above_max_db_entries(tmp_path):
+    db = str(tmp_path / "cache.db")
+    cache = ResponseCache(max_entries=1, db_path=db, max_db_entries=2)
+    for key in ("a", "b", "c"):
+        cache.set(key, key)
+        time.sleep(0.01)
+    fresh = ResponseCache(db_path=db)
+    assert fresh.get("a") is None
+    assert (fresh.get("b"), fresh.get("c")) == ("b", "c")
+
+
+def test_stats_report_the_hit_ratio():
+    cache = ResponseCache()
+    cache.set("a", "1")
+    cache.get("a")
+    cache.get("missing")
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_ratio"]) == (1, 1, 0.5)
@@ -0,0 +1,43 @@
+import pytest
+
+from streaming import HTMLStreamCleaner, clean_html
+
+CASES = [
+    ("<p>x</p>", "<p>x</p>"),
+    ("```html\n<p>x</p>\n```", "<p>x</p>"),
+    ("```html<p>x</p>```", "<p>x</p>"),
+    ("```\n<p>x</p>\n```", "<p>x</p>"),
+    ('"<p>x</p>"', "<p>x</p>"),
+    ("'tis <p>x</p>", "'tis <p>x</p>"),
+    ("```html\n<pre>```code```</pre>\n```", "<pre>```code```</pre>"),
+    ("Here you go:\n```html\n<p>x</p>\n```\nHope it helps", "<p>x</p>"),
+]
+
+
+@pytest.mark.parametrize("response, expected", CASES)
+def test_clean_html(response, expected):
+    assert clean_html(response) == expected
+
+
+def stream(response, size):
+    cleaner = HTMLStreamCleaner()
+    parts = [cleaner.feed(response[i:i + size]) for i in range(0, len(response), size)]
+    return "".join(parts) + cleaner.finish()
+
+
+@pytest.mark.parametrize("size", [1, 3, 1000])
+@pytest.mark.parametrize("response, expected", CASES[:7])
+def test_streamed_output_matches_clean_html(response, expected, size):
+    assert stream(response, size) == expected
+
+
+def test_text_is_emitted_before_the_response_ends():
+    cleaner = HTMLStreamCleaner()
+    assert cleaner.feed("```html\n<div>" + "a" * 50).startswith("<div>")
+
+
+def test_fenced_text_after_an_inner_fence_waits_for_the_next_fence():
+    cleaner = HTMLStreamCleaner()
+    out = cleaner.feed("```html\n<pre>```code")
+    assert out == "<pre>"
+    assert out + cleaner.feed("```</pre>\n```") + cleaner.finish() == "<pre>```code```</pre>"
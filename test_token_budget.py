@@ -0,0 +1,25 @@
+import pytest
+
+from token_budget import TRUNCATION_MARKER, count_tokens, fit_text
+
+TEXT = " ".join(f"word{index}" for index in range(2000))
+
+
+def test_text_within_budget_is_unchanged():
+    assert fit_text("short text", 100) == "short text"
+    assert fit_text(TEXT, 0) == TEXT
+
+
+def test_keeps_the_beginning_and_the_end():
+    fitted = fit_text(TEXT, 200)
+    head, tail = fitted.split(TRUNCATION_MARKER)
+    assert TEXT.startswith(head) and TEXT.endswith(tail)
+    assert len(head) > len(tail) > 0
+    assert count_tokens(fitted) < count_tokens(TEXT)
+
+
+@pytest.mark.parametrize("budget", [1, 2, 3])
+def test_tiny_budgets_never_return_the_whole_text(budget):
+    fitted = fit_text(TEXT, budget)
+    assert fitted.endswith(TRUNCATION_MARKER)
+    assert len(fitted) < len(TEXT) // 10
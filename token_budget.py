@@ -0,0 +1,141 @@
+"""
+Token budgeting and prompt compaction.
+Counts tokens, strips template CSS/comments before they are sent to the model
+(and puts the CSS back afterwards), drops empty questionnaire fields and trims
+oversized CV / job description text to a configurable budget.
+"""
+
+import logging
+import os
+import re
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+CV_TEXT_TOKEN_BUDGET = int(os.getenv("CV_TEXT_TOKEN_BUDGET", 6000))
+JOB_DESCRIPTION_TOKEN_BUDGET = int(os.getenv("JOB_DESCRIPTION_TOKEN_BUDGET", 3000))
+
+STYLE_PATTERN = re.compile(r"(<style[^>]*>)(.*?)(</style>)", re.DOTALL | re.IGNORECASE)
+COMMENT_PATTERN = re.compile(r"<!--.*?-->", re.DOTALL)
+STYLE_MARKER = "/*STYLE_{}*/"
+TRUNCATION_MARKER = "\n[... truncated ...]\n"
+
+_encoding = None
+
+
+def count_tokens(text):
+    """Count tokens with tiktoken when installed, else estimate ~4 characters per token."""
+    global _encoding
+    if not text:
+        return 0
+    if tiktoken is not None:
+        if _encoding is None:
+            _encoding = tiktoken.get_encoding("o200k_base")
+        return len(_encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+def count_message_tokens(messages):
+    """Count the tokens of a chat message list (content only, plus a small per-message overhead)."""
+    return sum(count_tokens(m["content"]) + 4 for m in messages)
+
+
+def fit_text(text, max_tokens):
+    """
+    Trim text to roughly max_tokens, keeping the beginning (most of the budget)
+    and the end, with a marker where text was removed.
+    """
+    if not text or not max_tokens or count_tokens(text) <= max_tokens:
+        return text
+    # Work in characters using the measured characters-per-token ratio
+    ratio = len(text) / count_tokens(text)
+    # Budgets smaller than the marker keep nothing but the marker
+    keep = max(0, int(max_tokens * ratio) - len(TRUNCATION_MARKER))
+    head = int(keep * 0.8)
+    tail = keep - head
+    if tail == 0:
+        # text[-0:] would be the whole text
+        return text[:head].rstrip() + TRUNCATION_MARKER
+    return text[:head].rstrip() + TRUNCATION_MARKER + text[-tail:].lstrip()
+
+
+def drop_empty(data):
+    """Recursively remove empty strings, False, None and empty lists/dicts."""
+    if isinstance(data, dict):
+        cleaned = {k: drop_empty(v) for k, v in data.items()}
+        return {k: v for k, v in cleaned.items() if v not in ("", None, False, [], {})}
+    if isinstance(data, list):
+        cleaned = [drop_empty(v) for v in data]
+        return [v for v in cleaned if v not in ("", None, False, [], {})]
+    if isinstance(data, str):
+        return data.strip()
+    return data
+
+
+class CompactTemplate:
+    """A template with its CSS replaced by short markers and comments removed."""
+
+    def __init__(self, template_html):
+        self.styles = []
+
+        def replace_style(match):
+            self.styles.append(match.group(2))
+            return match.group(1) + STYLE_MARKER.format(len(self.styles) - 1) + match.group(3)
+
+        compact = STYLE_PATTERN.sub(replace_style, template_html)
+        compact = COMMENT_PATTERN.sub("", compact)
+        self.html = re.sub(r"\n\s*\n", "\n", compact)
+
+    def restore(self, html_content):
+        """Put the original CSS back into model output generated from the compact template."""
+        for index, css in enumerate(self.styles):
+            marker = STYLE_MARKER.format(index)
+            if marker in html_content:
+                html_content = html_content.replace(marker, css)
+            elif css.strip() and css not in html_content:
+                # The model dropped the marker; inject the CSS into <head> ourselves
+                style_tag = f"<style>{css}</style>"
+                head_end = html_content.lower().find("</head>")
+                if head_end != -1:
+                    html_content = html_content[:head_end] + style_tag + html_content[head_end:]
+                else:
+                    html_content = style_tag + html_content
+        return html_content
+
+    def stream_restorer(self):
+        """Return an incremental restorer for streamed output."""
+        return StyleStreamRestorer(self.styles)
+
+
+class StyleStreamRestorer:
+    """Replace style markers in streamed chunks, holding back partial markers."""
+
+    def __init__(self, styles):
+        self.styles = styles
+        self._buffer = ""
+        self._hold = len(STYLE_MARKER.format(len(styles))) if styles else 0
+
+    def feed(self, chunk):
+        self._buffer += chunk
+        for index, css in enumerate(self.styles):
+            self._buffer = self._buffer.replace(STYLE_MARKER.format(index), css)
+        if len(self._buffer) <= self._hold:
+            return ""
+        split = len(self._buffer) - self._hold
+        output, self._buffer = self._buffer[:split], self._buffer[split:]
+        return output
+
+    def finish(self):
+        output, self._buffer = self._buffer, ""
+        return output
+
+
+def log_prompt_tokens(name, messages):
+    """Log the prompt size of a request and return the token count."""
+    tokens = count_message_tokens(messages)
+    logger.info("Prompt tokens [%s]: %d", name, tokens, extra={"prompt": name, "prompt_tokens": tokens})
+    return tokens
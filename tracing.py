@@ -0,0 +1,211 @@
+"""
+Request tracing.
+Each request gets a request id (taken from the X-Request-ID header or
+generated) and, when tracing is enabled, a root span with child spans around
+every stage: template load, text extraction, prompt build, model call and
+post-processing. Finished spans are exported from a background thread to a
+JSON-lines file or an OTLP/HTTP (JSON) collector.
+"""
+
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+import urllib.request
+import uuid
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# none | jsonl | otlp
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "none").lower()
+TRACE_FILE = os.getenv("TRACE_FILE", "traces.jsonl")
+TRACE_OTLP_ENDPOINT = os.getenv("TRACE_OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", 1.0))
+TRACE_SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "resume-builder")
+
+REQUEST_ID_HEADER = "X-Request-ID"
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+_request_id = contextvars.ContextVar("request_id", default=None)
+
+
+class Span:
+    """A timed unit of work; ended spans are handed to the exporter."""
+
+    def __init__(self, name, trace_id, parent_id=None, attributes=None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.attributes = dict(attributes or {})
+        self.error = None
+        self.start_time = time.time()
+        self._started = time.perf_counter()
+        self.duration = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def end(self):
+        if self.duration is None:
+            self.duration = time.perf_counter() - self._started
+            _exporter.export(self)
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "request_id": self.attributes.get("request_id") or _request_id.get(),
+            "name": self.name,
+            "start": round(self.start_time, 6),
+            "duration_ms": round(self.duration * 1000, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class _NoopSpan:
+    """Stands in for a span when the request is not traced."""
+
+    def set(self, **attributes):
+        pass
+
+    def end(self):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+def request_id():
+    """Return the id of the request being served, if any."""
+    return _request_id.get()
+
+
+def start_trace(name, incoming_request_id=None, **attributes):
+    """
+    Start the root span of a request. Returns (request_id, span); span is a
+    no-op when tracing is disabled or the request is not sampled.
+    """
+    trace_id = uuid.uuid4().hex
+    rid = (incoming_request_id or "").strip()[:128] or trace_id
+    _request_id.set(rid)
+    if TRACE_EXPORTER == "none" or random.random() >= TRACE_SAMPLE_RATE:
+        _current_span.set(None)
+        return rid, NOOP_SPAN
+    root = Span(name, trace_id, attributes={"request_id": rid, **attributes})
+    _current_span.set(root)
+    return rid, root
+
+
+@contextmanager
+def span(name, **attributes):
+    """Time a stage of the current request as a child span."""
+    parent = _current_span.get()
+    if parent is None:
+        yield NOOP_SPAN
+        return
+    child = Span(name, parent.trace_id, parent.span_id, attributes)
+    token = _current_span.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_span.reset(token)
+        child.end()
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_payload(spans):
+    """Build an OTLP/HTTP JSON trace export request."""
+    otlp_spans = []
+    for s in spans:
+        attributes = {**s["attributes"], "request_id": s["request_id"]}
+        start_ns = int(s["start"] * 1e9)
+        otlp_spans.append({
+            "traceId": s["trace_id"],
+            "spanId": s["span_id"],
+            "parentSpanId": s["parent_id"] or "",
+            "name": s["name"],
+            "kind": 2 if s["parent_id"] is None else 1,
+            "startTimeUnixNano": str(start_ns),
+            "endTimeUnixNano": str(start_ns + int(s["duration_ms"] * 1e6)),
+            "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in attributes.items() if v is not None],
+            "status": {"code": 2, "message": s["error"]} if s["error"] else {"code": 1},
+        })
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": TRACE_SERVICE_NAME}}]},
+        "scopeSpans": [{"scope": {"name": "tracing"}, "spans": otlp_spans}],
+    }]}
+
+
+class _Exporter:
+    """Ships finished spans from a daemon thread so requests never wait on I/O."""
+
+    BATCH_SIZE = 256
+    FLUSH_INTERVAL = 1.0
+
+    def __init__(self):
+        self._queue = queue.Queue(maxsize=10000)
+        self._thread = None
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def export(self, span):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                    self._thread.start()
+        try:
+            self._queue.put_nowait(span.to_dict())
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.FLUSH_INTERVAL
+            while len(batch) < self.BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch)
+            except Exception as e:
+                logger.warning("Trace export error: %s", e)
+
+    def _write(self, batch):
+        if TRACE_EXPORTER == "jsonl":
+            with open(TRACE_FILE, "a", encoding="utf-8") as f:
+                f.write("".join(json.dumps(s, default=str) + "\n" for s in batch))
+        elif TRACE_EXPORTER == "otlp":
+            request = urllib.request.Request(
+                TRACE_OTLP_ENDPOINT, data=json.dumps(_otlp_payload(batch), default=str).encode("utf-8"),
+                headers={"Content-Type": "application/json"}, method="POST"
+            )
+            urllib.request.urlopen(request, timeout=5).close()
+
+
+_exporter = _Exporter()